@@ -4,15 +4,15 @@ Base Agent class for all Legal Strategy Council agents.
 This module provides the abstract base class that all specialized agents inherit from.
 It handles common functionality like LLM API calls, database operations, and error handling.
 
-To use a different LLM provider (e.g., OpenAI, Anthropic), modify the `think` method
-to use the appropriate client library while keeping the same interface.
+LLM calls are async and go through the shared client in services/llm_client.py,
+so all agents reuse one connection pool. To use a different LLM provider
+(e.g., OpenAI, Anthropic), modify that module while keeping the same interface.
 """
 from abc import ABC, abstractmethod
-from typing import Optional
-import time
-from groq import Groq
+from typing import AsyncIterator, Callable, Optional
 import config
 import database
+from services import llm_client, llm_cache
 
 
 class BaseAgent(ABC):
@@ -20,9 +20,10 @@ class BaseAgent(ABC):
     Base class for all agents in the Legal Strategy Council.
     
     This abstract class provides:
-    - LLM API integration (currently Groq)
+    - Async LLM API integration (currently Groq, via the shared client)
     - Database read/write operations
-    - Retry logic for API calls
+    - Retry/circuit-breaker handling via the shared LLM client
+    - Opt-in response caching (config.LLM_CACHE_AGENTS)
     - Common interface for all agents
     
     Each specialized agent (Harvey, Louis, Tanner, Jessica) extends this class
@@ -39,58 +40,107 @@ class BaseAgent(ABC):
         """
         self.name = name
         self.system_prompt = system_prompt
-        # Initialize Groq client with API key from config
-        # To use a different LLM provider, modify this initialization
-        self.client = Groq(api_key=config.GROQ_API_KEY)
 
-    def think(self, prompt: str, retry_count: int = 1) -> str:
+    def case_facts(self, case_data: dict) -> str:
+        """
+        Facts to put in this agent's prompts.
+
+        Returns the case brief computed by the orchestrator (see
+        services/case_brief.py), or the raw facts if there is no brief or this
+        agent is listed in config.CASE_BRIEF_RAW_FACTS_AGENTS.
+        """
+        facts = case_data.get("facts") or "No facts provided"
+        if self.name in config.CASE_BRIEF_RAW_FACTS_AGENTS:
+            return facts
+        return case_data.get("brief") or facts
+
+    async def think(self, prompt: str,
+                    on_token: Optional[Callable[[str], None]] = None) -> str:
         """
         Call the LLM API with the given prompt.
         
         This method handles:
-        - API calls to Groq (or other LLM providers)
-        - Retry logic for handling transient API errors
+        - API calls to Groq through the shared async client
+        - Response caching, if enabled for this agent (a cached response is
+          delivered to `on_token` in one piece)
+        - Optional token streaming (see `think_stream`)
         - Error handling and logging
         
+        Transient API errors are retried by the shared retry policy in the
+        LLM client (services/retry_policy.py). A stream that fails after
+        tokens were delivered is not retried.
+        
         Args:
             prompt: The user prompt/question to send to the LLM
-            retry_count: Number of retry attempts if API call fails (default: 1)
+            on_token: Optional callback invoked with each text delta as it
+                arrives. When given, the response is streamed; the full text is
+                still returned at the end.
         
         Returns:
             str: The LLM's response text
         
         Raises:
-            Exception: If all retry attempts fail
+            Exception: If the call fails after retries, with a fatal error, or
+                while the circuit breaker is open
         
         Note:
             To use a different LLM provider (OpenAI, Anthropic, etc.):
             1. Install the provider's SDK
-            2. Modify the client initialization in __init__
-            3. Update the API call format in this method
-            4. Keep the same return type (str) for compatibility
+            2. Modify the client in services/llm_client.py
+            3. Keep the same return type (str) for compatibility
+        """
+        if not llm_cache.is_enabled_for(self.name):
+            return await self._think_uncached(prompt, on_token)
+
+        key = llm_cache.make_key(
+            config.GROQ_MODEL, self.system_prompt, prompt,
+            config.GROQ_TEMPERATURE, config.GROQ_MAX_TOKENS
+        )
+
+        def on_hit(response: str):
+            # Served from the cache; the model that produced it isn't known here
+            llm_client.record_call({"model": None, "cached": True})
+            if on_token is not None:
+                on_token(response)
+
+        return await llm_cache.get_cache().get_or_compute(
+            key,
+            lambda: self._think_uncached(prompt, on_token),
+            on_hit=on_hit
+        )
+
+    async def _think_uncached(self, prompt: str,
+                              on_token: Optional[Callable[[str], None]]) -> str:
+        """Call the LLM API directly, bypassing the cache (see `think`)."""
+        print(f"[{self.name}] Calling Groq API with models: {', '.join(llm_client.model_cascade())}")
+        try:
+            # Make API call through the shared async client
+            if on_token is None:
+                content = await llm_client.chat_completion(self.system_prompt, prompt)
+            else:
+                chunks = []
+                async for delta in self.think_stream(prompt):
+                    chunks.append(delta)
+                    on_token(delta)
+                content = "".join(chunks)
+            print(f"[{self.name}] Groq API call successful")
+            return content
+        except Exception as e:
+            print(f"[{self.name}] Groq API error: {e}")
+            raise Exception(f"Groq API error: {str(e)}") from e
+
+    async def think_stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream the LLM's response to the given prompt.
+        
+        Args:
+            prompt: The user prompt/question to send to the LLM
+        
+        Yields:
+            str: Text deltas in the order they are generated
         """
-        print(f"[{self.name}] Calling Groq API with model: {config.GROQ_MODEL}")
-        for attempt in range(retry_count + 1):
-            try:
-                print(f"[{self.name}] Attempt {attempt + 1}...")
-                # Make API call to Groq
-                response = self.client.chat.completions.create(
-                    model=config.GROQ_MODEL,
-                    messages=[
-                        {"role": "system", "content": self.system_prompt},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=config.GROQ_TEMPERATURE,
-                    max_tokens=config.GROQ_MAX_TOKENS
-                )
-                print(f"[{self.name}] Groq API call successful")
-                return response.choices[0].message.content
-            except Exception as e:
-                print(f"[{self.name}] Groq API error: {e}")
-                if attempt < retry_count:
-                    time.sleep(2)  # Wait before retry
-                    continue
-                raise Exception(f"Groq API error after {retry_count + 1} attempts: {str(e)}")
+        async for delta in llm_client.stream_chat_completion(self.system_prompt, prompt):
+            yield delta
 
     def write_to_db(self, collection_name: str, document: dict) -> str:
         """
@@ -133,7 +183,7 @@ class BaseAgent(ABC):
         return documents
 
     @abstractmethod
-    def analyze(self, case_data: dict) -> dict:
+    async def analyze(self, case_data: dict) -> dict:
         """
         Analyze the case and return results.
         
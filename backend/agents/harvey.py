@@ -6,12 +6,18 @@ recommendations.
 
 Named after Harvey Specter from the TV show "Suits".
 """
-from typing import Optional, Dict, Any, List
+from typing import Callable, Optional, Dict, Any, List
+import asyncio
 from .base_agent import BaseAgent
 from services.mongo_utils import write_argument, write_agent_message
-from services.langgraph_wrapper import StepTracer
+from services.langgraph_wrapper import AsyncStepTracer
+from services import context_packer
+from services.context_packer import ContextPacker
 import config
 
+# Token cap for the case facts within Harvey's reconsideration context budget
+RECONSIDERATION_FACTS_MAX_TOKENS = 800
+
 
 HARVEY_SYSTEM_PROMPT = """You are Harvey Specter, a legendary senior trial attorney known as 'The Closer'.
 You have never lost a case that mattered. Your reputation is built on bold, aggressive strategies
@@ -42,8 +48,9 @@ class HarveyAgent(BaseAgent):
             system_prompt=HARVEY_SYSTEM_PROMPT
         )
 
-    def analyze(self, case_data: Dict[str, Any],
-                context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def analyze(self, case_data: Dict[str, Any],
+                context: Optional[Dict[str, Any]] = None,
+                on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Analyze the case and develop a primary legal strategy.
 
@@ -53,6 +60,7 @@ class HarveyAgent(BaseAgent):
         Args:
             case_data: The case information
             context: Optional context including counterarguments to address
+            on_token: Optional callback receiving streamed response deltas
 
         Returns:
             Strategy document with trace information
@@ -60,7 +68,7 @@ class HarveyAgent(BaseAgent):
         case_id = case_data["case_id"]
 
         # Initialize step tracer for auditability
-        tracer = StepTracer(
+        tracer = await AsyncStepTracer.start(
             self.name,
             case_id,
             metadata={"context": context} if context else None
@@ -75,11 +83,11 @@ class HarveyAgent(BaseAgent):
             analysis_type = "initial"
 
         # Step 1: Generate strategy using LLM
-        def generate_strategy():
-            return self.think(prompt)
+        async def generate_strategy():
+            return await self.think(prompt, on_token=on_token)
 
         # Step 2: Extract key components
-        def extract_components():
+        async def extract_components():
             strategy_text = tracer.steps_executed[-1]["output"] if tracer.steps_executed else ""
             return {
                 "full_analysis": strategy_text,
@@ -88,14 +96,16 @@ class HarveyAgent(BaseAgent):
 
         # Run steps with tracing
         results = {}
-        results["strategy_generation"] = tracer.run_step("strategy_generation", generate_strategy)
-        results["component_extraction"] = tracer.run_step("component_extraction", extract_components)
+        results["strategy_generation"] = await tracer.run_step_async("strategy_generation", generate_strategy)
+        await tracer.raise_on_error_async("strategy_generation", results["strategy_generation"])
+        results["component_extraction"] = await tracer.run_step_async("component_extraction", extract_components)
 
         # Get the generated strategy
         strategy_content = results["strategy_generation"]["output"]
 
         # Persist argument to MongoDB
-        arg_doc = write_argument(
+        arg_doc = await asyncio.to_thread(
+            write_argument,
             case_id=case_id,
             agent=self.name,
             arg_type="primary",
@@ -106,7 +116,8 @@ class HarveyAgent(BaseAgent):
         # If this is a reconsideration, send message to Tanner
         if context and context.get("counterarguments"):
             for counter in context["counterarguments"]:
-                write_agent_message(
+                await asyncio.to_thread(
+                    write_agent_message,
                     case_id=case_id,
                     sender=self.name,
                     recipient="Tanner",
@@ -119,7 +130,7 @@ class HarveyAgent(BaseAgent):
                 )
 
         # Finish tracing
-        tracer.finish(status="completed", result={"argument_id": arg_doc.get("argument_id")})
+        await tracer.finish_async(status="completed", result={"argument_id": arg_doc.get("argument_id")})
 
         return {
             "agent": self.name,
@@ -128,6 +139,7 @@ class HarveyAgent(BaseAgent):
             "content": strategy_content,
             "analysis_type": analysis_type,
             "trace": tracer.trace,
+            "llm_usage": tracer.usage,
             "run_id": tracer.run_id
         }
 
@@ -139,7 +151,7 @@ CASE ANALYSIS REQUEST
 Title: {case_data.get('title', 'Unknown')}
 
 Facts:
-{case_data.get('facts', 'No facts provided')}
+{self.case_facts(case_data)}
 
 Jurisdiction: {case_data.get('jurisdiction', 'Unknown')}
 
@@ -164,15 +176,27 @@ Give me a strategy that wins. That's what we do.
 
     def _build_reconsideration_prompt(self, case_data: Dict[str, Any],
                                        context: Dict[str, Any]) -> str:
-        """Build prompt for reconsidering strategy after Tanner's attacks."""
-        counterarguments = context.get("counterarguments", [])
-        counter_text = ""
-        for counter in counterarguments:
+        """Build prompt for reconsidering strategy after Tanner's attacks.
+
+        Facts and the newest counterarguments are packed into Harvey's
+        context token budget.
+        """
+        packer = ContextPacker(context_packer.budget_for(self.name))
+        packer.add("facts", self.case_facts(case_data),
+                   priority=1, max_tokens=RECONSIDERATION_FACTS_MAX_TOKENS)
+        for counter in context.get("counterarguments", []):
             content = counter.get("content", "")
             if isinstance(content, dict):
                 content = str(content)
-            counter_text += f"\n--- Attack from {counter.get('agent', 'Opposing Counsel')} ---\n"
-            counter_text += f"{content}\n"
+            packer.add(
+                "counterarguments", content,
+                recency=counter.get("created_at", ""),
+                header=f"\n--- Attack from {counter.get('agent', 'Opposing Counsel')} ---"
+            )
+
+        packed = packer.pack()
+        facts = packed.get("facts", "").strip() or "No facts provided"
+        counter_text = packed.get("counterarguments", "")
 
         return f"""
 STRATEGY RECONSIDERATION REQUEST
@@ -180,7 +204,7 @@ STRATEGY RECONSIDERATION REQUEST
 Title: {case_data.get('title', 'Unknown')}
 
 Facts:
-{case_data.get('facts', 'No facts provided')}
+{facts}
 
 Jurisdiction: {case_data.get('jurisdiction', 'Unknown')}
 
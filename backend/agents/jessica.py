@@ -5,15 +5,23 @@ in multi-round deliberation, resolves conflicts, and synthesizes the final strat
 
 Named after Jessica Pearson from the TV show "Suits".
 """
-from typing import Optional, Dict, Any, List
+from typing import Callable, Optional, Dict, Any, List
+import asyncio
 from .base_agent import BaseAgent
 from services.mongo_utils import (
     write_strategy_version, write_agent_message,
     get_arguments, get_counterarguments, get_conflicts
 )
-from services.langgraph_wrapper import StepTracer
+from services.langgraph_wrapper import AsyncStepTracer
+from services import context_packer
+from services.context_packer import ContextPacker
 import config
 
+# Per-item token caps within Jessica's context budget
+SYNTHESIS_FACTS_MAX_TOKENS = 400
+SYNTHESIS_CONFLICT_MAX_TOKENS = 120
+SYNTHESIS_ROUND_MAX_TOKENS = 100
+
 
 JESSICA_SYSTEM_PROMPT = """You are Jessica Pearson, the Managing Partner of the firm.
 You've built this firm from nothing and you know how to make the hard calls.
@@ -45,11 +53,12 @@ class JessicaAgent(BaseAgent):
             system_prompt=JESSICA_SYSTEM_PROMPT
         )
 
-    def analyze(self, case_data: Dict[str, Any],
+    async def analyze(self, case_data: Dict[str, Any],
                 arguments: Optional[List[Dict[str, Any]]] = None,
                 counterarguments: Optional[List[Dict[str, Any]]] = None,
                 conflicts: Optional[List[Dict[str, Any]]] = None,
-                deliberation_history: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+                deliberation_history: Optional[Dict[str, Any]] = None,
+                on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Synthesize all inputs into a final, unified strategy.
 
@@ -59,6 +68,7 @@ class JessicaAgent(BaseAgent):
             counterarguments: List of counterarguments from Tanner
             conflicts: List of detected conflicts
             deliberation_history: History of multi-round Harvey <-> Tanner exchanges
+            on_token: Optional callback receiving streamed response deltas
 
         Returns:
             Final strategy document
@@ -66,7 +76,7 @@ class JessicaAgent(BaseAgent):
         case_id = case_data["case_id"]
 
         # Initialize step tracer
-        tracer = StepTracer(
+        tracer = await AsyncStepTracer.start(
             self.name,
             case_id,
             metadata={"deliberation_rounds": len(deliberation_history.get("rounds", [])) if deliberation_history else 0}
@@ -74,11 +84,11 @@ class JessicaAgent(BaseAgent):
 
         # If not provided, read from MongoDB
         if arguments is None:
-            arguments = get_arguments(case_id)
+            arguments = await asyncio.to_thread(get_arguments, case_id)
         if counterarguments is None:
-            counterarguments = get_counterarguments(case_id)
+            counterarguments = await asyncio.to_thread(get_counterarguments, case_id)
         if conflicts is None:
-            conflicts = get_conflicts(case_id)
+            conflicts = await asyncio.to_thread(get_conflicts, case_id)
 
         # Build the synthesis prompt
         prompt = self._build_synthesis_prompt(
@@ -86,16 +96,16 @@ class JessicaAgent(BaseAgent):
         )
 
         # Step 1: Generate final strategy using LLM
-        def generate_synthesis():
-            return self.think(prompt)
+        async def generate_synthesis():
+            return await self.think(prompt, on_token=on_token)
 
         # Step 2: Extract rejected alternatives
-        def extract_rejected():
+        async def extract_rejected():
             synthesis = tracer.steps_executed[-1]["output"] if tracer.steps_executed else ""
             return self._extract_rejected_alternatives(synthesis)
 
         # Step 3: Build rationale
-        def build_rationale():
+        async def build_rationale():
             return {
                 "method": "Multi-round deliberation with conflict resolution",
                 "inputs_considered": {
@@ -108,9 +118,10 @@ class JessicaAgent(BaseAgent):
 
         # Run steps with tracing
         results = {}
-        results["synthesis"] = tracer.run_step("synthesis", generate_synthesis)
-        results["rejected_extraction"] = tracer.run_step("rejected_extraction", extract_rejected)
-        results["rationale"] = tracer.run_step("rationale", build_rationale)
+        results["synthesis"] = await tracer.run_step_async("synthesis", generate_synthesis)
+        await tracer.raise_on_error_async("synthesis", results["synthesis"])
+        results["rejected_extraction"] = await tracer.run_step_async("rejected_extraction", extract_rejected)
+        results["rationale"] = await tracer.run_step_async("rationale", build_rationale)
 
         # Get results
         final_strategy = results["synthesis"]["output"]
@@ -118,16 +129,22 @@ class JessicaAgent(BaseAgent):
         rationale = results["rationale"]["output"]
 
         # Persist strategy version to MongoDB
-        strategy_doc = write_strategy_version(
-            case_id=case_id,
-            author=self.name,
-            strategy={"content": final_strategy},
-            rationale=rationale,
-            rejected_alternatives=rejected_alternatives
-        )
+        try:
+            strategy_doc = await asyncio.to_thread(
+                write_strategy_version,
+                case_id=case_id,
+                author=self.name,
+                strategy={"content": final_strategy},
+                rationale=rationale,
+                rejected_alternatives=rejected_alternatives
+            )
+        except Exception as e:
+            await tracer.finish_async(status="failed", result={"error": f"Could not save strategy: {e}"})
+            raise
 
         # Send message to the team
-        write_agent_message(
+        await asyncio.to_thread(
+            write_agent_message,
             case_id=case_id,
             sender=self.name,
             recipient="Team",
@@ -140,7 +157,7 @@ class JessicaAgent(BaseAgent):
         )
 
         # Finish tracing
-        tracer.finish(status="completed", result={
+        await tracer.finish_async(status="completed", result={
             "strategy_id": strategy_doc.get("strategy_id"),
             "version": strategy_doc.get("version")
         })
@@ -153,6 +170,7 @@ class JessicaAgent(BaseAgent):
             "rationale": rationale,
             "rejected_alternatives": rejected_alternatives,
             "trace": tracer.trace,
+            "llm_usage": tracer.usage,
             "run_id": tracer.run_id
         }
 
@@ -161,55 +179,66 @@ class JessicaAgent(BaseAgent):
                                  counterarguments: List[Dict[str, Any]],
                                  conflicts: List[Dict[str, Any]],
                                  deliberation_history: Optional[Dict[str, Any]]) -> str:
-        """Build the synthesis prompt for Jessica."""
+        """Build the synthesis prompt for Jessica.
 
-        # Format arguments (truncate to save tokens)
-        arguments_text = ""
-        for arg in arguments[:3]:  # Limit to 3 most recent
-            agent = arg.get("agent", "Unknown")
-            arg_type = arg.get("type", "unknown")
+        Case material is packed into Jessica's context token budget: facts
+        and conflicts first, then the newest arguments and attacks, then
+        the deliberation history.
+        """
+        packer = ContextPacker(context_packer.budget_for(self.name))
+        packer.add("facts", self.case_facts(case_data),
+                   priority=4, max_tokens=SYNTHESIS_FACTS_MAX_TOKENS)
+
+        for conflict in conflicts:
+            agents = conflict.get("agents_involved", [])
+            packer.add(
+                "conflicts", conflict.get("description", ""),
+                priority=3, recency=conflict.get("created_at", ""),
+                header=f"\n--- Conflict: {conflict.get('issue', 'Unknown')} ---\nAgents: {', '.join(agents[:2])}",
+                max_tokens=SYNTHESIS_CONFLICT_MAX_TOKENS
+            )
+
+        for arg in arguments:
             content = arg.get("content", "")
             if isinstance(content, dict):
                 content = content.get("content", str(content))
-            content = content[:800] + "..." if len(content) > 800 else content  # Truncate
-            arguments_text += f"\n--- {agent} ({arg_type}) ---\n"
-            arguments_text += f"{content}\n"
-
-        # Format counterarguments (truncate to save tokens)
-        counterarguments_text = ""
-        for counter in counterarguments[:2]:  # Limit to 2 most recent
-            agent = counter.get("agent", "Unknown")
+            packer.add(
+                "arguments", content,
+                priority=2, recency=arg.get("created_at", ""),
+                header=f"\n--- {arg.get('agent', 'Unknown')} ({arg.get('type', 'unknown')}) ---"
+            )
+
+        for counter in counterarguments:
             content = counter.get("content", "")
             if isinstance(content, dict):
                 content = str(content)
-            content = content[:600] + "..." if len(content) > 600 else content  # Truncate
-            counterarguments_text += f"\n--- {agent}'s Attack ---\n"
-            counterarguments_text += f"{content}\n"
-
-        # Format conflicts (truncate to save tokens)
-        conflicts_text = ""
-        for conflict in conflicts[:3]:  # Limit to 3 conflicts
-            issue = conflict.get("issue", "Unknown")
-            agents = conflict.get("agents_involved", [])
-            description = conflict.get("description", "")[:200]  # Truncate description
-            conflicts_text += f"\n--- Conflict: {issue} ---\n"
-            conflicts_text += f"Agents: {', '.join(agents[:2])}\n"
-            conflicts_text += f"{description}\n"
-
-        # Format deliberation history
-        deliberation_text = ""
-        if deliberation_history and deliberation_history.get("rounds"):
-            deliberation_text = "\n--- DELIBERATION HISTORY ---\n"
-            for i, round_data in enumerate(deliberation_history["rounds"], 1):
-                deliberation_text += f"\nRound {i}:\n"
+            packer.add(
+                "counterarguments", content,
+                priority=2, recency=counter.get("created_at", ""),
+                header=f"\n--- {counter.get('agent', 'Unknown')}'s Attack ---"
+            )
+
+        if deliberation_history:
+            for i, round_data in enumerate(deliberation_history.get("rounds", []), 1):
                 if round_data.get("harvey"):
-                    deliberation_text += f"  Harvey's Position: {round_data['harvey'][:200]}...\n"
+                    packer.add("deliberation", round_data["harvey"], priority=1, recency=(i, 1),
+                               header=f"Round {i} - Harvey's Position:",
+                               max_tokens=SYNTHESIS_ROUND_MAX_TOKENS)
                 if round_data.get("tanner"):
-                    deliberation_text += f"  Tanner's Attack: {round_data['tanner'][:200]}...\n"
+                    packer.add("deliberation", round_data["tanner"], priority=1, recency=(i, 0),
+                               header=f"Round {i} - Tanner's Attack:",
+                               max_tokens=SYNTHESIS_ROUND_MAX_TOKENS)
+
+        packed = packer.pack()
+        print(f"[{self.name}] Packed synthesis context: {packer.stats()}")
 
-        # Truncate facts to save tokens
-        facts = case_data.get('facts', 'No facts provided')
-        facts = facts[:600] + "..." if len(facts) > 600 else facts
+        facts = packed.get("facts", "").strip() or "No facts provided"
+        arguments_text = packed.get("arguments", "")
+        counterarguments_text = packed.get("counterarguments", "")
+        conflicts_text = packed.get("conflicts", "")
+        deliberation_text = ""
+        if packed.get("deliberation"):
+            deliberation_text = "\n--- DELIBERATION HISTORY ---\n" + packed["deliberation"]
 
         return f"""FINAL STRATEGY SYNTHESIS
 
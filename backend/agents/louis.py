@@ -6,10 +6,11 @@ and provides technical legal arguments that others might miss.
 
 Named after Louis Litt from the TV show "Suits".
 """
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any
+import asyncio
 from .base_agent import BaseAgent
 from services.mongo_utils import write_argument, write_agent_message
-from services.langgraph_wrapper import StepTracer
+from services.langgraph_wrapper import AsyncStepTracer
 import config
 
 
@@ -42,14 +43,16 @@ class LouisAgent(BaseAgent):
             system_prompt=LOUIS_SYSTEM_PROMPT
         )
 
-    def analyze(self, case_data: Dict[str, Any],
-                context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def analyze(self, case_data: Dict[str, Any],
+                context: Optional[Dict[str, Any]] = None,
+                on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Analyze the case and find relevant precedents and legal doctrines.
 
         Args:
             case_data: The case information
             context: Optional context (e.g., Harvey's strategy to support)
+            on_token: Optional callback receiving streamed response deltas
 
         Returns:
             Precedent research document with trace information
@@ -57,7 +60,7 @@ class LouisAgent(BaseAgent):
         case_id = case_data["case_id"]
 
         # Initialize step tracer for auditability
-        tracer = StepTracer(
+        tracer = await AsyncStepTracer.start(
             self.name,
             case_id,
             metadata={"context": context} if context else None
@@ -67,11 +70,11 @@ class LouisAgent(BaseAgent):
         prompt = self._build_research_prompt(case_data, context)
 
         # Step 1: Generate precedent research using LLM
-        def research_precedents():
-            return self.think(prompt)
+        async def research_precedents():
+            return await self.think(prompt, on_token=on_token)
 
         # Step 2: Categorize findings
-        def categorize_findings():
+        async def categorize_findings():
             research_text = tracer.steps_executed[-1]["output"] if tracer.steps_executed else ""
             return {
                 "full_research": research_text,
@@ -80,14 +83,16 @@ class LouisAgent(BaseAgent):
 
         # Run steps with tracing
         results = {}
-        results["precedent_research"] = tracer.run_step("precedent_research", research_precedents)
-        results["categorization"] = tracer.run_step("categorization", categorize_findings)
+        results["precedent_research"] = await tracer.run_step_async("precedent_research", research_precedents)
+        await tracer.raise_on_error_async("precedent_research", results["precedent_research"])
+        results["categorization"] = await tracer.run_step_async("categorization", categorize_findings)
 
         # Get the generated research
         research_content = results["precedent_research"]["output"]
 
         # Persist argument to MongoDB
-        arg_doc = write_argument(
+        arg_doc = await asyncio.to_thread(
+            write_argument,
             case_id=case_id,
             agent=self.name,
             arg_type="precedent",
@@ -96,7 +101,8 @@ class LouisAgent(BaseAgent):
         )
 
         # Send message to Harvey about research findings
-        write_agent_message(
+        await asyncio.to_thread(
+            write_agent_message,
             case_id=case_id,
             sender=self.name,
             recipient="Harvey",
@@ -108,7 +114,7 @@ class LouisAgent(BaseAgent):
         )
 
         # Finish tracing
-        tracer.finish(status="completed", result={"argument_id": arg_doc.get("argument_id")})
+        await tracer.finish_async(status="completed", result={"argument_id": arg_doc.get("argument_id")})
 
         return {
             "agent": self.name,
@@ -116,6 +122,7 @@ class LouisAgent(BaseAgent):
             "type": "precedent",
             "content": research_content,
             "trace": tracer.trace,
+            "llm_usage": tracer.usage,
             "run_id": tracer.run_id
         }
 
@@ -138,7 +145,7 @@ LEGAL RESEARCH REQUEST
 Title: {case_data.get('title', 'Unknown')}
 
 Facts:
-{case_data.get('facts', 'No facts provided')}
+{self.case_facts(case_data)}
 
 Jurisdiction: {case_data.get('jurisdiction', 'Unknown')}
 
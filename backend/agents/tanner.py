@@ -6,15 +6,21 @@ suggests cross-examination traps.
 
 Named after Travis Tanner from the TV show "Suits".
 """
-from typing import Optional, Dict, Any, List
+from typing import Callable, Optional, Dict, Any, List
+import asyncio
 from .base_agent import BaseAgent
 from services.mongo_utils import (
     write_counterargument, write_agent_message,
     get_arguments
 )
-from services.langgraph_wrapper import StepTracer
+from services.langgraph_wrapper import AsyncStepTracer
+from services import context_packer
+from services.context_packer import ContextPacker
 import config
 
+# Token cap for the case facts within Tanner's context budget
+ATTACK_FACTS_MAX_TOKENS = 800
+
 
 TANNER_SYSTEM_PROMPT = """You are Travis Tanner, a ruthless opposing counsel known as 'The Destroyer'.
 Your reputation is built on tearing apart cases that seemed unwinnable for your opponents.
@@ -46,14 +52,16 @@ class TannerAgent(BaseAgent):
             system_prompt=TANNER_SYSTEM_PROMPT
         )
 
-    def analyze(self, case_data: Dict[str, Any],
-                primary_strategies: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    async def analyze(self, case_data: Dict[str, Any],
+                primary_strategies: Optional[List[Dict[str, Any]]] = None,
+                on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Read previous arguments and generate counterarguments.
 
         Args:
             case_data: The case information
             primary_strategies: List of strategies from Harvey/Louis to attack
+            on_token: Optional callback receiving streamed response deltas
 
         Returns:
             Counterargument document with attack vectors
@@ -65,29 +73,30 @@ class TannerAgent(BaseAgent):
         if primary_strategies:
             metadata["attacking"] = [s.get("argument_id") for s in primary_strategies if s.get("argument_id")]
 
-        tracer = StepTracer(self.name, case_id, metadata=metadata)
+        tracer = await AsyncStepTracer.start(self.name, case_id, metadata=metadata)
 
         # If no strategies provided, read from MongoDB
         if not primary_strategies:
-            primary_strategies = self._get_strategies_from_db(case_id)
+            primary_strategies = await asyncio.to_thread(self._get_strategies_from_db, case_id)
 
         # Build the prompt
         prompt = self._build_attack_prompt(case_data, primary_strategies)
 
         # Step 1: Generate attacks using LLM
-        def generate_attacks():
-            return self.think(prompt)
+        async def generate_attacks():
+            return await self.think(prompt, on_token=on_token)
 
         # Step 2: Extract attack vectors
-        def extract_attack_vectors():
+        async def extract_attack_vectors():
             attack_text = tracer.steps_executed[-1]["output"] if tracer.steps_executed else ""
             vectors = self._extract_attack_vectors(attack_text)
             return vectors
 
         # Run steps with tracing
         results = {}
-        results["attack_generation"] = tracer.run_step("attack_generation", generate_attacks)
-        results["vector_extraction"] = tracer.run_step("vector_extraction", extract_attack_vectors)
+        results["attack_generation"] = await tracer.run_step_async("attack_generation", generate_attacks)
+        await tracer.raise_on_error_async("attack_generation", results["attack_generation"])
+        results["vector_extraction"] = await tracer.run_step_async("vector_extraction", extract_attack_vectors)
 
         # Get results
         attack_content = results["attack_generation"]["output"]
@@ -99,7 +108,8 @@ class TannerAgent(BaseAgent):
             target_id = primary_strategies[0].get("argument_id", "general")
 
         # Persist counterargument to MongoDB
-        counter_doc = write_counterargument(
+        counter_doc = await asyncio.to_thread(
+            write_counterargument,
             case_id=case_id,
             agent=self.name,
             target_argument_id=target_id,
@@ -108,7 +118,8 @@ class TannerAgent(BaseAgent):
         )
 
         # Send message to Harvey about the attack
-        write_agent_message(
+        await asyncio.to_thread(
+            write_agent_message,
             case_id=case_id,
             sender=self.name,
             recipient="Harvey",
@@ -122,7 +133,7 @@ class TannerAgent(BaseAgent):
         )
 
         # Finish tracing
-        tracer.finish(status="completed", result={
+        await tracer.finish_async(status="completed", result={
             "counterargument_id": counter_doc.get("counterargument_id"),
             "attack_vectors_count": len(attack_vectors)
         })
@@ -134,6 +145,7 @@ class TannerAgent(BaseAgent):
             "content": attack_content,
             "attack_vectors": attack_vectors,
             "trace": tracer.trace,
+            "llm_usage": tracer.usage,
             "run_id": tracer.run_id
         }
 
@@ -143,16 +155,27 @@ class TannerAgent(BaseAgent):
 
     def _build_attack_prompt(self, case_data: Dict[str, Any],
                               strategies: List[Dict[str, Any]]) -> str:
-        """Build the attack prompt for Tanner."""
-        # Format strategies for the prompt
-        strategies_text = ""
+        """Build the attack prompt for Tanner.
+
+        Facts and the newest strategies are packed into Tanner's context
+        token budget.
+        """
+        packer = ContextPacker(context_packer.budget_for(self.name))
+        packer.add("facts", self.case_facts(case_data),
+                   priority=1, max_tokens=ATTACK_FACTS_MAX_TOKENS)
         for strat in strategies:
-            agent = strat.get("agent", "Unknown")
             content = strat.get("content", "")
             if isinstance(content, dict):
                 content = str(content)
-            strategies_text += f"\n--- {agent}'s Argument ---\n"
-            strategies_text += f"{content}\n"
+            packer.add(
+                "strategies", content,
+                recency=strat.get("created_at", ""),
+                header=f"\n--- {strat.get('agent', 'Unknown')}'s Argument ---"
+            )
+
+        packed = packer.pack()
+        facts = packed.get("facts", "").strip() or "No facts provided"
+        strategies_text = packed.get("strategies", "")
 
         return f"""
 OPPOSING COUNSEL ANALYSIS
@@ -161,7 +184,7 @@ CASE OVERVIEW:
 Title: {case_data.get('title', 'Unknown')}
 
 Facts:
-{case_data.get('facts', 'No facts provided')}
+{facts}
 
 Jurisdiction: {case_data.get('jurisdiction', 'Unknown')}
 
@@ -15,6 +15,7 @@ Agent names inspired by the TV show "Suits":
 - Tanner: Adversarial Counsel (The Destroyer)
 - Jessica: Managing Partner / Moderator (The Mediator)
 """
+import json
 import os
 from dotenv import load_dotenv
 
@@ -27,7 +28,7 @@ load_dotenv()
 
 # Groq API Configuration
 # You can use any Groq-compatible API key here
-# To use a different LLM provider, modify the BaseAgent class in agents/base_agent.py
+# To use a different LLM provider, modify the shared client in services/llm_client.py (get_client)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 # Groq Model Configuration
@@ -37,6 +38,102 @@ GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")  # Default to small
 GROQ_TEMPERATURE = float(os.getenv("GROQ_TEMPERATURE", "0.7"))  # Creativity level (0.0-1.0)
 GROQ_MAX_TOKENS = int(os.getenv("GROQ_MAX_TOKENS", "1500"))  # Maximum response length
 
+# LLM backend
+# "groq" calls the Groq API. "mock" uses the local mock in services/mock_llm.py
+# (no API key needed) for offline runs, benchmarks and load tests.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq").lower()
+
+# Mock backend settings (only used when LLM_BACKEND=mock)
+# MOCK_LLM_MODE: "deterministic" (canned responses, no delay), "latency"
+# (log-normal delays) or "chaos" (delays plus injected API errors)
+MOCK_LLM_MODE = os.getenv("MOCK_LLM_MODE", "deterministic").lower()
+MOCK_LLM_LATENCY_MS = float(os.getenv("MOCK_LLM_LATENCY_MS", "800"))  # Median response time
+MOCK_LLM_LATENCY_SIGMA = float(os.getenv("MOCK_LLM_LATENCY_SIGMA", "0.5"))  # Log-normal spread (tail weight)
+MOCK_LLM_ERROR_RATE = float(os.getenv("MOCK_LLM_ERROR_RATE", "0.1"))  # Fraction of failing calls (chaos)
+MOCK_LLM_ERROR_STATUSES = [
+    int(code) for code in os.getenv("MOCK_LLM_ERROR_STATUSES", "429,500,503").split(",") if code.strip()
+]
+MOCK_LLM_SEED = int(os.getenv("MOCK_LLM_SEED")) if os.getenv("MOCK_LLM_SEED") else None  # Reproducible runs
+
+# Shared LLM connection pool
+# All agents and services share one async HTTP client (see services/llm_client.py).
+# LLM_MAX_CONNECTIONS caps concurrent in-flight LLM requests for the whole process;
+# calls beyond that wait for a free connection instead of failing.
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))  # Seconds per request
+
+# Groq rate limits (see services/rate_limiter.py)
+# Set these to your account's limits for GROQ_MODEL. LLM calls queue until both
+# budgets have capacity instead of failing with 429s. Use 0 to disable a budget.
+GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "30000"))
+
+# Retry policy and circuit breaker (see services/retry_policy.py)
+LLM_RETRY_MAX_ATTEMPTS = int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", "4"))  # Total attempts per call
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0"))  # Seconds, doubled per attempt
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "30.0"))  # Cap on any single wait
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))  # Consecutive provider failures
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))  # Open time before a trial call
+
+# Model cascade (see services/llm_client.py)
+# Every call starts on GROQ_MODEL. If it fails, or (with LLM_HEDGE) has not
+# answered within LLM_LATENCY_BUDGET_MS, the next fallback model is tried.
+# Fallbacks are comma-separated, in order. Use 0 to disable the latency budget.
+GROQ_FALLBACK_MODELS = [
+    name.strip() for name in os.getenv("GROQ_FALLBACK_MODELS", "llama-3.3-70b-versatile").split(",")
+    if name.strip()
+]
+LLM_LATENCY_BUDGET_MS = int(os.getenv("LLM_LATENCY_BUDGET_MS", "8000"))  # Time to answer/first token
+LLM_HEDGE = os.getenv("LLM_HEDGE", "true").lower() == "true"  # Race a fallback when over budget
+
+# LLM pricing, USD per million tokens (see services/llm_client.py telemetry)
+# Used to estimate the cost recorded for each call. Override or extend with a
+# JSON object in LLM_PRICING, e.g. {"my-model": {"input": 0.1, "output": 0.2}}.
+LLM_PRICING = {
+    "llama-3.1-8b-instant": {"input": 0.05, "output": 0.08},
+    "llama-3.3-70b-versatile": {"input": 0.59, "output": 0.79},
+    **json.loads(os.getenv("LLM_PRICING", "{}")),
+}
+
+# Token streaming
+# When enabled, agent responses are streamed and forwarded to the SSE stream
+# as `agent_token` events while the agent is still generating.
+LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() == "true"
+
+# LLM response cache (see services/llm_cache.py)
+# Opt-in per agent: comma-separated agent/service names whose responses may be
+# reused for identical prompts, e.g. "Louis,ConflictDetector". Leave empty to
+# always sample fresh responses.
+LLM_CACHE_AGENTS = [
+    name.strip() for name in os.getenv("LLM_CACHE_AGENTS", "").split(",") if name.strip()
+]
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))  # In-process LRU size
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))  # Entry lifetime (memory and Mongo)
+
+# Prompt context budgets (see services/context_packer.py)
+# Token budget for the case material (facts, arguments, attacks, conflicts,
+# deliberation history) packed into each agent's prompt. Newest and most
+# important items are kept first; the rest is truncated or dropped.
+CONTEXT_TOKEN_BUDGETS = {
+    "Harvey": int(os.getenv("HARVEY_CONTEXT_TOKENS", "2500")),
+    "Tanner": int(os.getenv("TANNER_CONTEXT_TOKENS", "3000")),
+    "Jessica": int(os.getenv("JESSICA_CONTEXT_TOKENS", "3000")),
+}
+CONTEXT_DEFAULT_TOKEN_BUDGET = int(os.getenv("CONTEXT_DEFAULT_TOKEN_BUDGET", "2500"))
+CONTEXT_ITEM_MAX_TOKENS = int(os.getenv("CONTEXT_ITEM_MAX_TOKENS", "800"))  # Cap per argument/attack
+
+# Case brief (see services/case_brief.py)
+# Long facts are condensed once per case into a digest of at most
+# CASE_BRIEF_MAX_TOKENS, stored on the case and used in agent prompts instead
+# of the raw facts. Agents listed in CASE_BRIEF_RAW_FACTS_AGENTS (comma-separated,
+# e.g. "Louis") keep receiving the full facts.
+CASE_BRIEF_ENABLED = os.getenv("CASE_BRIEF_ENABLED", "true").lower() == "true"
+CASE_BRIEF_MAX_TOKENS = int(os.getenv("CASE_BRIEF_MAX_TOKENS", "500"))
+CASE_BRIEF_RAW_FACTS_AGENTS = [
+    name.strip() for name in os.getenv("CASE_BRIEF_RAW_FACTS_AGENTS", "").split(",") if name.strip()
+]
+
 # ============================================================================
 # MongoDB Configuration
 # ============================================================================
@@ -51,6 +148,26 @@ MONGODB_URI = os.getenv("MONGODB_URI")
 # All collections will be created in this database
 DATABASE_NAME = os.getenv("DATABASE_NAME", "legal_war_room")
 
+# Write-behind trace writer (see services/trace_writer.py)
+# Agent runs, reasoning steps, agent messages and usage updates are queued and
+# written by a background thread in bulk, every TRACE_BATCH_SIZE operations or
+# TRACE_FLUSH_SECONDS, instead of one round-trip each on the analysis path.
+# A writer that finds the queue full waits for room, so queued writes are never
+# dropped or reordered.
+TRACE_WRITE_BEHIND = os.getenv("TRACE_WRITE_BEHIND", "true").lower() == "true"
+TRACE_QUEUE_MAX_OPS = int(os.getenv("TRACE_QUEUE_MAX_OPS", "10000"))
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "200"))
+TRACE_FLUSH_SECONDS = float(os.getenv("TRACE_FLUSH_SECONDS", "0.5"))
+# How long reads and checkpoints wait for queued trace writes before going ahead without them
+# (and how often a writer waiting on a full queue warns)
+TRACE_FLUSH_TIMEOUT_SECONDS = float(os.getenv("TRACE_FLUSH_TIMEOUT_SECONDS", "5"))
+# How long shutdown waits for queued trace writes to be drained
+TRACE_DRAIN_TIMEOUT_SECONDS = float(os.getenv("TRACE_DRAIN_TIMEOUT_SECONDS", "10"))
+# Write primary artifacts (arguments, counterarguments, conflicts, strategies)
+# synchronously, so they are in Mongo before the write returns. Set to false
+# to queue them with the traces as well.
+DURABLE_ARTIFACT_WRITES = os.getenv("DURABLE_ARTIFACT_WRITES", "true").lower() == "true"
+
 # ============================================================================
 # MongoDB Collection Names
 # ============================================================================
@@ -69,6 +186,15 @@ COLLECTIONS = {
     "agent_runs": "agent_runs",          # Tracks agent execution for auditability
     "reasoning_steps": "reasoning_steps",  # Stores step-by-step agent thinking
     "agent_messages": "agent_messages",  # Stores inter-agent communication
+
+    # Infrastructure collections
+    "llm_cache": "llm_cache",            # Persistent tier of the LLM response cache
+    "case_events": "case_events",        # Replayable per-case SSE event log
+    "analysis_jobs": "analysis_jobs",    # Durable queue of case analyses for workers
+    "batches": "batches",                # Bulk analysis batches (JSONL uploads)
+    "case_progress": "case_progress",    # Per-case analysis progress (see services/progress_store.py)
+    "counters": "counters",              # Atomic per-case sequences (strategy versions)
+    "migrations": "migrations",          # Applied index schema version (see migrations.py)
 }
 
 # ============================================================================
@@ -107,6 +233,94 @@ AGENT_COLORS = {
 # ============================================================================
 
 # Multi-round deliberation settings
-# Number of Harvey <-> Tanner exchanges before Jessica synthesizes
+# Maximum number of Harvey <-> Tanner exchanges before Jessica synthesizes
 # More rounds = more thorough debate but longer processing time
 DELIBERATION_ROUNDS = int(os.getenv("DELIBERATION_ROUNDS", "2"))
+
+# Early exit (see services/convergence.py)
+# DELIBERATION_ROUNDS is a ceiling: deliberation stops once Tanner's attacks
+# repeat the previous round's (shingled Jaccard of attack vectors, or of the
+# attack text) or Harvey's rebuttal barely changes his strategy.
+DELIBERATION_EARLY_EXIT = os.getenv("DELIBERATION_EARLY_EXIT", "true").lower() == "true"
+CONVERGENCE_ATTACK_THRESHOLD = float(os.getenv("CONVERGENCE_ATTACK_THRESHOLD", "0.6"))
+CONVERGENCE_STRATEGY_THRESHOLD = float(os.getenv("CONVERGENCE_STRATEGY_THRESHOLD", "0.7"))
+CONVERGENCE_SHINGLE_SIZE = int(os.getenv("CONVERGENCE_SHINGLE_SIZE", "3"))  # Words per shingle
+
+# Conflict detection (see services/conflict_detector.py)
+# "incremental": after the opening arguments and after each deliberation round,
+# the new outputs are checked against a summary of the earlier ones, alongside
+# the next round. "final": one pass over every argument after deliberation.
+CONFLICT_DETECTION_MODE = os.getenv("CONFLICT_DETECTION_MODE", "incremental").lower()
+CONFLICT_SUMMARY_TOKENS = int(os.getenv("CONFLICT_SUMMARY_TOKENS", "1200"))  # Summary of analyzed outputs
+CONFLICT_SUMMARY_ITEM_TOKENS = int(os.getenv("CONFLICT_SUMMARY_ITEM_TOKENS", "200"))  # Per analyzed output
+
+# Run Louis's precedent research concurrently with Harvey's initial strategy.
+# Set to false to have Louis wait for (and reference) Harvey's strategy instead.
+RESEARCH_IN_PARALLEL = os.getenv("RESEARCH_IN_PARALLEL", "true").lower() == "true"
+
+# Checkpoint each completed stage on the case and resume interrupted runs from
+# the last completed stage instead of re-running the whole analysis.
+ANALYSIS_CHECKPOINTS = os.getenv("ANALYSIS_CHECKPOINTS", "true").lower() == "true"
+
+# Analysis run event log (see services/run_manager.py)
+# Each case's run executes once; SSE clients replay its event log and tail it.
+# Logs of this many recent cases stay in memory; older ones replay from Mongo.
+CASE_EVENT_LOG_MAX_CASES = int(os.getenv("CASE_EVENT_LOG_MAX_CASES", "200"))
+# Also persist agent_token deltas (high volume; agent_completed has the full text).
+# Enable when workers run in separate processes and clients should see tokens.
+CASE_EVENTS_PERSIST_TOKENS = os.getenv("CASE_EVENTS_PERSIST_TOKENS", "false").lower() == "true"
+# How often SSE clients poll case_events for a run executing in another process
+CASE_EVENTS_POLL_SECONDS = float(os.getenv("CASE_EVENTS_POLL_SECONDS", "0.5"))
+# GET /api/cases/{case_id} returns at most this many documents per section
+# (arguments, counterarguments, conflicts, agent_messages) and lists the
+# sections that were cut off under "truncated", so a case with a long
+# history stays far below MongoDB's 16MB aggregation result limit.
+CASE_DETAIL_MAX_ITEMS = int(os.getenv("CASE_DETAIL_MAX_ITEMS", "200"))
+# Case progress store (see services/progress_store.py)
+# "mongo" shares progress across API replicas and workers; "memory" keeps it
+# in this process only (a bounded LRU whose entries expire after the TTL).
+PROGRESS_STORE = os.getenv("PROGRESS_STORE", "mongo").lower()
+PROGRESS_MEMORY_MAX_CASES = int(os.getenv("PROGRESS_MEMORY_MAX_CASES", "1000"))
+PROGRESS_TTL_SECONDS = int(os.getenv("PROGRESS_TTL_SECONDS", "86400"))
+PROGRESS_BULK_MAX_CASES = int(os.getenv("PROGRESS_BULK_MAX_CASES", "500"))  # Per bulk status request
+# Cancel a case's analysis once no SSE client has watched it for this many
+# seconds (a reconnect within the grace period keeps it running). Counts the
+# clients of this API process only. 0 disables.
+ABANDONED_RUN_GRACE_SECONDS = float(os.getenv("ABANDONED_RUN_GRACE_SECONDS", "30"))
+
+# Analysis job queue and workers (see services/job_queue.py and worker.py)
+# With the queue enabled, creating a case enqueues its analysis and workers run
+# it. EMBEDDED_WORKERS starts worker slots inside the API process; set it to 0
+# on API replicas when analyses run in standalone `python worker.py` processes.
+ANALYSIS_JOB_QUEUE = os.getenv("ANALYSIS_JOB_QUEUE", "true").lower() == "true"
+EMBEDDED_WORKERS = int(os.getenv("EMBEDDED_WORKERS", "2"))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))  # Analyses per standalone worker
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1.0"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))  # Reclaimed if not renewed in time
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Admission control (see services/admission.py)
+# Bounds concurrent analyses globally and per client (X-Client-Id header, else
+# the caller's address). Workers only claim jobs within the running limits;
+# beyond the queue limits new analyses get 429 with a Retry-After estimate.
+# Without the job queue, analyses beyond the running limits are rejected.
+# 0 disables a limit.
+ADMISSION_MAX_RUNNING = int(os.getenv("ADMISSION_MAX_RUNNING", "8"))
+ADMISSION_MAX_RUNNING_PER_CLIENT = int(os.getenv("ADMISSION_MAX_RUNNING_PER_CLIENT", "2"))
+ADMISSION_MAX_QUEUED = int(os.getenv("ADMISSION_MAX_QUEUED", "100"))
+ADMISSION_MAX_QUEUED_PER_CLIENT = int(os.getenv("ADMISSION_MAX_QUEUED_PER_CLIENT", "10"))
+# Assumed analysis duration for wait estimates until runs have completed
+ADMISSION_DEFAULT_RUN_SECONDS = float(os.getenv("ADMISSION_DEFAULT_RUN_SECONDS", "90"))
+# How often SSE clients of a queued analysis get an analysis_queued update
+ADMISSION_QUEUE_EVENT_SECONDS = float(os.getenv("ADMISSION_QUEUE_EVENT_SECONDS", "5"))
+
+# Batch analysis (see services/batch_runner.py)
+# Cases uploaded as JSONL to POST /api/batches run as background work: their
+# jobs are claimed after interactive analyses, at most BATCH_CONCURRENCY of a
+# batch run at once, and agent tokens are not streamed.
+BATCH_MAX_CASES = int(os.getenv("BATCH_MAX_CASES", "1000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))  # Per batch
+BATCH_STREAM_TOKENS = os.getenv("BATCH_STREAM_TOKENS", "false").lower() == "true"
+# How often the NDJSON results stream checks for newly finished cases
+BATCH_RESULTS_POLL_SECONDS = float(os.getenv("BATCH_RESULTS_POLL_SECONDS", "2.0"))
@@ -4,7 +4,15 @@ MongoDB database connection and operations for Legal Strategy Council.
 This module manages the MongoDB connection and provides collection accessors.
 MongoDB is used as the coordination backbone for multi-agent collaboration,
 storing not just data but also agent runs, reasoning steps, and inter-agent messages.
+
+Two clients share the same database:
+
+- pymongo (`get_*_collection`), used by the analysis pipeline, workers and
+  other code that runs outside request handlers or in threads.
+- Motor (`get_async_*_collection`), used by FastAPI request handlers so a
+  database round trip never blocks the event loop and the SSE streams on it.
 """
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
 from pymongo import MongoClient
 from pymongo.database import Database
 from pymongo.collection import Collection
@@ -13,6 +21,8 @@ import config
 
 _client: Optional[MongoClient] = None
 _db: Optional[Database] = None
+_async_client: Optional[AsyncIOMotorClient] = None
+_async_db: Optional[AsyncIOMotorDatabase] = None
 
 
 def get_client() -> MongoClient:
@@ -91,98 +101,88 @@ def get_agent_messages_collection() -> Collection:
     return get_collection(config.COLLECTIONS["agent_messages"])
 
 
+def get_llm_cache_collection() -> Collection:
+    """LLM cache collection - persistent tier of the LLM response cache."""
+    return get_collection(config.COLLECTIONS["llm_cache"])
+
+
+def get_case_events_collection() -> Collection:
+    """Case events collection - replayable SSE event log of each case's analysis run."""
+    return get_collection(config.COLLECTIONS["case_events"])
+
+
+def get_analysis_jobs_collection() -> Collection:
+    """Analysis jobs collection - durable queue of case analyses claimed by workers."""
+    return get_collection(config.COLLECTIONS["analysis_jobs"])
+
+
+def get_case_progress_collection() -> Collection:
+    """Case progress collection - status of each case's analysis, shared across processes."""
+    return get_collection(config.COLLECTIONS["case_progress"])
+
+
+def get_batches_collection() -> Collection:
+    """Batches collection - bulk analysis batches and their cases."""
+    return get_collection(config.COLLECTIONS["batches"])
+
+
 # ============================================================================
-# Initialization
+# Async Access (Motor)
 # ============================================================================
 
-def _safe_create_index(collection, index_spec, **kwargs):
-    """Create an index, handling conflicts by dropping existing indexes first."""
-    try:
-        # Determine expected index name (MongoDB auto-generates if not specified)
-        if isinstance(index_spec, str):
-            expected_name = f"{index_spec}_1"  # MongoDB default naming for single field
-        elif isinstance(index_spec, list):
-            # Compound index - MongoDB generates name from keys
-            expected_name = "_".join([f"{k}_{v}" for k, v in index_spec])
-        else:
-            expected_name = None
-        
-        # Check if index with same name exists and drop it to avoid conflicts
-        if expected_name:
-            try:
-                existing_indexes = list(collection.list_indexes())
-                for existing_index in existing_indexes:
-                    existing_name = existing_index.get("name")
-                    if existing_name == expected_name:
-                        # Drop the existing index to recreate with correct properties
-                        collection.drop_index(existing_name)
-                        print(f"Dropped existing index {existing_name} on {collection.name} to recreate with correct properties")
-                        break
-            except Exception as list_error:
-                # If we can't list indexes, continue anyway
-                pass
-        
-        # Create the index
-        collection.create_index(index_spec, **kwargs)
-    except Exception as e:
-        # Index might already exist with same properties or other error - not critical
-        error_msg = str(e)
-        if "IndexKeySpecsConflict" in error_msg:
-            # Try to drop and recreate
-            try:
-                if expected_name:
-                    collection.drop_index(expected_name)
-                    collection.create_index(index_spec, **kwargs)
-                    print(f"Resolved index conflict for {expected_name} on {collection.name}")
-            except Exception as retry_error:
-                print(f"Note: Could not resolve index conflict for {index_spec} on {collection.name}: {retry_error}")
-        elif "already exists" not in error_msg.lower():
-            print(f"Note: Index {index_spec} on {collection.name}: {e}")
+def get_async_client() -> AsyncIOMotorClient:
+    """Get or create the Motor client (bound to the running event loop on first use)."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncIOMotorClient(config.MONGODB_URI)
+    return _async_client
 
 
-def init_collections():
-    """Initialize collections with indexes.
+def get_async_database() -> AsyncIOMotorDatabase:
+    """Get the database instance for async access."""
+    global _async_db
+    if _async_db is None:
+        _async_db = get_async_client()[config.DATABASE_NAME]
+    return _async_db
+
+
+def get_async_collection(collection_name: str) -> AsyncIOMotorCollection:
+    """Get a specific collection for async access."""
+    return get_async_database()[collection_name]
 
-    This creates all required collections and indexes for the legal strategy system.
-    Indexes improve query performance and enforce uniqueness where needed.
-    """
-    db = get_database()
 
-    # Cases collection
-    _safe_create_index(db[config.COLLECTIONS["cases"]], "case_id", unique=True)
+def close_async_connection():
+    """Close the Motor connection."""
+    global _async_client, _async_db
+    if _async_client is not None:
+        _async_client.close()
+        _async_client = None
+        _async_db = None
 
-    # Arguments collection (Harvey, Louis)
-    _safe_create_index(db[config.COLLECTIONS["arguments"]], "case_id")
-    _safe_create_index(db[config.COLLECTIONS["arguments"]], "argument_id", unique=True)
-    _safe_create_index(db[config.COLLECTIONS["arguments"]], "agent")
 
-    # Counterarguments collection (Tanner)
-    _safe_create_index(db[config.COLLECTIONS["counterarguments"]], "case_id")
-    _safe_create_index(db[config.COLLECTIONS["counterarguments"]], "counterargument_id", unique=True)
+def get_async_cases_collection() -> AsyncIOMotorCollection:
+    """Cases collection (async)."""
+    return get_async_collection(config.COLLECTIONS["cases"])
 
-    # Conflicts collection
-    _safe_create_index(db[config.COLLECTIONS["conflicts"]], "case_id")
-    _safe_create_index(db[config.COLLECTIONS["conflicts"]], "conflict_id", unique=True)
 
-    # Strategies collection (Jessica)
-    _safe_create_index(db[config.COLLECTIONS["strategies"]], "case_id")
-    _safe_create_index(db[config.COLLECTIONS["strategies"]], "strategy_id", unique=True)
-    _safe_create_index(db[config.COLLECTIONS["strategies"]], [("case_id", 1), ("version", -1)])
+def get_async_case_progress_collection() -> AsyncIOMotorCollection:
+    """Case progress collection (async)."""
+    return get_async_collection(config.COLLECTIONS["case_progress"])
 
-    # Agent runs collection - for tracking agent executions
-    _safe_create_index(db[config.COLLECTIONS["agent_runs"]], "run_id", unique=True)
-    _safe_create_index(db[config.COLLECTIONS["agent_runs"]], "case_id")
-    _safe_create_index(db[config.COLLECTIONS["agent_runs"]], "agent")
 
-    # Reasoning steps collection - step-by-step traces
-    _safe_create_index(db[config.COLLECTIONS["reasoning_steps"]], "step_id", unique=True)
-    _safe_create_index(db[config.COLLECTIONS["reasoning_steps"]], "run_id")
+# ============================================================================
+# Initialization
+# ============================================================================
 
-    # Agent messages collection - inter-agent communication
-    _safe_create_index(db[config.COLLECTIONS["agent_messages"]], "message_id", unique=True)
-    _safe_create_index(db[config.COLLECTIONS["agent_messages"]], "case_id")
-    _safe_create_index(db[config.COLLECTIONS["agent_messages"]], [("sender", 1), ("recipient", 1)])
+def init_collections():
+    """Bring collection indexes up to date.
+
+    Creates the indexes the legal strategy system needs, or only the ones that
+    changed since the recorded schema version (see migrations.py).
+    """
+    import migrations  # Imports this module
 
+    migrations.migrate()
     print("Collections initialized.")
 
 
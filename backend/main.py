@@ -20,18 +20,27 @@ The application uses MongoDB as the coordination backbone, with each agent
 writing to MongoDB collections that other agents can read from.
 """
 import asyncio
-from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File
+from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sse_starlette.sse import EventSourceResponse
 from pydantic import BaseModel
 from typing import Optional, List
 import json
 import io
 import PyPDF2
-from agents.base_agent import BaseAgent
 
-from models.schemas import CaseCreate, CaseResponse
+from models.schemas import CaseCreate, CaseResponse, CaseProgressQuery
 from services.orchestrator import get_orchestrator
+from services.run_manager import get_run_manager
+from services.admission import AdmissionRejected, get_controller
+from services.batch_runner import get_batch_runner
+from services.progress_store import get_progress_store
+from services.trace_writer import get_trace_writer
+from services.mongo_utils import list_cases_async, delete_case_data_async, parse_case_fields
+from services.worker import AnalysisWorker
+from services import llm_client, llm_cache, rate_limiter, retry_policy
+import config
 import database
 
 # Initialize FastAPI application
@@ -51,14 +60,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store for tracking active analysis tasks
-# Maps case_id to background task handles
-_active_tasks: dict = {}
+# Analysis worker slots embedded in the API process (config.EMBEDDED_WORKERS)
+_embedded_worker: Optional[AnalysisWorker] = None
+# Background index migration started on startup (see migrations.py)
+_migration_task: Optional[asyncio.Task] = None
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database connection on startup."""
+def _init_collections():
     try:
         database.init_collections()
         print("Database collections initialized successfully")
@@ -66,10 +74,44 @@ async def startup_event():
         print(f"Warning: Could not initialize database: {e}")
 
 
+@app.on_event("startup")
+async def startup_event():
+    """Start index migrations in the background and embedded analysis workers on startup."""
+    global _embedded_worker, _migration_task
+    # Index builds can take a while on large collections; serve requests meanwhile
+    _migration_task = asyncio.create_task(asyncio.to_thread(_init_collections))
+
+    if config.ANALYSIS_JOB_QUEUE and config.EMBEDDED_WORKERS > 0:
+        _embedded_worker = AnalysisWorker(concurrency=config.EMBEDDED_WORKERS)
+        _embedded_worker.start()
+
+
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Close database connection on shutdown."""
+    """Stop embedded workers, drain queued trace writes, then close database connection and the shared LLM client."""
+    if _embedded_worker is not None:
+        # Unfinished jobs are reclaimed by another worker once their lease expires
+        await _embedded_worker.stop(timeout=5)
+    await asyncio.to_thread(get_trace_writer().close)
+    await llm_client.close_client()
     database.close_connection()
+    database.close_async_connection()
+
+
+def _client_id(request: Request) -> Optional[str]:
+    """Client an analysis is admitted for: the X-Client-Id header, else the caller's address."""
+    client_id = request.headers.get("x-client-id")
+    if client_id:
+        return client_id
+    return request.client.host if request.client else None
+
+
+async def _admit(client_id: Optional[str]):
+    """Apply admission limits to a new analysis; 429 with Retry-After when over them."""
+    try:
+        await asyncio.to_thread(get_controller().admit, client_id)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
 
 @app.get("/")
@@ -88,6 +130,26 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/api/llm/stats")
+async def llm_stats():
+    """LLM layer metrics for this process (backend, cache, rate limiter, retries and breaker)."""
+    return {
+        "backend": llm_client.backend_stats(),
+        "cache": llm_cache.get_cache().stats(),
+        "rate_limiter": rate_limiter.get_limiter().stats(),
+        "retry": retry_policy.all_stats()
+    }
+
+
+@app.get("/api/admission/stats")
+async def admission_stats():
+    """Running and queued analyses, overall and per client, with the admission limits."""
+    try:
+        return await asyncio.to_thread(get_controller().stats)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading admission stats: {str(e)}")
+
+
 @app.post("/api/cases/process-documents")
 async def process_documents(files: List[UploadFile] = File(...)):
     """
@@ -144,9 +206,6 @@ async def process_documents(files: List[UploadFile] = File(...)):
         
         # Use LLM to extract structured case information
         try:
-            # Create a temporary agent instance to use the LLM
-            temp_agent = BaseAgent(name="DocumentProcessor", system_prompt="You are a legal document processor.")
-            
             # Limit to first 10000 chars to avoid token limits
             limited_text = combined_text[:10000]
             
@@ -177,8 +236,11 @@ IMPORTANT:
 - For moneyAtStake, extract only the numeric value (remove $ and commas)
 - For caseType and jurisdiction, try to match the provided options"""
             
-            # Get LLM response
-            response = temp_agent.think(extraction_prompt)
+            # Get LLM response via the shared async client
+            response = await llm_client.chat_completion(
+                system_prompt="You are a legal document processor.",
+                prompt=extraction_prompt
+            )
             print(f"LLM Response (first 500 chars): {response[:500]}")
         except Exception as llm_error:
             print(f"LLM extraction failed: {str(llm_error)}")
@@ -500,26 +562,31 @@ IMPORTANT:
 
 
 @app.post("/api/cases", response_model=dict)
-async def create_case(case_data: CaseCreate, background_tasks: BackgroundTasks):
+async def create_case(case_data: CaseCreate, background_tasks: BackgroundTasks, request: Request):
     """
     Create a new case and trigger the multi-agent analysis.
     Returns the case_id immediately while analysis runs in background.
+
+    The analysis is enqueued right away (or started, without the job queue),
+    so work begins before the client connects to the stream. Over the
+    admission limits (services/admission.py) the case is not created and
+    429 is returned with a Retry-After header.
     """
+    client_id = _client_id(request)
+    await _admit(client_id)
+
     orchestrator = get_orchestrator()
 
     # Create the case in MongoDB
-    case = orchestrator.create_case(
+    case = await asyncio.to_thread(
+        orchestrator.create_case,
         title=case_data.title,
         facts=case_data.facts,
         jurisdiction=case_data.jurisdiction,
         stakes=case_data.stakes
     )
 
-    # Mark case as active for SSE streaming
-    _active_tasks[case.case_id] = {
-        "status": "pending",
-        "events": []
-    }
+    await get_run_manager().ensure_started(case.case_id, client_id)
 
     return {
         "case_id": case.case_id,
@@ -530,36 +597,198 @@ async def create_case(case_data: CaseCreate, background_tasks: BackgroundTasks):
 
 
 @app.get("/api/cases/{case_id}/stream")
-async def stream_case_analysis(case_id: str):
+async def stream_case_analysis(case_id: str, request: Request):
     """
     SSE endpoint that streams agent updates in real-time.
-    Events: agent_started, agent_completed, conflict_detected, strategy_ready, error
+    Events: agent_started, agent_token, agent_completed, conflict_detected, strategy_ready, error
+
+    The analysis runs once per case in the background (see services/run_manager.py);
+    this endpoint replays its event log from the Last-Event-ID header and then
+    tails live events, so reconnects and extra tabs don't start a new run.
     """
     orchestrator = get_orchestrator()
 
     # Check if case exists
-    case = orchestrator._get_case(case_id)
+    case = await orchestrator.get_case_async(case_id)
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
 
+    last_event_id = request.headers.get("last-event-id")
+
     async def event_generator():
-        """Generate SSE events from the orchestrator."""
+        """Generate SSE events from the case's event log."""
+        events = get_run_manager().subscribe(case_id, last_event_id)
         try:
-            async for event in orchestrator.run_analysis(case_id):
+            async for event in events:
                 yield event
         except Exception as e:
-            yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
+            yield {"event": "error", "data": json.dumps({"message": str(e)})}
+        finally:
+            # Close the subscription right away on disconnect, so an abandoned
+            # run is detected (see RunManager)
+            await events.aclose()
 
     return EventSourceResponse(event_generator())
 
 
+@app.post("/api/cases/progress")
+async def get_cases_progress(query: CaseProgressQuery):
+    """
+    Get the analysis progress of many cases in one request.
+    Cases without recorded progress are listed under "missing".
+    """
+    if len(query.case_ids) > config.PROGRESS_BULK_MAX_CASES:
+        raise HTTPException(status_code=400, detail=f"At most {config.PROGRESS_BULK_MAX_CASES} case IDs per request")
+    progress = await get_progress_store().get_many_async(query.case_ids)
+    return {
+        "cases": progress,
+        "missing": [case_id for case_id in query.case_ids if case_id not in progress]
+    }
+
+
+@app.get("/api/cases/{case_id}/progress")
+async def get_case_progress(case_id: str):
+    """
+    Get a case's analysis progress: status, current agent and phase, and
+    completed stages. A cheap alternative to holding the SSE stream open.
+    """
+    progress = await get_progress_store().get_async(case_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="No progress recorded for case")
+    return progress
+
+
+@app.delete("/api/cases/{case_id}/run")
+async def cancel_case_analysis(case_id: str):
+    """
+    Cancel a case's queued or running analysis.
+    No further stages are scheduled, in-flight LLM requests are cancelled and
+    the case's unfinished agent runs are marked cancelled. Stream clients get
+    an analysis_cancelled event; /resume continues from the last completed stage.
+    """
+    orchestrator = get_orchestrator()
+
+    # Check if case exists
+    case = await orchestrator.get_case_async(case_id)
+    if not case:
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    if not await get_run_manager().cancel(case_id, "cancelled_by_user"):
+        raise HTTPException(status_code=409, detail="Analysis is not running")
+    return {"case_id": case_id, "status": "cancelled"}
+
+
+@app.post("/api/cases/{case_id}/resume")
+async def resume_case_analysis(case_id: str, request: Request):
+    """
+    Re-run a case's analysis after it failed or was interrupted.
+    Stages that completed before are restored from the case's checkpoint;
+    only the remaining ones run. Progress is streamed on /api/cases/{case_id}/stream.
+    """
+    orchestrator = get_orchestrator()
+
+    # Check if case exists
+    case = await orchestrator.get_case_async(case_id)
+    if not case:
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    client_id = _client_id(request)
+    if not get_run_manager().is_running(case_id):
+        await _admit(client_id)
+    await get_run_manager().resume(case_id, client_id)
+    return {
+        "case_id": case_id,
+        "status": "resuming",
+        "completed_stages": list((case.get("checkpoint") or {}).get("stages", {}))
+    }
+
+
+@app.post("/api/batches")
+async def create_batch(request: Request, file: UploadFile = File(...)):
+    """
+    Create a batch of cases from a JSONL upload and analyze them in the background.
+    Each line is a case object with title, facts, jurisdiction and stakes.
+
+    Batches run with throughput-oriented settings (see services/batch_runner.py):
+    bounded parallelism, lower priority than interactive analyses and no
+    token streaming. Poll /api/batches/{batch_id} for progress or read
+    /api/batches/{batch_id}/results for NDJSON results as cases complete.
+    """
+    try:
+        lines = (await file.read()).decode("utf-8").splitlines()
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Upload must be UTF-8 encoded JSONL")
+
+    cases: List[CaseCreate] = []
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            cases.append(CaseCreate(**json.loads(line)))
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid case on line {number}: {str(e)}")
+
+    if not cases:
+        raise HTTPException(status_code=400, detail="No cases in upload")
+    if len(cases) > config.BATCH_MAX_CASES:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {config.BATCH_MAX_CASES} cases")
+
+    batch = await get_batch_runner().create_batch(cases, _client_id(request))
+    return {
+        "batch_id": batch["batch_id"],
+        "total": batch["total"],
+        "case_ids": batch["case_ids"],
+        "status": batch["status"],
+        "message": "Batch created. Poll /api/batches/{batch_id} for progress or read /api/batches/{batch_id}/results."
+    }
+
+
+@app.get("/api/batches/{batch_id}")
+async def get_batch_progress(batch_id: str):
+    """Get a batch's progress: completed, failed and pending analyses."""
+    progress = await asyncio.to_thread(get_batch_runner().progress, batch_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return progress
+
+
+@app.get("/api/batches/{batch_id}/results")
+async def stream_batch_results(batch_id: str):
+    """
+    Stream a batch's results as NDJSON, one line per case as it completes
+    (cases finished earlier first). The response ends when every case is done.
+    """
+    batch_runner = get_batch_runner()
+    if not await asyncio.to_thread(batch_runner.get_batch, batch_id):
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    async def result_lines():
+        async for result in batch_runner.stream_results(batch_id):
+            yield json.dumps(result, default=str) + "\n"
+
+    return StreamingResponse(result_lines(), media_type="application/x-ndjson")
+
+
 @app.get("/api/cases/{case_id}")
-async def get_case(case_id: str):
+async def get_case(case_id: str, fields: Optional[str] = None):
     """
-    Get full case with all arguments, counterarguments, conflicts, and strategy.
+    Get full case with all arguments, counterarguments, conflicts, strategy and agent messages.
+
+    `fields` selects what to return as comma-separated sections (case,
+    arguments, counterarguments, conflicts, strategy, agent_messages),
+    optionally narrowed to fields of their documents, e.g.
+    `?fields=case.title,case.status,strategy.final_strategy`. A malformed
+    field path returns 400. List sections hold at most
+    config.CASE_DETAIL_MAX_ITEMS documents; cut-off sections are listed
+    under "truncated".
     """
+    try:
+        selected = parse_case_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     orchestrator = get_orchestrator()
-    result = orchestrator.get_case_with_details(case_id)
+    result = await orchestrator.get_case_with_details_async(case_id, selected)
 
     if not result:
         raise HTTPException(status_code=404, detail="Case not found")
@@ -573,11 +802,11 @@ async def get_case_arguments(case_id: str):
     orchestrator = get_orchestrator()
 
     # Check if case exists
-    case = orchestrator._get_case(case_id)
+    case = await orchestrator.get_case_async(case_id)
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
 
-    arguments = orchestrator.get_arguments(case_id)
+    arguments = await orchestrator.get_arguments_async(case_id)
     return {"case_id": case_id, "arguments": arguments}
 
 
@@ -587,11 +816,11 @@ async def get_case_conflicts(case_id: str):
     orchestrator = get_orchestrator()
 
     # Check if case exists
-    case = orchestrator._get_case(case_id)
+    case = await orchestrator.get_case_async(case_id)
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
 
-    conflicts = orchestrator.get_conflicts(case_id)
+    conflicts = await orchestrator.get_conflicts_async(case_id)
     return {"case_id": case_id, "conflicts": conflicts}
 
 
@@ -601,11 +830,11 @@ async def get_case_strategy(case_id: str):
     orchestrator = get_orchestrator()
 
     # Check if case exists
-    case = orchestrator._get_case(case_id)
+    case = await orchestrator.get_case_async(case_id)
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
 
-    strategy = orchestrator.get_strategy(case_id)
+    strategy = await orchestrator.get_strategy_async(case_id)
     if not strategy:
         return {
             "case_id": case_id,
@@ -621,23 +850,19 @@ async def get_case_strategy(case_id: str):
 @app.get("/api/cases")
 async def list_cases():
     """List all cases (for debugging/admin purposes)."""
-    cases_collection = database.get_cases_collection()
-    cases = list(cases_collection.find().sort("created_at", -1).limit(20))
-    for case in cases:
-        if "_id" in case:
-            del case["_id"]
+    cases = await list_cases_async(limit=20)
     return {"cases": cases}
 
 
 @app.delete("/api/cases/{case_id}")
 async def delete_case(case_id: str):
     """Delete a case and all associated data."""
+    await get_run_manager().cancel(case_id, "case_deleted")
+
     # Delete from all collections
-    database.get_cases_collection().delete_many({"case_id": case_id})
-    database.get_arguments_collection().delete_many({"case_id": case_id})
-    database.get_counterarguments_collection().delete_many({"case_id": case_id})
-    database.get_conflicts_collection().delete_many({"case_id": case_id})
-    database.get_strategies_collection().delete_many({"case_id": case_id})
+    await delete_case_data_async(case_id)
+    await get_progress_store().delete_async(case_id)
+    get_run_manager().forget(case_id)
 
     return {"message": f"Case {case_id} and all associated data deleted"}
 
@@ -0,0 +1,408 @@
+"""
+Index migrations for Legal Strategy Council.
+
+Declares the indexes every collection should have and brings the database in
+line with them. Unlike dropping and recreating every index on each startup,
+a migration only touches what differs:
+
+- Each desired index is compared with the existing ones by key pattern and
+  options (unique, sparse, TTL, partial filter). Matching indexes are left
+  alone; missing ones are created; ones whose options changed are rebuilt,
+  except a changed TTL, which is updated in place with collMod.
+- Indexes superseded by a newer one (DROPPED_INDEXES) are dropped only once
+  their replacement exists, so reads always have an index.
+- A rebuild has to drop the old index first (two indexes cannot share a key
+  pattern); it is skipped if a new unique index would reject existing
+  documents, and the old index is restored if the build fails.
+- Indexes not declared here (e.g. added by hand) are reported, never dropped.
+- Data that would keep an index from being built is fixed first
+  (DATA_FIXES), e.g. duplicate strategy versions before the unique
+  (case_id, version) index.
+
+Applied migrations are recorded in the `migrations` collection with
+SCHEMA_VERSION and a hash of the desired specs, only when every step
+succeeded; when both match, startup skips the comparison entirely, and
+otherwise the failed steps are retried on the next startup. The API and the standalone worker run the
+migration in a background thread, so startup does not wait for index builds.
+
+Run manually (e.g. before a deploy) with:
+
+    python migrations.py [--dry-run] [--force]
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import hashlib
+import json
+import config
+import database
+from services.mongo_utils import strategy_counter_id
+
+# Bump when the declared indexes change
+SCHEMA_VERSION = 3
+
+# Options that distinguish two indexes on the same keys
+INDEX_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+# Indexes superseded by a compound index with the same prefix:
+# (collection, index name) -> name of the replacement
+DROPPED_INDEXES = {
+    ("reasoning_steps", "run_id_1"): "run_id_1_created_at_1",
+    ("agent_messages", "case_id_1"): "case_id_1_created_at_1",
+    ("strategies", "case_id_1"): "case_id_1_version_-1",
+}
+
+
+def _index(collection: str, keys, **options) -> Dict[str, Any]:
+    """An index declaration: collection key, [(field, direction)] and options."""
+    if isinstance(keys, str):
+        keys = [(keys, 1)]
+    return {
+        "collection": collection,
+        "keys": [(field, direction) for field, direction in keys],
+        "options": options,
+        "name": "_".join(f"{field}_{direction}" for field, direction in keys)
+    }
+
+
+def desired_indexes() -> List[Dict[str, Any]]:
+    """The indexes every collection should have."""
+    return [
+        # Cases collection
+        _index("cases", "case_id", unique=True),
+
+        # Arguments collection (Harvey, Louis)
+        _index("arguments", "case_id"),
+        _index("arguments", "argument_id", unique=True),
+        _index("arguments", "agent"),
+
+        # Counterarguments collection (Tanner)
+        _index("counterarguments", "case_id"),
+        _index("counterarguments", "counterargument_id", unique=True),
+
+        # Conflicts collection
+        _index("conflicts", "case_id"),
+        _index("conflicts", "conflict_id", unique=True),
+
+        # Strategies collection (Jessica)
+        # Versions are unique per case; the latest is the first entry of the index
+        _index("strategies", "strategy_id", unique=True),
+        _index("strategies", [("case_id", 1), ("version", -1)], unique=True),
+
+        # Agent runs collection - for tracking agent executions
+        _index("agent_runs", "run_id", unique=True),
+        _index("agent_runs", "case_id"),
+        _index("agent_runs", "agent"),
+
+        # Reasoning steps collection - step-by-step traces, read per run in order
+        _index("reasoning_steps", "step_id", unique=True),
+        _index("reasoning_steps", [("run_id", 1), ("created_at", 1)]),
+
+        # Agent messages collection - inter-agent communication, read per case in order
+        _index("agent_messages", "message_id", unique=True),
+        _index("agent_messages", [("case_id", 1), ("created_at", 1)]),
+        _index("agent_messages", [("sender", 1), ("recipient", 1)]),
+
+        # LLM cache collection - entries expire via TTL index
+        _index("llm_cache", "key", unique=True),
+        _index("llm_cache", "created_at", expireAfterSeconds=config.LLM_CACHE_TTL_SECONDS),
+
+        # Case events collection - replayed in sequence order per case
+        _index("case_events", [("case_id", 1), ("seq", 1)], unique=True),
+
+        # Analysis jobs collection - one job per case, claimed by status and availability
+        _index("analysis_jobs", "case_id", unique=True),
+        _index("analysis_jobs", "job_id", unique=True),
+        _index("analysis_jobs", [("status", 1), ("available_at", 1)]),
+        _index("analysis_jobs", [("status", 1), ("lease_expires_at", 1)]),
+        _index("analysis_jobs", [("client_id", 1), ("status", 1)]),
+        _index("analysis_jobs", [("status", 1), ("priority", 1), ("available_at", 1)]),
+        _index("analysis_jobs", [("batch_id", 1), ("status", 1)]),
+
+        # Case progress collection - one document per case
+        _index("case_progress", "case_id", unique=True),
+
+        # Batches collection
+        _index("batches", "batch_id", unique=True),
+    ]
+
+
+# ============================================================================
+# Planning
+# ============================================================================
+
+def _options(index: Dict[str, Any]) -> Dict[str, Any]:
+    """The options of an existing or desired index that matter for comparison."""
+    options = {key: index[key] for key in INDEX_OPTIONS if key in index}
+    # unique=False / sparse=False are the defaults
+    return {key: value for key, value in options.items() if value is not False}
+
+
+def plan(db=None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Compare the desired indexes with the existing ones.
+
+    Returns:
+        Dict of steps: "create" (missing), "rebuild" (options changed),
+        "update_ttl" (only the TTL changed), "drop" (superseded),
+        "unchanged" and "unknown" (existing but not declared)
+    """
+    db = db if db is not None else database.get_database()
+    steps = {key: [] for key in ("create", "rebuild", "update_ttl", "drop", "unchanged", "unknown")}
+    existing: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    desired = desired_indexes()
+
+    for collection in sorted({index["collection"] for index in desired}):
+        existing[collection] = {
+            index["name"]: index
+            for index in db[config.COLLECTIONS[collection]].list_indexes()
+        }
+
+    for index in desired:
+        current = existing[index["collection"]]
+        # Match by key pattern, so an index created under another name still counts
+        match = next(
+            (found for found in current.values() if list(found["key"].items()) == index["keys"]),
+            None
+        )
+        if match is None:
+            steps["create"].append(index)
+            continue
+        step = {**index, "existing_name": match["name"], "existing_options": _options(match)}
+        have, want = _options(match), _options(index["options"])
+        if have == want:
+            steps["unchanged"].append(step)
+        elif ({k: v for k, v in have.items() if k != "expireAfterSeconds"}
+              == {k: v for k, v in want.items() if k != "expireAfterSeconds"}
+              and "expireAfterSeconds" in have and "expireAfterSeconds" in want):
+            steps["update_ttl"].append(step)
+        else:
+            steps["rebuild"].append(step)
+
+    declared = {(step["collection"], step.get("existing_name", step["name"]))
+                for key in ("create", "rebuild", "update_ttl", "unchanged") for step in steps[key]}
+    for collection, indexes in existing.items():
+        for name in indexes:
+            if name == "_id_" or (collection, name) in declared:
+                continue
+            if (collection, name) in DROPPED_INDEXES:
+                steps["drop"].append({"collection": collection, "name": name,
+                                      "replacement": DROPPED_INDEXES[(collection, name)]})
+            else:
+                steps["unknown"].append({"collection": collection, "name": name})
+    return steps
+
+
+# ============================================================================
+# Applying
+# ============================================================================
+
+def _create(db, index: Dict[str, Any]):
+    # background=True only matters before MongoDB 4.2; newer servers always
+    # build without holding the collection lock for the whole build
+    db[config.COLLECTIONS[index["collection"]]].create_index(
+        index["keys"], name=index["name"], background=True, **index["options"]
+    )
+
+
+def _duplicates(db, index: Dict[str, Any]) -> int:
+    """Number of key values shared by several documents (which a unique index would reject)."""
+    group = {field: f"${field}" for field, _ in index["keys"]}
+    rows = db[config.COLLECTIONS[index["collection"]]].aggregate([
+        {"$group": {"_id": group, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$count": "duplicates"}
+    ], allowDiskUse=True)
+    return next(iter(rows), {}).get("duplicates", 0)
+
+
+def apply(steps: Dict[str, List[Dict[str, Any]]], db=None) -> Tuple[List[str], List[str]]:
+    """
+    Execute a plan. Superseded indexes are only dropped once their replacement exists.
+
+    Returns:
+        Descriptions of the changes made, and of the steps that failed
+    """
+    db = db if db is not None else database.get_database()
+    changes, failures = [], []
+    failed = set()  # (collection, index name) not built as declared
+
+    def fail(index: Dict[str, Any], message: str):
+        print(f"Warning: {message}")
+        failures.append(message)
+        failed.add((index["collection"], index["name"]))
+
+    for index in steps["create"]:
+        try:
+            _create(db, index)
+            changes.append(f"created {index['collection']}.{index['name']}")
+        except Exception as e:
+            fail(index, f"Could not create index {index['name']} on {index['collection']}: {e}")
+
+    for index in steps["update_ttl"]:
+        ttl = index["options"]["expireAfterSeconds"]
+        try:
+            db.command(
+                "collMod", config.COLLECTIONS[index["collection"]],
+                index={"name": index["existing_name"], "expireAfterSeconds": ttl}
+            )
+            changes.append(f"set TTL of {index['collection']}.{index['existing_name']} to {ttl}s")
+        except Exception as e:
+            print(f"Warning: Could not update TTL of {index['existing_name']} on {index['collection']}, rebuilding: {e}")
+            steps["rebuild"].append(index)
+
+    for index in steps["rebuild"]:
+        # Same keys with other options: the old index has to go first, so
+        # make sure the new one can be built and restore the old one if not
+        collection = db[config.COLLECTIONS[index["collection"]]]
+        try:
+            if index["options"].get("unique"):
+                duplicates = _duplicates(db, index)
+                if duplicates:
+                    fail(index, f"Could not rebuild index {index['name']} on {index['collection']} as unique: "
+                                f"{duplicates} duplicate keys (old index kept)")
+                    continue
+            collection.drop_index(index["existing_name"])
+        except Exception as e:
+            fail(index, f"Could not rebuild index {index['name']} on {index['collection']}: {e}")
+            continue
+        try:
+            _create(db, index)
+            changes.append(f"rebuilt {index['collection']}.{index['name']}")
+        except Exception as e:
+            fail(index, f"Could not rebuild index {index['name']} on {index['collection']}: {e}")
+            try:
+                collection.create_index(index["keys"], name=index["existing_name"], background=True,
+                                        **index["existing_options"])
+            except Exception as restore_error:
+                print(f"Warning: Could not restore index {index['existing_name']} on {index['collection']}: {restore_error}")
+
+    for index in steps["drop"]:
+        if (index["collection"], index["replacement"]) in failed:
+            fail(index, f"Kept index {index['name']} on {index['collection']}: "
+                        f"its replacement {index['replacement']} was not built")
+            continue
+        try:
+            db[config.COLLECTIONS[index["collection"]]].drop_index(index["name"])
+            changes.append(f"dropped {index['collection']}.{index['name']}")
+        except Exception as e:
+            fail(index, f"Could not drop index {index['name']} on {index['collection']}: {e}")
+
+    for index in steps["unknown"]:
+        print(f"Note: Index {index['name']} on {index['collection']} is not declared in migrations.py (left in place)")
+    return changes, failures
+
+
+# ============================================================================
+# Data Fixes (run before the index that needs them is built)
+# ============================================================================
+
+def _renumber_strategy_versions(db) -> int:
+    """
+    Renumber the strategies of cases with duplicate versions (from the old
+    count-based allocation) as 1..n in write order, so the unique
+    (case_id, version) index can be built, and advance their version counters.
+
+    Returns:
+        Number of cases renumbered
+    """
+    strategies = db[config.COLLECTIONS["strategies"]]
+    counters = db[config.COLLECTIONS["counters"]]
+    cases = strategies.aggregate([
+        {"$group": {"_id": {"case_id": "$case_id", "version": "$version"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$group": {"_id": "$_id.case_id"}}
+    ], allowDiskUse=True)
+    renumbered = 0
+    for row in cases:
+        case_id = row["_id"]
+        docs = list(strategies.find({"case_id": case_id}, {"_id": 1}).sort(
+            [("version", 1), ("created_at", 1), ("_id", 1)]
+        ))
+        for version, doc in enumerate(docs, start=1):
+            strategies.update_one({"_id": doc["_id"]}, {"$set": {"version": version}})
+        counters.update_one(
+            {"_id": strategy_counter_id(case_id)},
+            {"$max": {"seq": len(docs)}, "$setOnInsert": {"case_id": case_id}},
+            upsert=True
+        )
+        print(f"Renumbered {len(docs)} strategy versions of case {case_id}")
+        renumbered += 1
+    return renumbered
+
+
+# Data fixes to run before building an index: (collection, index name) -> fix(db)
+DATA_FIXES = {
+    ("strategies", "case_id_1_version_-1"): _renumber_strategy_versions,
+}
+
+
+def spec_hash() -> str:
+    """Fingerprint of the desired indexes (changes with e.g. the LLM cache TTL)."""
+    specs = json.dumps(desired_indexes(), sort_keys=True, default=str)
+    return hashlib.sha256(specs.encode()).hexdigest()[:16]
+
+
+def migrate(force: bool = False, dry_run: bool = False) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """
+    Bring the indexes up to date and record the schema version.
+
+    Args:
+        force: Compare indexes even if the recorded version and specs match
+        dry_run: Only print the plan
+
+    Returns:
+        The executed plan, or None if the indexes were already up to date
+    """
+    db = database.get_database()
+    migrations = db[config.COLLECTIONS["migrations"]]
+    fingerprint = spec_hash()
+    record = migrations.find_one({"_id": "indexes"})
+    if (not force and record and record.get("version") == SCHEMA_VERSION
+            and record.get("spec_hash") == fingerprint):
+        print(f"Indexes up to date (schema version {SCHEMA_VERSION})")
+        return None
+
+    steps = plan(db)
+    if dry_run:
+        for key in ("create", "rebuild", "update_ttl", "drop", "unknown"):
+            for index in steps[key]:
+                print(f"{key}: {index['collection']}.{index['name']}")
+        return steps
+
+    for index in steps["create"] + steps["rebuild"]:
+        fix = DATA_FIXES.get((index["collection"], index["name"]))
+        if fix:
+            fix(db)
+    changes, failures = apply(steps, db)
+    previous = record.get("version") if record else None
+    if failures:
+        # Not recorded: the next startup compares the indexes again and retries
+        print(f"Index migration to schema version {SCHEMA_VERSION} incomplete: "
+              f"{len(changes)} changes, {len(failures)} failed (retried on next startup)")
+        return steps
+
+    migrations.update_one(
+        {"_id": "indexes"},
+        {"$set": {
+            "version": SCHEMA_VERSION,
+            "spec_hash": fingerprint,
+            "changes": changes,
+            "applied_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+    print(f"Migrated indexes from schema version {previous} to {SCHEMA_VERSION}: "
+          f"{len(changes)} changes, {len(steps['unchanged'])} unchanged")
+    for change in changes:
+        print(f"  {change}")
+    return steps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bring the Legal Strategy Council indexes up to date")
+    parser.add_argument("--dry-run", action="store_true", help="Only print what would change")
+    parser.add_argument("--force", action="store_true",
+                        help="Compare indexes even if the recorded schema version is current")
+    args = parser.parse_args()
+    migrate(force=args.force, dry_run=args.dry_run)
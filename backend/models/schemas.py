@@ -19,6 +19,10 @@ class CaseCreate(BaseModel):
     stakes: str
 
 
+class CaseProgressQuery(BaseModel):
+    case_ids: List[str]
+
+
 class CaseResponse(BaseModel):
     case_id: str
     title: str
@@ -0,0 +1,221 @@
+"""
+Admission control for case analyses.
+
+Every analysis holds LLM quota and worker capacity for minutes, so the number
+running at once is bounded, globally and per client (config.ADMISSION_*):
+
+- Running limits: workers only claim a job while fewer than
+  ADMISSION_MAX_RUNNING analyses run overall, and skip clients that already
+  have ADMISSION_MAX_RUNNING_PER_CLIENT running. Excess analyses wait in the
+  job queue; their SSE streams report the queue position and estimated wait
+  (`analysis_queued` events).
+- Queue limits: once ADMISSION_MAX_QUEUED analyses are waiting overall, or
+  ADMISSION_MAX_QUEUED_PER_CLIENT for one client, new analyses are rejected
+  with 429 and a Retry-After estimate instead of queueing without bound.
+
+Batch jobs (services/batch_runner.py) are admitted per batch instead: they
+don't count against the queue limits or a client's running limit, and at most
+config.BATCH_CONCURRENCY jobs of one batch run at once.
+
+Limits count jobs in the analysis_jobs collection, so they hold across API
+replicas and worker processes (checks are not transactional, so concurrent
+claims can overshoot a limit briefly). Only running jobs with a live lease
+count: a job whose worker died is not running anything, and is always
+claimable so another worker can recover it. Without the job queue there is
+nowhere to wait: analyses beyond the running limits are rejected.
+
+A limit of 0 disables it. Clients are identified by the X-Client-Id header,
+falling back to the caller's address.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import math
+import config
+import database
+
+
+class AdmissionRejected(Exception):
+    """Raised when an analysis cannot be admitted; carries a Retry-After estimate."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Applies the running and queue limits to analysis jobs."""
+
+    # Recent completed runs used to estimate run duration
+    DURATION_SAMPLE = 20
+
+    def admit(self, client_id: Optional[str] = None):
+        """
+        Check that a new analysis may be queued (or, without the job queue, started).
+
+        Raises:
+            AdmissionRejected: over the queue limits (or running limits without a queue)
+        """
+        if not config.ANALYSIS_JOB_QUEUE:
+            self._admit_inline(client_id)
+            return
+
+        jobs = database.get_analysis_jobs_collection()
+        queued = jobs.count_documents({"status": "queued", "batch_id": None})
+        if _over(queued, config.ADMISSION_MAX_QUEUED):
+            raise AdmissionRejected(
+                f"Analysis queue is full ({queued} waiting)",
+                self._retry_after(queued - config.ADMISSION_MAX_QUEUED + 1)
+            )
+        if client_id:
+            client_queued = jobs.count_documents({"status": "queued", "batch_id": None, "client_id": client_id})
+            if _over(client_queued, config.ADMISSION_MAX_QUEUED_PER_CLIENT):
+                raise AdmissionRejected(
+                    f"Too many queued analyses for this client ({client_queued} waiting)",
+                    self._retry_after(client_queued - config.ADMISSION_MAX_QUEUED_PER_CLIENT + 1,
+                                      config.ADMISSION_MAX_RUNNING_PER_CLIENT)
+                )
+
+    def claim_filter(self) -> Dict[str, Any]:
+        """
+        Extra conditions for claiming a job under the running limits.
+
+        Jobs whose lease expired are always claimable: their worker died, and
+        they would otherwise hold their client's slots forever.
+
+        Returns:
+            A Mongo filter to add to the claim query (only expired-lease jobs
+            once the global running limit is reached)
+        """
+        jobs = database.get_analysis_jobs_collection()
+        orphaned = {"status": "running", "lease_expires_at": {"$lt": datetime.utcnow()}}
+        if config.ADMISSION_MAX_RUNNING and \
+                jobs.count_documents(_live_running()) >= config.ADMISSION_MAX_RUNNING:
+            return orphaned
+        excluded = []
+        clients = self._saturated("client_id", config.ADMISSION_MAX_RUNNING_PER_CLIENT, {"batch_id": None})
+        if clients:
+            excluded.append({"batch_id": None, "client_id": {"$in": clients}})
+        batches = self._saturated("batch_id", config.BATCH_CONCURRENCY, {"batch_id": {"$ne": None}})
+        if batches:
+            excluded.append({"batch_id": {"$in": batches}})
+        return {"$or": [orphaned, {"$nor": excluded}]} if excluded else {}
+
+    def queue_status(self, case_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Position and estimated wait of a case's queued analysis.
+
+        Returns:
+            Dict with position, running and estimated_wait_seconds, or None if
+            the case's job is not waiting in the queue
+        """
+        jobs = database.get_analysis_jobs_collection()
+        job = jobs.find_one({"case_id": case_id}, {"_id": 0, "status": 1, "available_at": 1, "priority": 1})
+        if not job or job["status"] != "queued":
+            return None
+        # Jobs queued before priorities existed count as interactive
+        priority = job.get("priority") or 0
+        same_priority = {"$in": [priority, None]} if priority == 0 else priority
+        ahead = jobs.count_documents({"status": "queued", "$or": [
+            {"priority": {"$lt": priority}},
+            {"priority": same_priority, "available_at": {"$lt": job["available_at"]}}
+        ]})
+        running = jobs.count_documents(_live_running())
+        return {
+            "case_id": case_id,
+            "position": ahead + 1,
+            "running": running,
+            "estimated_wait_seconds": self._retry_after(ahead + 1)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue and running counts, overall and per client."""
+        counts = database.get_analysis_jobs_collection().aggregate([
+            {"$match": {"status": {"$in": ["queued", "running"]}}},
+            {"$group": {"_id": {"client_id": "$client_id", "status": "$status"}, "count": {"$sum": 1}}}
+        ])
+        totals = {"queued": 0, "running": 0}
+        per_client: Dict[str, Dict[str, int]] = {}
+        for row in counts:
+            status = row["_id"]["status"]
+            client = row["_id"].get("client_id") or "unknown"
+            totals[status] += row["count"]
+            per_client.setdefault(client, {"queued": 0, "running": 0})[status] = row["count"]
+        return {
+            **totals,
+            "clients": per_client,
+            "average_run_seconds": round(self._average_run_seconds(), 1),
+            "limits": {
+                "max_running": config.ADMISSION_MAX_RUNNING,
+                "max_running_per_client": config.ADMISSION_MAX_RUNNING_PER_CLIENT,
+                "max_queued": config.ADMISSION_MAX_QUEUED,
+                "max_queued_per_client": config.ADMISSION_MAX_QUEUED_PER_CLIENT
+            }
+        }
+
+    def _admit_inline(self, client_id: Optional[str]):
+        """Running limits for analyses started directly in this process (no job queue)."""
+        from services.run_manager import get_run_manager
+
+        run_manager = get_run_manager()
+        retry_after = math.ceil(self._average_run_seconds())
+        if _over(run_manager.running_count(), config.ADMISSION_MAX_RUNNING):
+            raise AdmissionRejected("Too many analyses running", retry_after)
+        if client_id and _over(run_manager.running_count(client_id), config.ADMISSION_MAX_RUNNING_PER_CLIENT):
+            raise AdmissionRejected("Too many analyses running for this client", retry_after)
+
+    def _saturated(self, field: str, limit: int, match: Dict[str, Any]) -> List[str]:
+        """Values of `field` (client or batch) whose running jobs reach `limit`."""
+        if not limit:
+            return []
+        rows = database.get_analysis_jobs_collection().aggregate([
+            {"$match": {**_live_running(), field: {"$ne": None}, **match}},
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gte": limit}}}
+        ])
+        return [row["_id"] for row in rows]
+
+    def _retry_after(self, waiting: int, capacity: Optional[int] = None) -> int:
+        """Seconds until `waiting` analyses ahead have started, at the running limit."""
+        capacity = capacity or config.ADMISSION_MAX_RUNNING or config.EMBEDDED_WORKERS or 1
+        return max(1, math.ceil(math.ceil(waiting / capacity) * self._average_run_seconds()))
+
+    def _average_run_seconds(self) -> float:
+        """Average duration of recent completed analyses (default until there are some)."""
+        try:
+            recent = database.get_analysis_jobs_collection().find(
+                {"status": "completed", "finished_at": {"$ne": None}},
+                {"_id": 0, "claimed_at": 1, "finished_at": 1}
+            ).sort("finished_at", -1).limit(self.DURATION_SAMPLE)
+            durations = [
+                (job["finished_at"] - job["claimed_at"]).total_seconds()
+                for job in recent
+                if isinstance(job.get("claimed_at"), datetime) and isinstance(job.get("finished_at"), datetime)
+            ]
+        except Exception as e:
+            print(f"Warning: Could not read analysis durations: {e}")
+            durations = []
+        if not durations:
+            return config.ADMISSION_DEFAULT_RUN_SECONDS
+        return sum(durations) / len(durations)
+
+
+def _live_running() -> Dict[str, Any]:
+    """Filter of running jobs whose worker still holds the lease."""
+    return {"status": "running", "lease_expires_at": {"$gte": datetime.utcnow()}}
+
+
+def _over(count: int, limit: int) -> bool:
+    """Whether `count` has reached a limit (0 means unlimited)."""
+    return bool(limit) and count >= limit
+
+
+# Singleton admission controller instance
+_controller: Optional[AdmissionController] = None
+
+
+def get_controller() -> AdmissionController:
+    """Get or create the admission controller singleton."""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController()
+    return _controller
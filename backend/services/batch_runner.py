@@ -0,0 +1,250 @@
+"""
+Batch Runner - Bulk case analyses from a JSONL upload.
+
+Running the council over a portfolio of matters through `POST /api/cases`
+means one request and one held SSE connection per case. A batch instead
+takes every case in one upload and runs them as background work, tuned for
+throughput rather than interactivity:
+
+- Bounded parallelism: at most config.BATCH_CONCURRENCY analyses of a batch
+  run at once. With the job queue, batch jobs are enqueued at a lower
+  priority than interactive ones and the limit is applied when workers claim
+  jobs (services/admission.py); without it, the batch runs in this process
+  under a semaphore.
+- Shared rate limiting: batch analyses go through the same LLM client and
+  Groq rate limiter as interactive ones, so a batch cannot exceed the quota.
+- No token streaming (config.BATCH_STREAM_TOKENS): agents make plain LLM
+  calls and no agent_token events are logged.
+
+Progress and results are derived from each case's terminal event in the
+case_events log (strategy_ready, error or analysis_cancelled), so they are the same whichever
+process ran the case. `stream_results` yields each case's result as soon as
+it finishes, for the NDJSON results endpoint.
+"""
+from datetime import datetime
+from typing import Any, AsyncGenerator, Dict, List, Optional
+import asyncio
+import json
+import uuid
+import config
+import database
+from models.schemas import CaseCreate
+from services.job_queue import get_queue
+from services.run_manager import TERMINAL_EVENTS, get_run_manager
+
+
+class BatchRunner:
+    """Creates batches of cases, schedules their analyses and reports progress."""
+
+    def __init__(self, concurrency: int = None):
+        self.concurrency = concurrency or config.BATCH_CONCURRENCY
+        self._tasks: Dict[str, asyncio.Task] = {}  # batch_id -> in-process runner (no job queue)
+
+    async def create_batch(self, cases: List[CaseCreate], client_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Create the batch's cases and schedule their analyses.
+
+        The cases and jobs are written in a worker thread; only the
+        in-process runner (without the job queue) is started on the event loop.
+
+        Args:
+            cases: The cases to analyze, in upload order
+            client_id: Client that uploaded the batch
+
+        Returns:
+            The batch document
+        """
+        batch = await asyncio.to_thread(self._insert_batch, cases, client_id)
+        if not config.ANALYSIS_JOB_QUEUE:
+            self._tasks[batch["batch_id"]] = asyncio.create_task(
+                self._run_inline(batch["batch_id"], batch["case_ids"])
+            )
+        print(f"[BatchRunner] Created batch {batch['batch_id']} with {batch['total']} cases")
+        return batch
+
+    def _insert_batch(self, cases: List[CaseCreate], client_id: Optional[str]) -> Dict[str, Any]:
+        """
+        Write the batch's cases and batch document, and enqueue its jobs with
+        the job queue: one insert_many and one bulk enqueue, whatever the batch size.
+        """
+        from services.orchestrator import get_orchestrator
+
+        batch_id = f"batch_{uuid.uuid4().hex[:8]}"
+        case_ids = [
+            case.case_id
+            for case in get_orchestrator().create_cases([
+                {"title": case.title, "facts": case.facts, "jurisdiction": case.jurisdiction, "stakes": case.stakes}
+                for case in cases
+            ], batch_id=batch_id)
+        ]
+
+        batch = {
+            "batch_id": batch_id,
+            "client_id": client_id,
+            "case_ids": case_ids,
+            "total": len(case_ids),
+            "status": "running",
+            "created_at": datetime.utcnow()
+        }
+        database.get_batches_collection().insert_one(dict(batch))
+        if config.ANALYSIS_JOB_QUEUE:
+            get_queue().enqueue_many(case_ids, client_id=client_id, batch_id=batch_id)
+        return batch
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """The batch document, if it exists."""
+        return database.get_batches_collection().find_one({"batch_id": batch_id}, {"_id": 0})
+
+    def progress(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Counts of the batch's completed, failed, cancelled and pending analyses.
+
+        Read-only: the status is derived from the cases' outcomes, not stored.
+
+        Returns:
+            Progress dict, or None if the batch does not exist
+        """
+        batch = self.get_batch(batch_id)
+        if not batch:
+            return None
+        outcomes = _outcomes(batch["case_ids"])
+        completed = sum(1 for outcome in outcomes.values() if outcome["event"] == "strategy_ready")
+        cancelled = sum(1 for outcome in outcomes.values() if outcome["event"] == "analysis_cancelled")
+        failed = len(outcomes) - completed - cancelled
+        pending = batch["total"] - len(outcomes)
+        status = "completed" if pending == 0 else "running"
+
+        progress = {
+            "batch_id": batch_id,
+            "status": status,
+            "total": batch["total"],
+            "completed": completed,
+            "failed": failed,
+            "cancelled": cancelled,
+            "pending": pending,
+            "created_at": batch["created_at"].isoformat()
+        }
+        if config.ANALYSIS_JOB_QUEUE:
+            progress.update(_job_counts(batch_id))
+        return progress
+
+    async def stream_results(self, batch_id: str) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Yield each case's result as it finishes (already finished ones first),
+        until every case of the batch is done.
+
+        Yields:
+            Result dicts with the case's index in the upload, its status and
+            the final strategy or error message
+        """
+        batch = await asyncio.to_thread(self.get_batch, batch_id)
+        if not batch:
+            return
+        case_ids = batch["case_ids"]
+        index = {case_id: i for i, case_id in enumerate(case_ids)}
+        titles = await asyncio.to_thread(_titles, case_ids)
+
+        reported = set()
+        while True:
+            outcomes = await asyncio.to_thread(_outcomes, case_ids)
+            finished = sorted(
+                (outcome for case_id, outcome in outcomes.items() if case_id not in reported),
+                key=lambda outcome: outcome["finished_at"]
+            )
+            for outcome in finished:
+                reported.add(outcome["case_id"])
+                yield _result(outcome, index[outcome["case_id"]], titles.get(outcome["case_id"]))
+            if len(reported) >= len(case_ids):
+                return
+            await asyncio.sleep(config.BATCH_RESULTS_POLL_SECONDS)
+
+    async def _run_inline(self, batch_id: str, case_ids: List[str]):
+        """Run the batch's analyses in this process, `concurrency` at a time."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        run_manager = get_run_manager()
+
+        async def run(case_id: str):
+            async with semaphore:
+                try:
+                    await run_manager.run_case(case_id, stream_tokens=config.BATCH_STREAM_TOKENS)
+                except Exception as e:
+                    print(f"[BatchRunner] Case {case_id} of batch {batch_id} failed: {e}")
+
+        try:
+            await asyncio.gather(*(run(case_id) for case_id in case_ids))
+            print(f"[BatchRunner] Batch {batch_id} finished")
+        finally:
+            self._tasks.pop(batch_id, None)
+
+
+def _outcomes(case_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Last terminal event (strategy_ready, error or analysis_cancelled) of each finished case."""
+    try:
+        rows = database.get_case_events_collection().aggregate([
+            {"$match": {"case_id": {"$in": case_ids}, "event": {"$in": list(TERMINAL_EVENTS)}}},
+            {"$sort": {"seq": -1}},
+            {"$group": {
+                "_id": "$case_id",
+                "event": {"$first": "$event"},
+                "data": {"$first": "$data"},
+                "finished_at": {"$first": "$created_at"}
+            }}
+        ])
+        return {row["_id"]: {"case_id": row["_id"], **row} for row in rows}
+    except Exception as e:
+        print(f"Warning: Could not read batch outcomes: {e}")
+        return {}
+
+
+def _titles(case_ids: List[str]) -> Dict[str, Optional[str]]:
+    """Titles of the batch's cases, by case_id."""
+    return {
+        case["case_id"]: case.get("title")
+        for case in database.get_cases_collection().find(
+            {"case_id": {"$in": case_ids}}, {"_id": 0, "case_id": 1, "title": 1}
+        )
+    }
+
+
+def _job_counts(batch_id: str) -> Dict[str, int]:
+    """Queued and running jobs of a batch."""
+    counts = {"queued": 0, "running": 0}
+    try:
+        rows = database.get_analysis_jobs_collection().aggregate([
+            {"$match": {"batch_id": batch_id, "status": {"$in": list(counts)}}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ])
+        for row in rows:
+            counts[row["_id"]] = row["count"]
+    except Exception as e:
+        print(f"Warning: Could not count batch jobs: {e}")
+    return counts
+
+
+def _result(outcome: Dict[str, Any], index: int, title: Optional[str]) -> Dict[str, Any]:
+    """NDJSON result record of a finished case."""
+    data = json.loads(outcome["data"])
+    result = {"index": index, "case_id": outcome["case_id"], "title": title}
+    if outcome["event"] == "strategy_ready":
+        result.update({
+            "status": "completed",
+            "strategy": data.get("strategy"),
+            "deliberation_rounds": data.get("deliberation_rounds")
+        })
+    elif outcome["event"] == "analysis_cancelled":
+        result.update({"status": "cancelled", "reason": data.get("reason")})
+    else:
+        result.update({"status": "failed", "error": data.get("message")})
+    return result
+
+
+# Singleton batch runner instance
+_batch_runner: Optional[BatchRunner] = None
+
+
+def get_batch_runner() -> BatchRunner:
+    """Get or create the batch runner singleton."""
+    global _batch_runner
+    if _batch_runner is None:
+        _batch_runner = BatchRunner()
+    return _batch_runner
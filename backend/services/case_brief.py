@@ -0,0 +1,113 @@
+"""
+Case Brief Service - Computes a compact digest of a case's facts once per case.
+
+Facts extracted from PDFs can run to thousands of tokens, and every agent
+prompt in a run (Harvey, Louis, each Tanner round, Jessica) would otherwise
+repeat them verbatim. The brief is a bounded-size digest
+(config.CASE_BRIEF_MAX_TOKENS) produced by one LLM call. It is stored on the
+case document and reused by later runs until the facts change.
+
+Agents read it through `BaseAgent.case_facts`. Agents listed in
+config.CASE_BRIEF_RAW_FACTS_AGENTS keep receiving the raw facts.
+"""
+from typing import Any, Dict, Optional
+import asyncio
+import hashlib
+import config
+from services import context_packer, llm_cache, llm_client
+from services.mongo_utils import save_case_brief
+
+
+CASE_BRIEF_SYSTEM_PROMPT = "You are a legal case summarizer. You write dense, factual case briefs for a litigation team."
+
+CASE_BRIEF_PROMPT = """Condense the case facts below into a brief of at most {max_words} words.
+
+Keep every fact that matters for legal strategy: parties and their relationship,
+key dates and sequence of events, contract terms or obligations at issue, the
+alleged wrongdoing, evidence mentioned, damages and amounts. Drop repetition,
+boilerplate and procedural noise. Do not add analysis or facts that are not in
+the text.
+
+CASE FACTS:
+{facts}"""
+
+CASE_BRIEF_TEMPERATURE = 0.2  # Faithful summary, not creative writing
+
+
+def facts_hash(facts: str) -> str:
+    """Hash identifying the facts a brief was computed from."""
+    return hashlib.sha256(facts.encode("utf-8")).hexdigest()
+
+
+class CaseBriefer:
+    """Service that produces and caches the per-case facts digest."""
+
+    name = "CaseBrief"
+
+    async def get_brief(self, case_data: Dict[str, Any]) -> str:
+        """
+        Return the case brief, computing and storing it on the case if needed.
+
+        Facts that already fit the brief budget are used as-is. If the LLM
+        call fails, the facts are truncated to the budget instead.
+
+        Args:
+            case_data: The case document (must include case_id and facts)
+
+        Returns:
+            str: The case brief
+        """
+        facts = case_data.get("facts") or ""
+        max_tokens = config.CASE_BRIEF_MAX_TOKENS
+        if context_packer.count_tokens(facts) <= max_tokens:
+            return facts
+
+        digest = facts_hash(facts)
+        stored = self._stored_brief(case_data, digest, max_tokens)
+        if stored is not None:
+            print(f"[CaseBrief] Reusing stored brief for case {case_data['case_id']}")
+            return stored
+
+        try:
+            brief = await self._complete(facts, max_tokens)
+            brief = context_packer.truncate_to_tokens(brief.strip(), max_tokens)
+        except Exception as e:
+            print(f"[CaseBrief] Brief generation failed, truncating facts instead: {e}")
+            return context_packer.truncate_to_tokens(facts, max_tokens)
+
+        await asyncio.to_thread(save_case_brief, case_data["case_id"], brief, digest, max_tokens)
+        print(f"[CaseBrief] Case {case_data['case_id']}: facts "
+              f"{context_packer.count_tokens(facts)} -> brief {context_packer.count_tokens(brief)} tokens")
+        return brief
+
+    async def _complete(self, facts: str, max_tokens: int) -> str:
+        """Run the summarization completion, through the cache if enabled."""
+        prompt = CASE_BRIEF_PROMPT.format(max_words=int(max_tokens * 0.75), facts=facts)
+
+        def request():
+            return llm_client.chat_completion(
+                system_prompt=CASE_BRIEF_SYSTEM_PROMPT,
+                prompt=prompt,
+                temperature=CASE_BRIEF_TEMPERATURE,
+                max_tokens=max_tokens
+            )
+
+        if not llm_cache.is_enabled_for(self.name):
+            return await request()
+
+        key = llm_cache.make_key(
+            config.GROQ_MODEL, CASE_BRIEF_SYSTEM_PROMPT, prompt,
+            CASE_BRIEF_TEMPERATURE, max_tokens
+        )
+        return await llm_cache.get_cache().get_or_compute(key, request)
+
+    @staticmethod
+    def _stored_brief(case_data: Dict[str, Any], digest: str, max_tokens: int) -> Optional[str]:
+        """The brief stored on the case, if it was computed from these facts and budget."""
+        stored = case_data.get("case_brief")
+        if not stored:
+            return None
+        if stored.get("facts_hash") != digest or stored.get("max_tokens") != max_tokens:
+            return None
+        return stored.get("text")
+
@@ -1,14 +1,24 @@
 """
 Conflict Detector Service - Identifies disagreements between agents.
 This is NOT an LLM agent, but a service that uses LLM for analysis.
+
+Conflicts can be detected in one pass over every argument of the case
+(`detect_conflicts`) or incrementally (`detect_new_conflicts`): after each
+stage of deliberation, only the new outputs are sent in full, together with
+a compact, token-budgeted summary of the outputs already analyzed and the
+conflicts already found.
+
+Arguments are read and conflicts written through services/mongo_utils.py
+(so queued writes are flushed first and conflicts follow
+config.DURABLE_ARTIFACT_WRITES), in worker threads off the event loop.
 """
+import asyncio
 import json
-import time
-from typing import List, Dict
-from groq import Groq
+from typing import Any, List, Dict
 import config
-import database
-from models.schemas import Conflict
+from services import llm_client, llm_cache
+from services.context_packer import ContextPacker
+from services.mongo_utils import get_arguments, get_counterarguments, write_conflict
 
 
 CONFLICT_DETECTION_PROMPT = """Compare these legal arguments and identify any contradictions, disagreements, or tensions between them.
@@ -31,14 +41,30 @@ Example format:
 
 IMPORTANT: Return ONLY valid JSON, no other text."""
 
+INCREMENTAL_CONFLICT_PROMPT = """New arguments were just added to a legal team's deliberation. Identify contradictions, disagreements, or tensions that the NEW arguments introduce: between two new arguments, or between a new argument and an earlier one (summarized below).
+
+Do not report conflicts that were already identified (listed below), and do not report conflicts only between earlier arguments.
+
+For each conflict found, provide:
+- agents_involved: list of agent names that disagree
+- issue: brief title of the conflict (5-10 words)
+- description: detailed explanation of the disagreement
+
+Return your response as a JSON array of conflicts. If no new conflicts are found, return an empty array [].
+
+IMPORTANT: Return ONLY valid JSON, no other text."""
+
+CONFLICT_SYSTEM_PROMPT = "You are a legal analyst that identifies conflicts and disagreements between legal arguments. Always respond with valid JSON."
+CONFLICT_TEMPERATURE = 0.3  # Lower temperature for more consistent JSON
+CONFLICT_MAX_TOKENS = 1500
+
 
 class ConflictDetector:
     """Service that detects conflicts between agent arguments."""
 
-    def __init__(self):
-        self.client = Groq(api_key=config.GROQ_API_KEY)
+    name = "ConflictDetector"
 
-    def detect_conflicts(self, case_id: str) -> List[Dict]:
+    async def detect_conflicts(self, case_id: str) -> List[Dict]:
         """
         Read all arguments from MongoDB, analyze for conflicts,
         write conflicts to MongoDB, and return the list.
@@ -46,13 +72,11 @@ class ConflictDetector:
         print(f"[ConflictDetector] Starting conflict analysis for case: {case_id}")
 
         # Read all arguments
-        arguments_collection = database.get_arguments_collection()
-        arguments = list(arguments_collection.find({"case_id": case_id}))
+        arguments = await asyncio.to_thread(get_arguments, case_id)
         print(f"[ConflictDetector] Found {len(arguments)} arguments")
 
         # Read all counterarguments
-        counterarguments_collection = database.get_counterarguments_collection()
-        counterarguments = list(counterarguments_collection.find({"case_id": case_id}))
+        counterarguments = await asyncio.to_thread(get_counterarguments, case_id)
 
         if not arguments and not counterarguments:
             return []
@@ -61,13 +85,60 @@ class ConflictDetector:
         arguments_text = self._format_arguments(arguments, counterarguments)
 
         # Call Groq to analyze conflicts
-        conflicts_data = self._analyze_conflicts(arguments_text)
+        conflicts_data = await self._analyze_conflicts(arguments_text)
 
         # Save conflicts to MongoDB and return
-        saved_conflicts = self._save_conflicts(case_id, conflicts_data)
+        saved_conflicts = await asyncio.to_thread(self._save_conflicts, case_id, conflicts_data)
 
         return saved_conflicts
 
+    async def detect_new_conflicts(self, case_id: str, new_outputs: List[Dict[str, Any]],
+                                   analyzed_outputs: List[Dict[str, Any]],
+                                   known_conflicts: List[Dict]) -> List[Dict]:
+        """
+        Detect the conflicts introduced by new agent outputs, write them to
+        MongoDB, and return them.
+
+        Args:
+            case_id: The case being analyzed
+            new_outputs: Agent results not analyzed yet (sent in full)
+            analyzed_outputs: Agent results already analyzed, oldest first
+                (sent as a summary within config.CONFLICT_SUMMARY_TOKENS)
+            known_conflicts: Conflicts already found (not to be repeated)
+
+        Returns:
+            The new conflicts
+        """
+        if not new_outputs:
+            return []
+        print(f"[ConflictDetector] Incremental analysis for case {case_id}: "
+              f"{len(new_outputs)} new, {len(analyzed_outputs)} already analyzed")
+
+        text = "NEW ARGUMENTS:\n\n"
+        for output in new_outputs:
+            text += f"=== {self._label(output)} ===\n{output.get('content', 'No content')}\n\n"
+
+        if analyzed_outputs:
+            packer = ContextPacker(config.CONFLICT_SUMMARY_TOKENS, config.CONFLICT_SUMMARY_ITEM_TOKENS)
+            for position, output in enumerate(analyzed_outputs):
+                packer.add("summary", output.get("content", ""), recency=position,
+                           header=f"--- {self._label(output)} (summary) ---")
+            text += f"\nEARLIER ARGUMENTS (SUMMARIZED):\n{packer.pack().get('summary', '')}\n"
+
+        if known_conflicts:
+            text += "\nCONFLICTS ALREADY IDENTIFIED:\n"
+            for conflict in known_conflicts:
+                agents = ", ".join(conflict.get("agents_involved", []))
+                text += f"- {conflict.get('issue', 'Unknown conflict')} ({agents})\n"
+
+        conflicts_data = await self._analyze_conflicts(text, INCREMENTAL_CONFLICT_PROMPT)
+        return await asyncio.to_thread(self._save_conflicts, case_id, conflicts_data)
+
+    @staticmethod
+    def _label(output: Dict[str, Any]) -> str:
+        """Heading for an agent output in a conflict prompt."""
+        return f"{output.get('agent', 'Unknown Agent')} ({output.get('type', 'attack')})"
+
     def _format_arguments(self, arguments: list, counterarguments: list) -> str:
         """Format all arguments for the LLM prompt."""
         text = "ARGUMENTS FROM LEGAL TEAM:\n\n"
@@ -87,37 +158,45 @@ class ConflictDetector:
 
         return text
 
-    def _analyze_conflicts(self, arguments_text: str, retry_count: int = 1) -> List[Dict]:
-        """Call Groq to analyze arguments for conflicts."""
-        prompt = f"{CONFLICT_DETECTION_PROMPT}\n\n{arguments_text}"
-
-        for attempt in range(retry_count + 1):
-            try:
-                response = self.client.chat.completions.create(
-                    model=config.GROQ_MODEL,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are a legal analyst that identifies conflicts and disagreements between legal arguments. Always respond with valid JSON."
-                        },
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.3,  # Lower temperature for more consistent JSON
-                    max_tokens=1500
-                )
-
-                response_text = response.choices[0].message.content.strip()
-
-                # Try to parse JSON from response
-                conflicts = self._parse_json_response(response_text)
-                return conflicts
-
-            except Exception as e:
-                if attempt < retry_count:
-                    time.sleep(2)
-                    continue
-                print(f"Error analyzing conflicts: {str(e)}")
-                return []
+    async def _analyze_conflicts(self, arguments_text: str,
+                                 instructions: str = CONFLICT_DETECTION_PROMPT) -> List[Dict]:
+        """Call Groq (via the shared async client) to analyze arguments for conflicts.
+
+        Transient errors are retried by the shared retry policy; if the call
+        still fails, no conflicts are reported.
+        """
+        prompt = f"{instructions}\n\n{arguments_text}"
+
+        try:
+            response_text = await self._complete(prompt)
+            response_text = response_text.strip()
+
+            # Try to parse JSON from response
+            conflicts = self._parse_json_response(response_text)
+            return conflicts
+
+        except Exception as e:
+            print(f"Error analyzing conflicts: {str(e)}")
+            return []
+
+    async def _complete(self, prompt: str) -> str:
+        """Run the conflict-analysis completion, through the cache if enabled."""
+        def request():
+            return llm_client.chat_completion(
+                system_prompt=CONFLICT_SYSTEM_PROMPT,
+                prompt=prompt,
+                temperature=CONFLICT_TEMPERATURE,
+                max_tokens=CONFLICT_MAX_TOKENS
+            )
+
+        if not llm_cache.is_enabled_for(self.name):
+            return await request()
+
+        key = llm_cache.make_key(
+            config.GROQ_MODEL, CONFLICT_SYSTEM_PROMPT, prompt,
+            CONFLICT_TEMPERATURE, CONFLICT_MAX_TOKENS
+        )
+        return await llm_cache.get_cache().get_or_compute(key, request)
 
     def _parse_json_response(self, response_text: str) -> List[Dict]:
         """Parse JSON from LLM response, handling various formats."""
@@ -158,11 +237,10 @@ class ConflictDetector:
         return []
 
     def _save_conflicts(self, case_id: str, conflicts_data: List[Dict]) -> List[Dict]:
-        """Save conflicts to MongoDB and return saved documents."""
+        """Save conflicts to MongoDB (blocking; run off the event loop) and return saved documents."""
         if not conflicts_data:
             return []
 
-        conflicts_collection = database.get_conflicts_collection()
         saved_conflicts = []
 
         for conflict_data in conflicts_data:
@@ -175,27 +253,16 @@ class ConflictDetector:
             if isinstance(agents_involved, str):
                 agents_involved = [agents_involved]
 
-            # Create conflict document
-            conflict = Conflict(
-                case_id=case_id,
-                agents_involved=agents_involved,
-                issue=issue,
-                description=description,
-                status="unresolved"
-            )
-
             # Save to MongoDB
-            conflict_dict = conflict.to_dict()
-            conflicts_collection.insert_one(conflict_dict)
+            conflict = write_conflict(case_id, agents_involved, issue, description)
 
-            # Remove MongoDB _id for return
             saved_conflicts.append({
-                "conflict_id": conflict.conflict_id,
+                "conflict_id": conflict["conflict_id"],
                 "case_id": case_id,
                 "agents_involved": agents_involved,
                 "issue": issue,
                 "description": description,
-                "status": "unresolved"
+                "status": conflict["status"]
             })
 
         return saved_conflicts
@@ -0,0 +1,143 @@
+"""
+Token-budgeted context packing for agent prompts.
+
+Agents build prompts from a variable amount of material: case facts, every
+argument and counterargument written so far, conflicts and the deliberation
+history. Instead of cutting each piece at a fixed character count, a
+`ContextPacker` fills a prompt up to a token budget:
+
+- Items are considered in order of priority, then recency (newest first), so
+  when the budget is tight the oldest, least important material is dropped.
+- Each item can be capped (config.CONTEXT_ITEM_MAX_TOKENS by default) so one
+  long item cannot crowd out the rest.
+- An item that does not fit is truncated to the remaining budget if enough
+  room is left to be useful, otherwise skipped.
+- Within a section, packed items are rendered in chronological order.
+
+Token counts use `tiktoken` when it is installed and fall back to an estimate
+of about four characters per token. Budgets per agent are set in
+config.CONTEXT_TOKEN_BUDGETS.
+"""
+from typing import Any, Dict, List, Optional
+import config
+
+# Optional dependency: exact token counts
+try:
+    import tiktoken  # type: ignore
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+# Don't bother including a truncated item with less room than this
+MIN_TRUNCATED_TOKENS = 48
+
+TRUNCATION_MARKER = "..."
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in `text` (exact with tiktoken, otherwise estimated)."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` to at most `max_tokens` tokens, marking the cut with '...'."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    keep = max(0, max_tokens - 1)  # Leave room for the marker
+    if _ENCODING is not None:
+        truncated = _ENCODING.decode(_ENCODING.encode(text, disallowed_special=())[:keep])
+    else:
+        truncated = text[:keep * 4]
+    return truncated.rstrip() + TRUNCATION_MARKER
+
+
+def budget_for(agent_name: str) -> int:
+    """Context token budget for an agent's prompt."""
+    return config.CONTEXT_TOKEN_BUDGETS.get(agent_name, config.CONTEXT_DEFAULT_TOKEN_BUDGET)
+
+
+class ContextPacker:
+    """Fill a token budget with the highest-priority, newest context items."""
+
+    def __init__(self, budget_tokens: int, item_max_tokens: int = None):
+        self.budget_tokens = budget_tokens
+        self.item_max_tokens = item_max_tokens or config.CONTEXT_ITEM_MAX_TOKENS
+        self._items: List[Dict[str, Any]] = []
+        self.used_tokens = 0
+        self.dropped = 0
+        self.truncated = 0
+
+    def add(self, section: str, text: str, priority: int = 0, recency: Any = 0,
+            header: str = "", max_tokens: Optional[int] = None):
+        """
+        Offer an item for packing.
+
+        Args:
+            section: Name of the prompt section the item belongs to
+            text: Item body
+            priority: Higher priorities are packed first
+            recency: Sort key for age (e.g. created_at, round number); newer
+                items are packed first within a priority. Items sharing a
+                priority or section must use comparable recency values.
+            header: Line rendered above the item (counted against the budget,
+                never truncated)
+            max_tokens: Cap for this item's body (default: item_max_tokens)
+        """
+        if not text:
+            return
+        self._items.append({
+            "section": section,
+            "text": text,
+            "priority": priority,
+            "recency": recency,
+            "header": header,
+            "max_tokens": max_tokens or self.item_max_tokens,
+            "order": len(self._items),
+        })
+
+    def pack(self) -> Dict[str, str]:
+        """
+        Select items within the budget and render each section.
+
+        Returns:
+            Dict mapping section name to its rendered text ("" if nothing fit)
+        """
+        remaining = self.budget_tokens
+        selected = []
+        ranked = sorted(self._items, key=lambda i: (i["priority"], i["recency"], i["order"]), reverse=True)
+        for item in ranked:
+            header_tokens = count_tokens(item["header"])
+            room = min(item["max_tokens"], remaining - header_tokens)
+            if room < MIN_TRUNCATED_TOKENS and count_tokens(item["text"]) > room:
+                self.dropped += 1
+                continue
+            text = truncate_to_tokens(item["text"], room)
+            if text is not item["text"]:
+                self.truncated += 1
+            cost = header_tokens + count_tokens(text)
+            remaining -= cost
+            selected.append({**item, "text": text})
+        self.used_tokens = self.budget_tokens - remaining
+
+        sections: Dict[str, str] = {}
+        for section in dict.fromkeys(item["section"] for item in self._items):
+            chosen = [item for item in selected if item["section"] == section]
+            chosen.sort(key=lambda i: (i["recency"], i["order"]))
+            sections[section] = "".join(
+                f"{item['header']}\n{item['text']}\n" if item["header"] else f"{item['text']}\n"
+                for item in chosen
+            )
+        return sections
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "budget_tokens": self.budget_tokens,
+            "used_tokens": self.used_tokens,
+            "items": len(self._items),
+            "dropped": self.dropped,
+            "truncated": self.truncated,
+        }
@@ -0,0 +1,103 @@
+"""
+Deliberation convergence detection.
+
+Each Tanner <-> Harvey round costs two LLM calls, but later rounds often
+repeat earlier ones: Tanner lists the same attack vectors, or Harvey's
+rebuttal barely changes his strategy, so the next attack would hit the same
+target. The `ConvergenceDetector` compares successive rounds with a cheap
+local measure - Jaccard similarity of word shingles - so the orchestrator can
+end deliberation early. config.DELIBERATION_ROUNDS is then a ceiling rather
+than a fixed count.
+
+Two checks, each against its own threshold:
+
+- attacks_repeated: a round's attack vectors (or, without vectors, the attack
+  text) are similar to the previous round's.
+- strategy_unchanged: Harvey's rebuttal is similar to the strategy it revises.
+"""
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+import re
+import config
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text: str, size: int = None) -> Set[Tuple[str, ...]]:
+    """Set of word k-shingles of `text` (lowercased, punctuation ignored)."""
+    size = size or config.CONVERGENCE_SHINGLE_SIZE
+    words = _WORD.findall((text or "").lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: Set, b: Set) -> float:
+    """Jaccard similarity of two sets (1.0 for two empty sets)."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def text_similarity(a: str, b: str, size: int = None) -> float:
+    """Shingled Jaccard similarity of two texts."""
+    return jaccard(shingles(a, size), shingles(b, size))
+
+
+def vector_similarity(a: Iterable[str], b: Iterable[str], size: int = None) -> float:
+    """Similarity of two lists of attack vectors (shingles pooled per list)."""
+    pooled_a = set().union(*(shingles(vector, size) for vector in a))
+    pooled_b = set().union(*(shingles(vector, size) for vector in b))
+    return jaccard(pooled_a, pooled_b)
+
+
+class ConvergenceDetector:
+    """Decides whether deliberation rounds have stopped adding anything new."""
+
+    def __init__(self, attack_threshold: float = None, strategy_threshold: float = None):
+        self.attack_threshold = attack_threshold if attack_threshold is not None else config.CONVERGENCE_ATTACK_THRESHOLD
+        self.strategy_threshold = strategy_threshold if strategy_threshold is not None else config.CONVERGENCE_STRATEGY_THRESHOLD
+
+    def compare_attacks(self, previous: Dict[str, Any], current: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Compare two successive Tanner attacks.
+
+        Args:
+            previous: The previous round's Tanner result
+            current: This round's Tanner result
+
+        Returns:
+            Stop reason with the measured similarity, or None to continue
+        """
+        previous_vectors = previous.get("attack_vectors") or []
+        current_vectors = current.get("attack_vectors") or []
+        if previous_vectors and current_vectors:
+            measure = "attack_vectors"
+            similarity = vector_similarity(previous_vectors, current_vectors)
+        else:
+            measure = "attack_text"
+            similarity = text_similarity(previous.get("content", ""), current.get("content", ""))
+        if similarity < self.attack_threshold:
+            return None
+        return {
+            "reason": "attacks_repeated",
+            "measure": measure,
+            "similarity": round(similarity, 3),
+            "threshold": self.attack_threshold
+        }
+
+    def compare_strategies(self, previous: Dict[str, Any], current: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Compare Harvey's rebuttal with the strategy it revises.
+
+        Returns:
+            Stop reason with the measured similarity, or None to continue
+        """
+        similarity = text_similarity(previous.get("content", ""), current.get("content", ""))
+        if similarity < self.strategy_threshold:
+            return None
+        return {
+            "reason": "strategy_unchanged",
+            "measure": "strategy_text",
+            "similarity": round(similarity, 3),
+            "threshold": self.strategy_threshold
+        }
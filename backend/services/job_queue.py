@@ -0,0 +1,221 @@
+"""
+Job Queue - Durable, Mongo-backed queue of case analyses.
+
+Analyses are long-running and LLM-bound, so they are executed by workers
+(see services/worker.py and worker.py) rather than tied to an API request.
+`POST /api/cases` enqueues a job for the new case; any worker process can
+claim it:
+
+- Claiming is one atomic `find_one_and_update`, so a job is handed to exactly
+  one worker even with many workers polling.
+- A claimed job holds a lease (config.JOB_LEASE_SECONDS) that the worker
+  extends with heartbeats while the analysis runs. If the worker dies, the
+  lease expires and the job becomes claimable again.
+- A job whose lease has expired config.JOB_MAX_ATTEMPTS times is marked
+  failed instead of being retried forever.
+
+One job document exists per case (unique index on case_id); enqueueing a
+case that already has a job is a no-op unless `requeue` is set.
+
+Jobs of a batch (services/batch_runner.py) have a lower priority: workers
+claim them only when no interactive analysis is waiting.
+
+Job statuses: queued -> running -> completed | failed, and cancelled from
+queued or running. A worker notices its job was cancelled when its next
+heartbeat fails.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import uuid
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+import config
+import database
+
+# Job priorities (lower is claimed first)
+INTERACTIVE_PRIORITY = 0
+BATCH_PRIORITY = 1
+
+
+class JobQueue:
+    """Mongo-backed analysis job queue with atomic claims and leases."""
+
+    def __init__(self, lease_seconds: int = None, max_attempts: int = None):
+        self.lease_seconds = lease_seconds or config.JOB_LEASE_SECONDS
+        self.max_attempts = max_attempts or config.JOB_MAX_ATTEMPTS
+
+    def enqueue(self, case_id: str, requeue: bool = False, client_id: Optional[str] = None,
+                batch_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Queue an analysis job for a case.
+
+        Args:
+            case_id: The case to analyze
+            requeue: Re-queue the case's job if it already finished
+            client_id: Client the analysis is run for (for per-client limits)
+            batch_id: Batch the case belongs to, if any
+
+        Returns:
+            The case's job document
+        """
+        now = datetime.utcnow()
+        collection = database.get_analysis_jobs_collection()
+        job = collection.find_one_and_update(
+            {"case_id": case_id},
+            {"$setOnInsert": _new_job(case_id, client_id, batch_id, now)},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if requeue and job["status"] in ("completed", "failed", "cancelled"):
+            job = collection.find_one_and_update(
+                {"job_id": job["job_id"], "status": job["status"]},
+                {"$set": {"status": "queued", "attempts": 0, "available_at": now, "error": None},
+                 "$unset": {"worker_id": "", "lease_expires_at": ""}},
+                return_document=ReturnDocument.AFTER
+            ) or job
+        return job
+
+    def enqueue_many(self, case_ids: List[str], client_id: Optional[str] = None,
+                     batch_id: Optional[str] = None) -> int:
+        """
+        Queue analysis jobs for many new cases with one insert_many. A case
+        that already has a job keeps it (its insert fails on the unique
+        case_id index and is skipped).
+
+        Returns:
+            Number of jobs created
+        """
+        if not case_ids:
+            return 0
+        now = datetime.utcnow()
+        try:
+            result = database.get_analysis_jobs_collection().insert_many(
+                [_new_job(case_id, client_id, batch_id, now) for case_id in case_ids],
+                ordered=False
+            )
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+            return e.details.get("nInserted", 0)
+
+    def claim(self, worker_id: str, conditions: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Atomically claim the oldest available job of the highest priority.
+
+        A job is available when it is queued, or running with an expired
+        lease (its worker stopped heartbeating).
+
+        Args:
+            worker_id: The claiming worker
+            conditions: Extra filter on claimable jobs (see services/admission.py)
+
+        Returns:
+            The claimed job, or None if there is nothing to do
+        """
+        now = datetime.utcnow()
+        available = {"$or": [
+            {"status": "queued", "available_at": {"$lte": now}},
+            {"status": "running", "lease_expires_at": {"$lt": now}}
+        ]}
+        return database.get_analysis_jobs_collection().find_one_and_update(
+            {"$and": [available, conditions]} if conditions else available,
+            {
+                "$set": {
+                    "status": "running",
+                    "worker_id": worker_id,
+                    "claimed_at": now,
+                    "heartbeat_at": now,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds)
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("priority", 1), ("available_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """
+        Extend a claimed job's lease.
+
+        Returns:
+            False if the worker no longer holds the job (lease lost)
+        """
+        now = datetime.utcnow()
+        result = database.get_analysis_jobs_collection().update_one(
+            {"job_id": job_id, "worker_id": worker_id, "status": "running"},
+            {"$set": {
+                "heartbeat_at": now,
+                "lease_expires_at": now + timedelta(seconds=self.lease_seconds)
+            }}
+        )
+        return result.matched_count == 1
+
+    def complete(self, job_id: str, worker_id: str):
+        """Mark a job completed."""
+        self._finish(job_id, worker_id, "completed")
+
+    def fail(self, job_id: str, worker_id: str, error: str):
+        """Mark a job failed."""
+        self._finish(job_id, worker_id, "failed", error)
+
+    def cancel(self, case_id: str, reason: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel the case's job if it is queued or running.
+
+        Returns:
+            The job as it was before cancelling, or None if there was nothing to cancel
+        """
+        return database.get_analysis_jobs_collection().find_one_and_update(
+            {"case_id": case_id, "status": {"$in": ["queued", "running"]}},
+            {"$set": {"status": "cancelled", "finished_at": datetime.utcnow(), "error": reason},
+             "$unset": {"lease_expires_at": ""}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.BEFORE
+        )
+
+    def is_exhausted(self, job: Dict[str, Any]) -> bool:
+        """Whether a claimed job has used up its attempts."""
+        return job.get("attempts", 0) > self.max_attempts
+
+    def get_job(self, case_id: str) -> Optional[Dict[str, Any]]:
+        """The case's job, if any."""
+        return database.get_analysis_jobs_collection().find_one({"case_id": case_id}, {"_id": 0})
+
+    def _finish(self, job_id: str, worker_id: str, status: str, error: Optional[str] = None):
+        try:
+            database.get_analysis_jobs_collection().update_one(
+                {"job_id": job_id, "worker_id": worker_id},
+                {"$set": {"status": status, "finished_at": datetime.utcnow(), "error": error},
+                 "$unset": {"lease_expires_at": ""}}
+            )
+        except Exception as e:
+            print(f"Warning: Could not update analysis job: {e}")
+
+
+def _new_job(case_id: str, client_id: Optional[str], batch_id: Optional[str], now: datetime) -> Dict[str, Any]:
+    """A queued job document for a case."""
+    return {
+        "job_id": f"job_{uuid.uuid4().hex[:8]}",
+        "case_id": case_id,
+        "client_id": client_id,
+        "batch_id": batch_id,
+        "priority": BATCH_PRIORITY if batch_id else INTERACTIVE_PRIORITY,
+        "stream_tokens": config.BATCH_STREAM_TOKENS if batch_id else True,
+        "status": "queued",
+        "attempts": 0,
+        "created_at": now,
+        "available_at": now
+    }
+
+
+# Singleton job queue instance
+_queue: Optional[JobQueue] = None
+
+
+def get_queue() -> JobQueue:
+    """Get or create the job queue singleton."""
+    global _queue
+    if _queue is None:
+        _queue = JobQueue()
+    return _queue
@@ -2,14 +2,22 @@
 
 This wrapper provides step-level tracing and auditability. Each step of an
 agent's reasoning is persisted to MongoDB's `reasoning_steps` collection,
-enabling replay, debugging, and audit trails.
+enabling replay, debugging, and audit trails. LLM calls made during a step
+are recorded on it with their telemetry (model, latency, tokens, cost), and
+the totals are rolled up onto the `agent_runs` document and the case.
+
+`AgentGraph` runs a DAG of async nodes: each node declares the nodes it
+depends on, independent nodes run concurrently, nodes can be made
+conditional, and every node is traced as a step of the graph's run. A run
+can be resumed by passing the results of nodes that already completed.
 
 If `langgraph` is not installed, it provides a compatible stub that still
 persists step-level traces to Mongo so the system remains auditable.
 
 Adapted from LegalServer-main by teammate.
 """
-from typing import Callable, Any, Dict, Optional, List
+from typing import Awaitable, Callable, Any, Dict, Iterable, Optional, List
+import asyncio
 import time
 
 # Try to import langgraph (optional dependency)
@@ -19,17 +27,22 @@ try:
 except ImportError:
     LANGGRAPH_AVAILABLE = False
 
-from services.mongo_utils import start_agent_run, finish_agent_run, write_reasoning_step
+from services import llm_client
+from services.mongo_utils import start_agent_run, finish_agent_run, write_reasoning_step, add_case_usage
 
 
 class StepTracer:
     """Traces and persists individual reasoning steps for an agent run."""
 
-    def __init__(self, agent_name: str, case_id: str, metadata: Optional[Dict[str, Any]] = None):
+    def __init__(self, agent_name: str, case_id: str, metadata: Optional[Dict[str, Any]] = None,
+                 run: Optional[Dict[str, Any]] = None):
         self.agent_name = agent_name
         self.case_id = case_id
-        self.run = start_agent_run(agent_name, case_id, metadata)
+        # The agent_runs document, started here unless already started
+        self.run = run if run is not None else start_agent_run(agent_name, case_id, metadata)
         self.steps_executed: List[Dict[str, Any]] = []
+        # LLM usage totals across all steps of the run
+        self.usage: Dict[str, Any] = llm_client.summarize_calls([])
 
     def run_step(self, step_name: str, fn: Callable[[], Any]) -> Dict[str, Any]:
         """Execute a single step and persist its output.
@@ -42,35 +55,54 @@ class StepTracer:
             Dict with 'output' and 'step_id'
         """
         start_time = time.time()
-        try:
-            output = fn()
-            status = "success"
-            error = None
-        except Exception as e:
-            output = None
-            status = "error"
-            error = str(e)
+        with llm_client.record_calls() as llm_calls:
+            try:
+                output = fn()
+                status = "success"
+                error = None
+            except Exception as e:
+                output = None
+                status = "error"
+                error = str(e)
 
         duration_ms = int((time.time() - start_time) * 1000)
-
-        # Persist to MongoDB
-        step_doc = write_reasoning_step(
-            self.run["run_id"],
-            step_name,
-            {
-                "output": output,
-                "status": status,
-                "error": error,
-                "duration_ms": duration_ms
-            }
-        )
-
-        result = {
+        return self._record_step(step_name, output, status, error, duration_ms, llm_calls)
+
+    def _record_step(self, step_name: str, output: Any, status: str, error: Optional[str],
+                     duration_ms: int, llm_calls: List[Dict[str, Any]],
+                     extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Persist a finished step to MongoDB and add it to the executed steps."""
+        content = self._step_content(output, status, error, duration_ms, llm_calls, extra)
+        step_doc = write_reasoning_step(self.run["run_id"], step_name, content)
+        return self._add_step(step_name, content, step_doc)
+
+    def _step_content(self, output: Any, status: str, error: Optional[str], duration_ms: int,
+                      llm_calls: List[Dict[str, Any]], extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """The reasoning step document's content; adds the step's LLM usage to the run's."""
+        content = {
             "output": output,
-            "step_id": step_doc.get("step_id"),
             "status": status,
             "error": error,
-            "duration_ms": duration_ms
+            "duration_ms": duration_ms,
+            **(extra or {})
+        }
+        if llm_calls:
+            # Which model(s) of the cascade answered this step, and at what cost
+            content["model"] = llm_calls[-1]["model"]
+            content["llm_calls"] = llm_calls
+            content["llm_usage"] = llm_client.summarize_calls(llm_calls)
+            llm_client.merge_usage(self.usage, content["llm_usage"])
+        return content
+
+    def _add_step(self, step_name: str, content: Dict[str, Any], step_doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Add a persisted step to the executed steps."""
+        result = {
+            "output": content["output"],
+            "step_id": step_doc.get("step_id"),
+            "status": content["status"],
+            "error": content["error"],
+            "duration_ms": content["duration_ms"],
+            "model": content.get("model")
         }
 
         self.steps_executed.append({
@@ -95,8 +127,9 @@ class StepTracer:
         return results
 
     def finish(self, status: str = "completed", result: Optional[Dict[str, Any]] = None):
-        """Mark the agent run as finished."""
-        finish_agent_run(self.run["run_id"], status, result)
+        """Mark the agent run as finished and roll its LLM usage up onto the case."""
+        finish_agent_run(self.run["run_id"], status, result, usage=self.usage)
+        add_case_usage(self.case_id, self.usage, agent=self.agent_name)
 
     @property
     def run_id(self) -> str:
@@ -139,52 +172,42 @@ def build_and_run_simple_graph(
 
 
 class AsyncStepTracer(StepTracer):
-    """Async version of StepTracer for use with asyncio."""
+    """Async version of StepTracer for use with asyncio.
+
+    Its Mongo writes run in worker threads, off the event loop: create it with
+    `await AsyncStepTracer.start(...)` and end it with `finish_async`.
+    """
+
+    @classmethod
+    async def start(cls, agent_name: str, case_id: str,
+                    metadata: Optional[Dict[str, Any]] = None) -> "AsyncStepTracer":
+        """Start an agent run and return its tracer."""
+        run = await asyncio.to_thread(start_agent_run, agent_name, case_id, metadata)
+        return cls(agent_name, case_id, metadata, run=run)
 
     async def run_step_async(self, step_name: str, fn: Callable[[], Any]) -> Dict[str, Any]:
         """Execute a step asynchronously."""
-        import asyncio
-
         start_time = time.time()
-        try:
-            if asyncio.iscoroutinefunction(fn):
-                output = await fn()
-            else:
-                output = await asyncio.to_thread(fn)
-            status = "success"
-            error = None
-        except Exception as e:
-            output = None
-            status = "error"
-            error = str(e)
+        with llm_client.record_calls() as llm_calls:
+            try:
+                if asyncio.iscoroutinefunction(fn):
+                    output = await fn()
+                else:
+                    output = await asyncio.to_thread(fn)
+                status = "success"
+                error = None
+            except Exception as e:
+                output = None
+                status = "error"
+                error = str(e)
+            except asyncio.CancelledError:
+                # Analysis cancelled mid-step: keep the partial trace, then stop
+                await self._record_step_async(step_name, None, "cancelled", "Cancelled",
+                                              int((time.time() - start_time) * 1000), llm_calls)
+                raise
 
         duration_ms = int((time.time() - start_time) * 1000)
-
-        step_doc = write_reasoning_step(
-            self.run["run_id"],
-            step_name,
-            {
-                "output": output,
-                "status": status,
-                "error": error,
-                "duration_ms": duration_ms
-            }
-        )
-
-        result = {
-            "output": output,
-            "step_id": step_doc.get("step_id"),
-            "status": status,
-            "error": error,
-            "duration_ms": duration_ms
-        }
-
-        self.steps_executed.append({
-            "step_name": step_name,
-            **result
-        })
-
-        return result
+        return await self._record_step_async(step_name, output, status, error, duration_ms, llm_calls)
 
     async def run_steps_async(self, steps: Dict[str, Callable[[], Any]]) -> Dict[str, Dict[str, Any]]:
         """Execute steps asynchronously in sequence."""
@@ -192,3 +215,222 @@ class AsyncStepTracer(StepTracer):
         for name, fn in steps.items():
             results[name] = await self.run_step_async(name, fn)
         return results
+
+    async def _record_step_async(self, step_name: str, output: Any, status: str, error: Optional[str],
+                                 duration_ms: int, llm_calls: List[Dict[str, Any]],
+                                 extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """`_record_step`, writing the step in a worker thread."""
+        content = self._step_content(output, status, error, duration_ms, llm_calls, extra)
+        step_doc = await asyncio.to_thread(write_reasoning_step, self.run["run_id"], step_name, content)
+        return self._add_step(step_name, content, step_doc)
+
+    async def finish_async(self, status: str = "completed", result: Optional[Dict[str, Any]] = None):
+        """`finish`, writing in a worker thread."""
+        await asyncio.to_thread(self.finish, status, result)
+
+    async def raise_on_error_async(self, step_name: str, step: Dict[str, Any]):
+        """Fail the run if a step errored.
+
+        run_step_async records a failed step instead of raising. Agents call
+        this after their generation step, so a failed LLM call fails the
+        stage before any argument or strategy is written (and the stage is
+        never checkpointed).
+        """
+        if step["status"] != "error":
+            return
+        error = f"{self.agent_name} {step_name} failed: {step['error']}"
+        await self.finish_async(status="failed", result={"error": error})
+        raise RuntimeError(error)
+
+
+# ============================================================================
+# Graph Execution
+# ============================================================================
+
+class GraphNode:
+    """A node of an AgentGraph."""
+
+    def __init__(self, name: str, fn: Callable[[Dict[str, Any]], Awaitable[Any]],
+                 depends_on: Iterable[str] = (),
+                 when: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 trace_output: Optional[Callable[[Any], Any]] = None):
+        self.name = name
+        self.fn = fn
+        self.depends_on = list(depends_on)
+        self.when = when
+        self.trace_output = trace_output
+
+
+class AgentGraph:
+    """
+    A DAG of async nodes executed with per-node tracing.
+
+    A node runs once every node it depends on has finished (or was skipped
+    or restored).
+    Nodes whose dependencies are satisfied at the same time run concurrently.
+    A node with a `when` condition is skipped when the condition is false,
+    which acts as a conditional edge. If a node fails, the nodes still
+    running are cancelled and the error is raised from `run`.
+
+    Each node receives the results of all finished nodes (by name) and is
+    recorded as a step of the graph's run in `reasoning_steps`, with its
+    dependencies and start offset, so overlapping nodes are visible in the
+    trace.
+
+    `run(restored=...)` resumes a graph: restored nodes count as finished
+    with the given results and are not executed (traced as "restored").
+    `on_complete` is awaited after each node succeeds, e.g. to checkpoint it.
+    """
+
+    def __init__(self, name: str, case_id: str, max_concurrency: Optional[int] = None,
+                 metadata: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.case_id = case_id
+        self.max_concurrency = max_concurrency
+        self.metadata = metadata or {}
+        self.nodes: Dict[str, GraphNode] = {}
+
+    def add_node(self, name: str, fn: Callable[[Dict[str, Any]], Awaitable[Any]],
+                 depends_on: Iterable[str] = (),
+                 when: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 trace_output: Optional[Callable[[Any], Any]] = None) -> "AgentGraph":
+        """
+        Add a node to the graph.
+
+        Args:
+            name: Unique node name (also the step name in the trace)
+            fn: Async callable taking the results of finished nodes
+            depends_on: Names of nodes that must finish first
+            when: Optional condition on the results so far; the node is
+                skipped when it returns False
+            trace_output: Optional function reducing the node's result to
+                what is stored in the trace (default: the result itself)
+
+        Returns:
+            The graph, for chaining
+        """
+        if name in self.nodes:
+            raise ValueError(f"Duplicate graph node: {name}")
+        self.nodes[name] = GraphNode(name, fn, depends_on, when, trace_output)
+        return self
+
+    def _validate(self):
+        """Check that dependencies exist and the graph has no cycles."""
+        for node in self.nodes.values():
+            for dep in node.depends_on:
+                if dep not in self.nodes:
+                    raise ValueError(f"Node {node.name} depends on unknown node {dep}")
+        visited: Dict[str, str] = {}
+
+        def visit(name: str):
+            if visited.get(name) == "done":
+                return
+            if visited.get(name) == "visiting":
+                raise ValueError(f"Cycle in graph at node {name}")
+            visited[name] = "visiting"
+            for dep in self.nodes[name].depends_on:
+                visit(dep)
+            visited[name] = "done"
+
+        for name in self.nodes:
+            visit(name)
+
+    async def run(self, restored: Optional[Dict[str, Any]] = None,
+                  on_complete: Optional[Callable[[str, Any], Awaitable[None]]] = None) -> Dict[str, Any]:
+        """
+        Execute the graph.
+
+        Args:
+            restored: Results of nodes completed by an earlier run, by name
+            on_complete: Optional coroutine function(name, result), awaited after each node succeeds
+
+        Returns:
+            Dict mapping node name to its result (skipped nodes are absent)
+        """
+        self._validate()
+        tracer = await AsyncStepTracer.start(self.name, self.case_id, metadata={
+            **self.metadata,
+            "graph": {name: node.depends_on for name, node in self.nodes.items()}
+        })
+        semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+        graph_start = time.time()
+        results: Dict[str, Any] = {}
+        status: Dict[str, str] = {}
+        pending = list(self.nodes)
+        running: Dict[asyncio.Task, str] = {}
+
+        for name, result in (restored or {}).items():
+            if name in self.nodes:
+                results[name] = result
+                status[name] = "restored"
+                pending.remove(name)
+
+        async def execute(node: GraphNode):
+            if semaphore is None:
+                return await node.fn(results)
+            async with semaphore:
+                return await node.fn(results)
+
+        async def record(node: GraphNode, node_status: str, started: float,
+                         output: Any = None, error: Optional[str] = None):
+            traced = node.trace_output(output) if (node.trace_output and output is not None) else output
+            await tracer._record_step_async(
+                node.name, traced, node_status, error,
+                int((time.time() - started) * 1000), [],
+                extra={
+                    "depends_on": node.depends_on,
+                    "started_offset_ms": int((started - graph_start) * 1000)
+                }
+            )
+
+        started_at: Dict[str, float] = {}
+        for name in results:
+            await record(self.nodes[name], "restored", graph_start, output=results[name])
+        try:
+            while pending or running:
+                ready = [
+                    name for name in pending
+                    if all(status.get(dep) in ("success", "skipped", "restored") for dep in self.nodes[name].depends_on)
+                ]
+                skipped_any = False
+                for name in ready:
+                    pending.remove(name)
+                    node = self.nodes[name]
+                    if node.when is not None and not node.when(results):
+                        status[name] = "skipped"
+                        await record(node, "skipped", time.time())
+                        skipped_any = True
+                        continue
+                    started_at[name] = time.time()
+                    running[asyncio.create_task(execute(node))] = name
+                if skipped_any:
+                    # Skips can make further nodes ready without waiting
+                    continue
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    node = self.nodes[name]
+                    error = task.exception()
+                    if error is not None:
+                        status[name] = "error"
+                        await record(node, "error", started_at[name], error=str(error))
+                        raise error
+                    results[name] = task.result()
+                    status[name] = "success"
+                    await record(node, "success", started_at[name], output=results[name])
+                    if on_complete is not None:
+                        await on_complete(name, results[name])
+        except BaseException as e:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            cancelled = isinstance(e, asyncio.CancelledError)
+            await tracer.finish_async(status="cancelled" if cancelled else "failed", result={"nodes": status})
+            raise
+
+        await tracer.finish_async(status="completed", result={"nodes": status})
+        return results
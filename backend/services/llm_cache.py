@@ -0,0 +1,193 @@
+"""
+Content-addressed cache for LLM responses.
+
+Responses are keyed by a hash of (model, system prompt, user prompt,
+temperature, max_tokens), so an identical request never reaches the API
+twice while its entry is fresh. The cache has two tiers:
+
+- A bounded in-process LRU (config.LLM_CACHE_MAX_ENTRIES)
+- A MongoDB collection (`llm_cache`) with a TTL index, shared across
+  processes and restarts
+
+Concurrent identical requests are deduplicated (single-flight): the first
+caller computes the response, later callers await the same result.
+
+Caching is opt-in per agent via config.LLM_CACHE_AGENTS, since
+high-temperature agents may want a fresh sample on every call.
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import time
+import config
+import database
+
+
+def make_key(model: str, system_prompt: str, prompt: str,
+             temperature: float, max_tokens: int) -> str:
+    """Build the content-addressed cache key for a completion request."""
+    payload = json.dumps(
+        [model, system_prompt, prompt, temperature, max_tokens],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Two-tier (memory LRU + Mongo) response cache with single-flight dedup."""
+
+    def __init__(self, max_entries: int = None, ttl_seconds: int = None):
+        self.max_entries = max_entries or config.LLM_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or config.LLM_CACHE_TTL_SECONDS
+        # key -> (stored_at monotonic time, response text)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.deduplicated = 0
+        self.misses = 0
+
+    async def get_or_compute(self, key: str,
+                             compute: Callable[[], Awaitable[str]],
+                             on_hit: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Return the cached response for `key`, computing and storing it on a miss.
+
+        Args:
+            key: Cache key from `make_key`
+            compute: Coroutine factory producing the response on a miss
+            on_hit: Optional callback invoked with the full text when the
+                response did not come from `compute` in this call (e.g. to
+                deliver it to a token stream in one piece)
+
+        Returns:
+            str: The response text
+        """
+        while True:
+            cached = self._memory_get(key)
+            if cached is not None:
+                self.memory_hits += 1
+                return self._deliver(cached, on_hit)
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                response = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if inflight.cancelled():
+                    # The caller computing this entry was cancelled; take over
+                    continue
+                raise
+            self.deduplicated += 1
+            return self._deliver(response, on_hit)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            cached = await asyncio.to_thread(self._persistent_get, key)
+            if cached is not None:
+                self.persistent_hits += 1
+                self._memory_set(key, cached)
+                future.set_result(cached)
+                return self._deliver(cached, on_hit)
+
+            self.misses += 1
+            response = await compute()
+            self._memory_set(key, response)
+            await asyncio.to_thread(self._persistent_set, key, response)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+                # Mark retrieved so an unawaited failure doesn't log a warning
+                future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        hits = self.memory_hits + self.persistent_hits + self.deduplicated
+        total = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "deduplicated": self.deduplicated,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+        }
+
+    @staticmethod
+    def _deliver(response: str, on_hit: Optional[Callable[[str], None]]) -> str:
+        if on_hit is not None:
+            on_hit(response)
+        return response
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, response = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def _memory_set(self, key: str, response: str):
+        self._entries[key] = (time.monotonic(), response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _persistent_get(self, key: str) -> Optional[str]:
+        try:
+            collection = database.get_llm_cache_collection()
+            doc = collection.find_one({"key": key}, {"_id": 0, "response": 1, "created_at": 1})
+        except Exception as e:
+            print(f"Warning: Could not read LLM cache: {e}")
+            return None
+        if not doc:
+            return None
+        # The TTL monitor only runs periodically, so check freshness here too
+        if doc["created_at"] < datetime.utcnow() - timedelta(seconds=self.ttl_seconds):
+            return None
+        return doc["response"]
+
+    def _persistent_set(self, key: str, response: str):
+        try:
+            collection = database.get_llm_cache_collection()
+            collection.update_one(
+                {"key": key},
+                {"$set": {"key": key, "response": response, "created_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Warning: Could not persist LLM cache entry: {e}")
+
+
+# Process-wide cache instance
+_cache: Optional[LLMCache] = None
+
+
+def get_cache() -> LLMCache:
+    """Get or create the process-wide LLM cache."""
+    global _cache
+    if _cache is None:
+        _cache = LLMCache()
+    return _cache
+
+
+def is_enabled_for(caller: str) -> bool:
+    """Whether responses for the given agent/service name should be cached."""
+    return caller in config.LLM_CACHE_AGENTS
@@ -0,0 +1,398 @@
+"""
+Shared async LLM client for all agents and services.
+
+Every agent (Harvey, Louis, Tanner, Jessica), the conflict detector and the
+document processor send their completions through this module. One AsyncGroq
+client is created per process and backed by a single keep-alive HTTP
+connection pool, so concurrency is bounded by the pool size
+(config.LLM_MAX_CONNECTIONS) rather than by the default thread pool.
+Every request first acquires capacity from the process-wide rate limiter
+(services/rate_limiter.py), so calls queue instead of tripping Groq limits,
+and runs under the per-model retry policy and circuit breaker
+(services/retry_policy.py). The SDK's own retries are disabled so that
+policy is the only one in effect.
+
+Model cascade: each call starts on the primary model. If it has not
+answered within config.LLM_LATENCY_BUDGET_MS (time to first token when
+streaming), the next model in config.GROQ_FALLBACK_MODELS is started as a
+hedge and whichever answers first wins. If a model fails outright, the next
+one is tried immediately.
+
+Every completed call is appended to the active call log (see `record_calls`)
+with its telemetry: model, queue wait in the rate limiter, time to first
+token, total latency, prompt/completion tokens (from the provider's usage,
+estimated if absent) and estimated cost (config.LLM_PRICING). StepTracer
+attaches the log to the reasoning step and rolls it up onto the agent run
+and the case.
+
+Both a one-shot (`chat_completion`) and a token-streaming
+(`stream_chat_completion`) request are provided. With LLM_BACKEND=mock the
+Groq client is replaced by the local mock in services/mock_llm.py. To use a
+different LLM provider, replace the client construction in `get_client` and
+the request in `_create_completion`.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import (Any, AsyncIterator, Awaitable, Callable, Dict, Iterator,
+                    List, Optional, Tuple, TypeVar)
+import asyncio
+import time
+import httpx
+from groq import AsyncGroq
+import config
+from services import mock_llm, rate_limiter, retry_policy
+
+T = TypeVar("T")
+
+_client: Optional[AsyncGroq] = None
+
+# Call log of the reasoning step currently executing (None outside a step)
+_call_log: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("llm_call_log", default=None)
+
+
+def get_client() -> AsyncGroq:
+    """Get or create the shared async Groq client (or the mock, with LLM_BACKEND=mock)."""
+    global _client
+    if _client is None and config.LLM_BACKEND == "mock":
+        _client = mock_llm.MockLLMClient(seed=config.MOCK_LLM_SEED)
+    if _client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            # pool=None: wait for a free connection rather than raising PoolTimeout
+            timeout=httpx.Timeout(config.LLM_REQUEST_TIMEOUT, pool=None),
+        )
+        _client = AsyncGroq(api_key=config.GROQ_API_KEY, http_client=http_client, max_retries=0)
+    return _client
+
+
+def backend_stats() -> Dict[str, Any]:
+    """Which LLM backend is in use, with mock counters when it is the mock."""
+    stats: Dict[str, Any] = {"backend": config.LLM_BACKEND}
+    if isinstance(_client, mock_llm.MockLLMClient):
+        stats["mock"] = _client.stats()
+    return stats
+
+
+async def close_client():
+    """Close the shared client and its connection pool."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+# ============================================================================
+# Call Log
+# ============================================================================
+
+@contextmanager
+def record_calls() -> Iterator[List[Dict[str, Any]]]:
+    """Collect a record of every LLM call made inside the `with` block.
+
+    The log follows the current context, so calls made from awaited
+    coroutines and from `asyncio.to_thread` workers are captured too.
+    """
+    calls: List[Dict[str, Any]] = []
+    token = _call_log.set(calls)
+    try:
+        yield calls
+    finally:
+        _call_log.reset(token)
+
+
+def record_call(entry: Dict[str, Any]):
+    """Append an entry to the active call log, if any."""
+    calls = _call_log.get()
+    if calls is not None:
+        calls.append(entry)
+
+
+# ============================================================================
+# Model Cascade
+# ============================================================================
+
+def model_cascade(model: Optional[str] = None) -> List[str]:
+    """Ordered models to try: the requested (or primary) model, then the fallbacks."""
+    models = [model or config.GROQ_MODEL]
+    for fallback in config.GROQ_FALLBACK_MODELS:
+        if fallback not in models:
+            models.append(fallback)
+    return models
+
+
+async def _cascade(models: List[str],
+                   start: Callable[[str], Awaitable[T]],
+                   discard: Optional[Callable[[T], Awaitable[None]]] = None
+                   ) -> Tuple[str, T, Dict[str, Any]]:
+    """
+    Run `start(model)` along the cascade until one model succeeds.
+
+    The next model is started as a hedge when no running model has finished
+    within the latency budget, or immediately when every running model failed.
+    Losing results are passed to `discard` (e.g. to close their streams).
+
+    Returns:
+        (model that answered, its result, cascade details for the call log)
+    """
+    budget = config.LLM_LATENCY_BUDGET_MS / 1000 if config.LLM_LATENCY_BUDGET_MS > 0 else None
+    pending: Dict[asyncio.Task, str] = {}
+    attempted: List[str] = []
+    hedged = False
+    last_error: Optional[BaseException] = None
+
+    def launch():
+        model = models[len(attempted)]
+        attempted.append(model)
+        pending[asyncio.create_task(start(model))] = model
+
+    launch()
+    try:
+        while pending:
+            can_hedge = config.LLM_HEDGE and budget is not None and len(attempted) < len(models)
+            done, _ = await asyncio.wait(
+                pending, timeout=budget if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                print(f"[LLM] {', '.join(pending.values())} exceeded the "
+                      f"{config.LLM_LATENCY_BUDGET_MS}ms budget; hedging with {models[len(attempted)]}")
+                hedged = True
+                launch()
+                continue
+
+            winner = None
+            for task in done:
+                model = pending.pop(task)
+                if task.exception() is not None:
+                    last_error = task.exception()
+                    print(f"[LLM] Model {model} failed: {last_error}")
+                elif winner is None:
+                    winner = (model, task.result())
+                elif discard is not None:
+                    await discard(task.result())
+            if winner is not None:
+                return winner[0], winner[1], {
+                    "attempted_models": attempted,
+                    "hedged": hedged,
+                    "fallback": winner[0] != models[0],
+                }
+            if not pending and len(attempted) < len(models):
+                print(f"[LLM] Falling back to {models[len(attempted)]}")
+                launch()
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            # Let cancelled attempts release their connections and breaker trials
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+# ============================================================================
+# Telemetry
+# ============================================================================
+
+USAGE_FIELDS = ("calls", "cached_calls", "prompt_tokens", "completion_tokens",
+                "total_tokens", "cost_usd", "latency_ms", "queue_wait_ms")
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of a call from config.LLM_PRICING (0 for unpriced models)."""
+    pricing = config.LLM_PRICING.get(model)
+    if not pricing:
+        return 0.0
+    return (prompt_tokens * pricing["input"] + completion_tokens * pricing["output"]) / 1_000_000
+
+
+def summarize_calls(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Totals over call log entries (tokens, cost, latency, queue wait)."""
+    usage = {field: 0 for field in USAGE_FIELDS}
+    for call in calls:
+        usage["calls"] += 1
+        if call.get("cached"):
+            usage["cached_calls"] += 1
+        for field in USAGE_FIELDS[2:]:
+            usage[field] += call.get(field, 0) or 0
+    usage["cost_usd"] = round(usage["cost_usd"], 6)
+    return usage
+
+
+def merge_usage(total: Dict[str, Any], usage: Dict[str, Any]) -> Dict[str, Any]:
+    """Add one usage summary into another (in place) and return it."""
+    for field in USAGE_FIELDS:
+        total[field] = total.get(field, 0) + usage.get(field, 0)
+    total["cost_usd"] = round(total["cost_usd"], 6)
+    return total
+
+
+def _usage_entry(model: str, usage: Any, system_prompt: str, prompt: str,
+                 completion: str) -> Dict[str, Any]:
+    """Token counts and cost for a call, estimated when the provider sent no usage."""
+    if usage is not None:
+        prompt_tokens = usage.prompt_tokens or 0
+        completion_tokens = usage.completion_tokens or 0
+        estimated = False
+    else:
+        prompt_tokens = rate_limiter.estimate_tokens(system_prompt) + rate_limiter.estimate_tokens(prompt)
+        completion_tokens = rate_limiter.estimate_tokens(completion)
+        estimated = True
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "tokens_estimated": estimated,
+        "cost_usd": round(estimate_cost(model, prompt_tokens, completion_tokens), 6),
+    }
+
+
+# ============================================================================
+# Requests
+# ============================================================================
+
+async def _create_completion(system_prompt: str, prompt: str,
+                             temperature: Optional[float],
+                             max_tokens: Optional[int],
+                             model: str,
+                             stream: bool = False,
+                             telemetry: Optional[Dict[str, Any]] = None):
+    """Issue the chat completion request to one model with defaults from config.
+
+    Each attempt acquires rate-limit capacity; retries and fail-fast are
+    governed by the model's retry policy. Time spent queued in the rate
+    limiter and the attempt count are added to `telemetry`, if given.
+    """
+    max_tokens = max_tokens or config.GROQ_MAX_TOKENS
+    estimated_tokens = rate_limiter.estimate_request_tokens(system_prompt, prompt, max_tokens)
+    if telemetry is not None:
+        telemetry.update(queue_wait_ms=0, attempts=0)
+
+    async def attempt():
+        waited = await rate_limiter.get_limiter().acquire(estimated_tokens)
+        if telemetry is not None:
+            telemetry["queue_wait_ms"] += int(waited * 1000)
+            telemetry["attempts"] += 1
+        client = get_client()
+        return await client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=config.GROQ_TEMPERATURE if temperature is None else temperature,
+            max_tokens=max_tokens,
+            stream=stream
+        )
+
+    return await retry_policy.get_policy(model).run(attempt, label=model)
+
+
+async def chat_completion(system_prompt: str, prompt: str,
+                          temperature: float = None,
+                          max_tokens: int = None,
+                          model: str = None) -> str:
+    """
+    Send a single chat completion request and return the response text.
+
+    Args:
+        system_prompt: System prompt defining the assistant's role
+        prompt: The user prompt
+        temperature: Sampling temperature (default: config.GROQ_TEMPERATURE)
+        max_tokens: Maximum response length (default: config.GROQ_MAX_TOKENS)
+        model: Primary model of the cascade (default: config.GROQ_MODEL)
+
+    Returns:
+        str: The LLM's response text
+    """
+    started = time.monotonic()
+    telemetry: Dict[str, Dict[str, Any]] = {}
+    answered_by, response, details = await _cascade(
+        model_cascade(model),
+        lambda m: _create_completion(system_prompt, prompt, temperature, max_tokens, m,
+                                     telemetry=telemetry.setdefault(m, {}))
+    )
+    content = response.choices[0].message.content
+    record_call({
+        "model": answered_by,
+        "latency_ms": int((time.monotonic() - started) * 1000),
+        **telemetry[answered_by],
+        **_usage_entry(answered_by, getattr(response, "usage", None), system_prompt, prompt, content),
+        "streamed": False,
+        **details
+    })
+    return content
+
+
+def _chunk_delta(chunk) -> Optional[str]:
+    if not chunk.choices:
+        return None
+    return chunk.choices[0].delta.content
+
+
+def _chunk_usage(chunk) -> Any:
+    """Usage reported on a stream chunk (Groq sends it on the last one, under x_groq)."""
+    x_groq = getattr(chunk, "x_groq", None)
+    return getattr(x_groq, "usage", None) or getattr(chunk, "usage", None)
+
+
+async def stream_chat_completion(system_prompt: str, prompt: str,
+                                 temperature: float = None,
+                                 max_tokens: int = None,
+                                 model: str = None) -> AsyncIterator[str]:
+    """
+    Send a streaming chat completion request and yield text deltas as they arrive.
+
+    Arguments are the same as `chat_completion`. The latency budget applies
+    to the first token: a model that has not produced one in time is hedged.
+
+    Yields:
+        str: Successive non-empty chunks of the response text
+    """
+    started = time.monotonic()
+    telemetry: Dict[str, Dict[str, Any]] = {}
+
+    async def open_stream(m: str):
+        """Open a stream on model `m` and wait for its first text delta."""
+        stream = await _create_completion(system_prompt, prompt, temperature, max_tokens, m,
+                                          stream=True, telemetry=telemetry.setdefault(m, {}))
+        try:
+            async for chunk in stream:
+                delta = _chunk_delta(chunk)
+                if delta:
+                    return stream, delta
+            return stream, ""
+        except BaseException:
+            await stream.close()
+            raise
+
+    async def close_stream(opened):
+        await opened[0].close()
+
+    answered_by, (stream, first_delta), details = await _cascade(
+        model_cascade(model), open_stream, discard=close_stream
+    )
+    first_token_ms = int((time.monotonic() - started) * 1000)
+    chunks = [first_delta]
+    usage = None
+    try:
+        if first_delta:
+            yield first_delta
+        async for chunk in stream:
+            usage = _chunk_usage(chunk) or usage
+            delta = _chunk_delta(chunk)
+            if delta:
+                chunks.append(delta)
+                yield delta
+    finally:
+        await stream.close()
+    record_call({
+        "model": answered_by,
+        "latency_ms": int((time.monotonic() - started) * 1000),
+        "first_token_ms": first_token_ms,
+        **telemetry[answered_by],
+        **_usage_entry(answered_by, usage, system_prompt, prompt, "".join(chunks)),
+        "streamed": True,
+        **details
+    })
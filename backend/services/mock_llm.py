@@ -0,0 +1,316 @@
+"""
+Local mock LLM backend for offline runs, benchmarks and load tests.
+
+Selected with LLM_BACKEND=mock (see config.py). `llm_client.get_client`
+then returns a `MockLLMClient` instead of the Groq client. It answers the
+same `client.chat.completions.create(...)` calls, one-shot and streaming, so
+the whole pipeline runs unchanged: rate limiter, retry policy, model
+cascade, cache, tracing and Mongo writes. Only the network call is replaced.
+
+Modes (config.MOCK_LLM_MODE):
+
+- deterministic: canned responses per agent, returned immediately. Tanner's
+  response has an "Attack Vectors" section, Jessica's has "Rejected
+  Alternatives", conflict detection gets a JSON array and the case brief a
+  short digest. Identical prompts always produce identical responses.
+- latency: the same responses after a log-normal delay with median
+  MOCK_LLM_LATENCY_MS and spread MOCK_LLM_LATENCY_SIGMA. Streams are split
+  into chunks delivered over that delay.
+- chaos: latency, plus a failure rate of MOCK_LLM_ERROR_RATE. Each failure
+  raises an error with a status code drawn from MOCK_LLM_ERROR_STATUSES
+  (429s carry a Retry-After header), which the retry policy classifies
+  exactly like a Groq API error.
+
+Random draws use MOCK_LLM_SEED, so runs can be reproduced.
+"""
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+import config
+
+# Characters per streamed chunk
+STREAM_CHUNK_CHARS = 24
+
+
+class MockLLMError(Exception):
+    """Injected API failure, shaped like groq.APIStatusError (status_code, response)."""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"Mock LLM error {status_code}")
+        self.status_code = status_code
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+# ============================================================================
+# Canned Responses
+# ============================================================================
+
+HARVEY_RESPONSE = """## Primary Strategy Recommendation
+Go to trial, but open settlement talks from a position of strength. ({ref})
+
+## Key Leverage Points
+- The written agreement is unambiguous on the disputed obligation
+- The defendant's own correspondence acknowledges the breach
+- Discovery will expose internal documents they do not want public
+
+## Strategic Sequence
+1. Serve targeted discovery requests on the key communications
+2. Move for partial summary judgment on liability
+3. Use the ruling to force a favorable settlement
+
+## Critical Assumptions
+- The correspondence is authentic and admissible
+- Damages can be documented with contemporaneous records
+
+## Risk Assessment
+- A court could read the contract term more narrowly; mitigate with course-of-dealing evidence
+"""
+
+LOUIS_RESPONSE = """## Relevant Precedent Cases
+1. **Hadley v. Baxendale**, 9 Ex. 341 (1854) - consequential damages limited to foreseeable losses. ({ref})
+2. **Jacob & Youngs v. Kent**, 230 N.Y. 239 (1921) - substantial performance doctrine.
+3. **Lucy v. Zehmer**, 196 Va. 493 (1954) - objective theory of contract formation.
+
+## Applicable Legal Doctrines
+- Implied covenant of good faith and fair dealing
+- Plain-meaning rule for unambiguous contract terms
+
+## Distinguishing Unfavorable Precedents
+- Opposing counsel will cite cases on ambiguity; our contract language is express
+
+## Technical Legal Arguments
+- The notice provision was satisfied by the documented email exchange
+"""
+
+TANNER_RESPONSE = """## Three Weakest Points
+1. The damages theory relies on projections, not actual losses. ({ref})
+2. The key witness has a documented financial interest in the outcome.
+3. The notice provision was arguably never satisfied.
+
+## Strongest Counterarguments
+- The contract term is ambiguous and must be construed against the drafter
+- Plaintiff's own delays contributed to the losses claimed
+
+## Cross-Examination Traps
+- Walk the witness through the timeline until the delay is undeniable
+
+## Damaging Evidence
+- Internal emails discussing the deal's weaknesses before signing
+
+## Attack Vectors
+- Challenge the damages methodology
+- Impeach the key witness on bias
+- Argue contract ambiguity and contra proferentem
+- Assert failure of contractual notice
+"""
+
+JESSICA_RESPONSE = """## Executive Summary
+We proceed toward trial while preparing a settlement floor, combining Harvey's leverage with Louis's precedent and closing the gaps Tanner exposed. ({ref})
+
+## Decision
+Trial preparation with a parallel settlement track. Key arguments: breach of an express term and foreseeable damages.
+
+## Action Plan
+1. Lock down the authenticity of the key correspondence
+2. Retain a damages expert to replace projections with actual losses
+3. Prepare the key witness for bias cross-examination
+4. Make a settlement demand after the summary judgment ruling
+
+## Risk Mitigation
+- Address the notice issue head-on with the email record
+
+## Rejected Alternatives
+- Immediate settlement - gives up leverage before discovery
+- Pure litigation with no settlement track - unnecessary cost and risk
+- Relying on projected damages alone - too easy for Tanner to attack
+"""
+
+CASE_BRIEF_RESPONSE = """Plaintiff and defendant entered a written supply agreement. The defendant stopped deliveries midway through the term despite written notice, citing cost increases. Plaintiff documented the resulting losses and seeks damages of about $500,000. Key evidence: the agreement, the notice emails and internal cost records. ({ref})"""
+
+GENERIC_RESPONSE = "Mock response ({ref})."
+
+
+def _conflicts_response(ref: str) -> str:
+    return json.dumps([
+        {
+            "agents_involved": ["Harvey", "Tanner"],
+            "issue": "Strength of the damages theory",
+            "description": f"Harvey relies on documented damages while Tanner argues they are speculative projections. ({ref})"
+        },
+        {
+            "agents_involved": ["Harvey", "Louis"],
+            "issue": "Trial versus early settlement",
+            "description": "Harvey favors trial leverage while Louis's precedents suggest damages could be capped, favoring settlement."
+        }
+    ], indent=2)
+
+
+def _document_response(ref: str) -> str:
+    return json.dumps({
+        "caseTitle": "Mock Plaintiff v. Mock Defendant",
+        "caseType": "Contract Dispute",
+        "plaintiffName": "Mock Plaintiff",
+        "defendantName": "Mock Defendant",
+        "otherParties": "",
+        "jurisdiction": "California",
+        "caseDescription": f"Mock extracted case description ({ref}).",
+        "moneyAtStake": "500000",
+        "stakesRange": "500k-1m",
+        "caseStatus": "Pre-litigation",
+        "keyDates": []
+    })
+
+
+def canned_response(system_prompt: str, prompt: str) -> str:
+    """Deterministic response for a request, chosen by the calling agent's system prompt."""
+    ref = "ref " + hashlib.sha256(f"{system_prompt}\n{prompt}".encode("utf-8")).hexdigest()[:8]
+    if "Harvey Specter" in system_prompt:
+        return HARVEY_RESPONSE.format(ref=ref)
+    if "Louis Litt" in system_prompt:
+        return LOUIS_RESPONSE.format(ref=ref)
+    if "Travis Tanner" in system_prompt:
+        return TANNER_RESPONSE.format(ref=ref)
+    if "Jessica Pearson" in system_prompt:
+        return JESSICA_RESPONSE.format(ref=ref)
+    if "case summarizer" in system_prompt:
+        return CASE_BRIEF_RESPONSE.format(ref=ref)
+    if "conflicts" in system_prompt:
+        return _conflicts_response(ref)
+    if "document processor" in system_prompt:
+        return _document_response(ref)
+    return GENERIC_RESPONSE.format(ref=ref)
+
+
+# ============================================================================
+# Client
+# ============================================================================
+
+def _usage(prompt_text: str, content: str) -> SimpleNamespace:
+    prompt_tokens = len(prompt_text) // 4 + 1
+    completion_tokens = len(content) // 4 + 1
+    return SimpleNamespace(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens,
+    )
+
+
+class MockStream:
+    """Async iterator of completion chunks, shaped like the Groq stream."""
+
+    def __init__(self, model: str, content: str, delay: float, usage: SimpleNamespace):
+        self._pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+        self._per_chunk_delay = delay / max(1, len(self._pieces))
+        self._model = model
+        self._usage = usage
+        self._index = 0
+        self._closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._closed or self._index > len(self._pieces):
+            raise StopAsyncIteration
+        if self._index == len(self._pieces):
+            # Final chunk: no content, usage attached (as with Groq's x_groq.usage)
+            self._index += 1
+            return SimpleNamespace(
+                model=self._model,
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason="stop")],
+                x_groq=SimpleNamespace(usage=self._usage),
+                usage=self._usage,
+            )
+        if self._per_chunk_delay:
+            await asyncio.sleep(self._per_chunk_delay)
+        piece = self._pieces[self._index]
+        self._index += 1
+        return SimpleNamespace(
+            model=self._model,
+            choices=[SimpleNamespace(delta=SimpleNamespace(content=piece), finish_reason=None)],
+            x_groq=None,
+            usage=None,
+        )
+
+    async def close(self):
+        self._closed = True
+
+
+class MockCompletions:
+    """Implements `chat.completions.create` for the configured mock mode."""
+
+    def __init__(self, mode: str, seed: Optional[int] = None):
+        self.mode = mode
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.injected_errors = 0
+
+    def _latency(self) -> float:
+        if self.mode == "deterministic" or config.MOCK_LLM_LATENCY_MS <= 0:
+            return 0.0
+        median = config.MOCK_LLM_LATENCY_MS / 1000
+        return self._random.lognormvariate(math.log(median), config.MOCK_LLM_LATENCY_SIGMA)
+
+    def _maybe_fail(self):
+        if self.mode != "chaos" or self._random.random() >= config.MOCK_LLM_ERROR_RATE:
+            return
+        self.injected_errors += 1
+        status = self._random.choice(config.MOCK_LLM_ERROR_STATUSES)
+        raise MockLLMError(status, retry_after=1.0 if status == 429 else None)
+
+    async def create(self, model: str, messages: List[Dict[str, str]],
+                     temperature: float = None, max_tokens: int = None,
+                     stream: bool = False, **kwargs: Any):
+        self.calls += 1
+        system_prompt = next((m["content"] for m in messages if m["role"] == "system"), "")
+        prompt = next((m["content"] for m in messages if m["role"] == "user"), "")
+        content = canned_response(system_prompt, prompt)
+        if max_tokens:
+            content = content[:max_tokens * 4]
+        usage = _usage(system_prompt + prompt, content)
+        delay = self._latency()
+
+        if stream:
+            # Time to first token is a fraction of the total; the rest streams
+            first_token = delay * 0.3
+            if first_token:
+                await asyncio.sleep(first_token)
+            self._maybe_fail()
+            return MockStream(model, content, delay - first_token, usage)
+
+        if delay:
+            await asyncio.sleep(delay)
+        self._maybe_fail()
+        return SimpleNamespace(
+            id=f"mock-{int(time.time() * 1000)}",
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")],
+            usage=usage,
+        )
+
+
+class MockLLMClient:
+    """Drop-in stand-in for AsyncGroq exposing `chat.completions.create` and `close`."""
+
+    def __init__(self, mode: str = None, seed: Optional[int] = None):
+        mode = mode or config.MOCK_LLM_MODE
+        if mode not in ("deterministic", "latency", "chaos"):
+            raise ValueError(f"Unknown MOCK_LLM_MODE: {mode}")
+        self.chat = SimpleNamespace(completions=MockCompletions(mode, seed))
+
+    async def close(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        completions = self.chat.completions
+        return {
+            "mode": completions.mode,
+            "calls": completions.calls,
+            "injected_errors": completions.injected_errors,
+        }
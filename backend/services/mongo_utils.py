@@ -5,14 +5,26 @@ reasoning steps, arguments, and inter-agent messages. MongoDB is treated as
 the coordination layer (not only storage): agent runs and step-level traces
 are persisted to enable replay, audit trails, and conflict detection.
 
+Trace documents (agent runs, reasoning steps, agent messages) and usage
+updates go through the write-behind trace writer (services/trace_writer.py)
+when it is enabled; primary artifacts are written synchronously unless
+config.DURABLE_ARTIFACT_WRITES is disabled. Readers the pipeline depends on
+flush the writer first, so they see everything written before them.
+
 Adapted from LegalServer-main by teammate.
 """
 from typing import Optional, Dict, Any, List
 from datetime import datetime
+import asyncio
+import re
 import uuid
 import sys
+from pymongo import InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 sys.path.insert(0, "..")
+import config
 import database
+from services.trace_writer import get_trace_writer
 
 
 def _now_iso() -> str:
@@ -25,6 +37,33 @@ def _generate_id(prefix: str) -> str:
     return f"{prefix}_{uuid.uuid4().hex[:8]}"
 
 
+def _write_behind(collection_name: str, operation: Any, durable: bool = False) -> bool:
+    """Queue a write on the trace writer unless it is disabled or the write must be durable.
+
+    Returns True if queued; otherwise the caller writes synchronously.
+    """
+    writer = get_trace_writer()
+    if durable or not writer.enabled:
+        return False
+    writer.enqueue(collection_name, operation)
+    return True
+
+
+def _durable(durable: Optional[bool]) -> bool:
+    """Whether a primary artifact is written synchronously."""
+    return config.DURABLE_ARTIFACT_WRITES if durable is None else durable
+
+
+def _flush_writes():
+    """Wait (up to config.TRACE_FLUSH_TIMEOUT_SECONDS) for queued writes, so that reads and checkpoints see them.
+
+    Blocking: call from worker threads, not the event loop.
+    """
+    if not get_trace_writer().flush():
+        print(f"Warning: Could not flush queued writes within {config.TRACE_FLUSH_TIMEOUT_SECONDS}s, "
+              f"reading without them")
+
+
 # ============================================================================
 # Agent Run Tracking
 # ============================================================================
@@ -39,6 +78,8 @@ def start_agent_run(agent_name: str, case_id: str, metadata: Optional[Dict[str,
         "status": "running",
         "started_at": _now_iso(),
     }
+    if _write_behind("agent_runs", InsertOne(run.copy())):
+        return run
     try:
         collection = database.get_collection("agent_runs")
         collection.insert_one(run.copy())
@@ -47,11 +88,16 @@ def start_agent_run(agent_name: str, case_id: str, metadata: Optional[Dict[str,
     return run
 
 
-def finish_agent_run(run_id: str, status: str = "completed", result: Optional[Dict[str, Any]] = None):
-    """Mark an agent run as finished."""
+def finish_agent_run(run_id: str, status: str = "completed", result: Optional[Dict[str, Any]] = None,
+                     usage: Optional[Dict[str, Any]] = None):
+    """Mark an agent run as finished, with its LLM usage totals if given."""
     update = {"status": status, "finished_at": _now_iso()}
     if result:
         update["result"] = result
+    if usage:
+        update["llm_usage"] = usage
+    if _write_behind("agent_runs", UpdateOne({"run_id": run_id}, {"$set": update})):
+        return
     try:
         collection = database.get_collection("agent_runs")
         collection.update_one({"run_id": run_id}, {"$set": update})
@@ -59,6 +105,57 @@ def finish_agent_run(run_id: str, status: str = "completed", result: Optional[Di
         print(f"Warning: Could not update agent run: {e}")
 
 
+def cancel_agent_runs(case_id: str) -> int:
+    """Mark the case's unfinished agent runs as cancelled. Returns how many were updated."""
+    _flush_writes()
+    try:
+        collection = database.get_collection("agent_runs")
+        result = collection.update_many(
+            {"case_id": case_id, "status": "running"},
+            {"$set": {"status": "cancelled", "finished_at": _now_iso()}}
+        )
+        return result.modified_count
+    except Exception as e:
+        print(f"Warning: Could not cancel agent runs: {e}")
+        return 0
+
+
+def set_agent_run_phase(run_id: str, phase: str):
+    """Record which workflow phase (e.g. attack_round_2) an agent run belonged to."""
+    if _write_behind("agent_runs", UpdateOne({"run_id": run_id}, {"$set": {"phase": phase}})):
+        return
+    try:
+        collection = database.get_collection("agent_runs")
+        collection.update_one({"run_id": run_id}, {"$set": {"phase": phase}})
+    except Exception as e:
+        print(f"Warning: Could not update agent run: {e}")
+
+
+def add_case_usage(case_id: str, usage: Dict[str, Any], agent: Optional[str] = None,
+                   phase: Optional[str] = None, include_total: bool = True):
+    """Add LLM usage to the case's running totals (overall, per agent and/or per phase)."""
+    if not usage or not usage.get("calls"):
+        return
+    prefixes = ["llm_usage"] if include_total else []
+    if agent:
+        prefixes.append(f"llm_usage_by_agent.{agent}")
+    if phase:
+        prefixes.append(f"llm_usage_by_phase.{phase}")
+    increments = {
+        f"{prefix}.{field}": value
+        for prefix in prefixes
+        for field, value in usage.items()
+        if isinstance(value, (int, float))
+    }
+    if _write_behind("cases", UpdateOne({"case_id": case_id}, {"$inc": increments})):
+        return
+    try:
+        collection = database.get_collection("cases")
+        collection.update_one({"case_id": case_id}, {"$inc": increments})
+    except Exception as e:
+        print(f"Warning: Could not update case usage: {e}")
+
+
 # ============================================================================
 # Reasoning Steps (Step-level tracing for auditability)
 # ============================================================================
@@ -72,6 +169,8 @@ def write_reasoning_step(run_id: str, step_name: str, content: Dict[str, Any]) -
         "content": content,
         "created_at": _now_iso(),
     }
+    if _write_behind("reasoning_steps", InsertOne(doc.copy())):
+        return doc
     try:
         collection = database.get_collection("reasoning_steps")
         collection.insert_one(doc.copy())
@@ -82,6 +181,7 @@ def write_reasoning_step(run_id: str, step_name: str, content: Dict[str, Any]) -
 
 def get_reasoning_steps(run_id: str) -> List[Dict[str, Any]]:
     """Retrieve all reasoning steps for a given run."""
+    _flush_writes()
     try:
         collection = database.get_collection("reasoning_steps")
         steps = list(collection.find({"run_id": run_id}).sort("created_at", 1))
@@ -97,8 +197,12 @@ def get_reasoning_steps(run_id: str) -> List[Dict[str, Any]]:
 # Arguments (Primary strategies from Harvey and Louis)
 # ============================================================================
 
-def write_argument(case_id: str, agent: str, arg_type: str, content: Any, reasoning: str = "") -> Dict[str, Any]:
-    """Write an argument document to the arguments collection."""
+def write_argument(case_id: str, agent: str, arg_type: str, content: Any, reasoning: str = "",
+                   durable: Optional[bool] = None) -> Dict[str, Any]:
+    """Write an argument document to the arguments collection.
+
+    Written synchronously if `durable` (default: config.DURABLE_ARTIFACT_WRITES).
+    """
     doc = {
         "argument_id": _generate_id("arg"),
         "case_id": case_id,
@@ -108,6 +212,8 @@ def write_argument(case_id: str, agent: str, arg_type: str, content: Any, reason
         "reasoning": reasoning,
         "created_at": _now_iso(),
     }
+    if _write_behind("arguments", InsertOne(doc.copy()), _durable(durable)):
+        return doc
     try:
         collection = database.get_collection("arguments")
         collection.insert_one(doc.copy())
@@ -118,6 +224,7 @@ def write_argument(case_id: str, agent: str, arg_type: str, content: Any, reason
 
 def get_arguments(case_id: str) -> List[Dict[str, Any]]:
     """Retrieve all arguments for a case."""
+    _flush_writes()
     try:
         collection = database.get_collection("arguments")
         args = list(collection.find({"case_id": case_id}))
@@ -134,8 +241,12 @@ def get_arguments(case_id: str) -> List[Dict[str, Any]]:
 # ============================================================================
 
 def write_counterargument(case_id: str, agent: str, target_argument_id: str,
-                          content: Any, attack_vectors: List[str] = None) -> Dict[str, Any]:
-    """Write a counterargument document to the counterarguments collection."""
+                          content: Any, attack_vectors: List[str] = None,
+                          durable: Optional[bool] = None) -> Dict[str, Any]:
+    """Write a counterargument document to the counterarguments collection.
+
+    Written synchronously if `durable` (default: config.DURABLE_ARTIFACT_WRITES).
+    """
     doc = {
         "counterargument_id": _generate_id("ctr"),
         "case_id": case_id,
@@ -145,6 +256,8 @@ def write_counterargument(case_id: str, agent: str, target_argument_id: str,
         "attack_vectors": attack_vectors or [],
         "created_at": _now_iso(),
     }
+    if _write_behind("counterarguments", InsertOne(doc.copy()), _durable(durable)):
+        return doc
     try:
         collection = database.get_collection("counterarguments")
         collection.insert_one(doc.copy())
@@ -155,6 +268,7 @@ def write_counterargument(case_id: str, agent: str, target_argument_id: str,
 
 def get_counterarguments(case_id: str) -> List[Dict[str, Any]]:
     """Retrieve all counterarguments for a case."""
+    _flush_writes()
     try:
         collection = database.get_collection("counterarguments")
         counters = list(collection.find({"case_id": case_id}))
@@ -184,6 +298,8 @@ def write_agent_message(case_id: str, sender: str, recipient: str,
         "message": message,
         "created_at": _now_iso(),
     }
+    if _write_behind("agent_messages", InsertOne(doc.copy())):
+        return doc
     try:
         collection = database.get_collection("agent_messages")
         collection.insert_one(doc.copy())
@@ -194,6 +310,7 @@ def write_agent_message(case_id: str, sender: str, recipient: str,
 
 def get_agent_messages(case_id: str, sender: str = None, recipient: str = None) -> List[Dict[str, Any]]:
     """Retrieve agent messages, optionally filtered by sender/recipient."""
+    _flush_writes()
     try:
         query = {"case_id": case_id}
         if sender:
@@ -216,16 +333,16 @@ def get_agent_messages(case_id: str, sender: str = None, recipient: str = None)
 
 def write_strategy_version(case_id: str, author: str, strategy: Dict[str, Any],
                            rationale: Dict[str, Any] = None,
-                           rejected_alternatives: List[str] = None) -> Dict[str, Any]:
-    """Persist a versioned strategy for audit and replay."""
-    # Get current version number
-    try:
-        collection = database.get_collection("strategies")
-        existing = collection.count_documents({"case_id": case_id})
-        version = existing + 1
-    except Exception:
-        version = 1
+                           rejected_alternatives: List[str] = None,
+                           durable: Optional[bool] = None) -> Dict[str, Any]:
+    """Persist a versioned strategy for audit and replay.
+
+    Written synchronously if `durable` (default: config.DURABLE_ARTIFACT_WRITES).
 
+    Raises:
+        PyMongoError: If no version could be allocated, or the durable insert failed
+    """
+    version = next_strategy_version(case_id)
     doc = {
         "strategy_id": _generate_id("str"),
         "case_id": case_id,
@@ -236,25 +353,56 @@ def write_strategy_version(case_id: str, author: str, strategy: Dict[str, Any],
         "rejected_alternatives": rejected_alternatives or [],
         "created_at": _now_iso(),
     }
-    try:
-        collection = database.get_collection("strategies")
-        collection.insert_one(doc.copy())
-    except Exception as e:
-        print(f"Warning: Could not persist strategy version: {e}")
+    if _write_behind("strategies", InsertOne(doc.copy()), _durable(durable)):
+        return doc
+    # The case's final output: fail the stage rather than report a strategy that was not saved
+    database.get_collection("strategies").insert_one(doc.copy())
     return doc
 
 
+def next_strategy_version(case_id: str) -> int:
+    """Allocate the case's next strategy version atomically.
+
+    Versions come from a per-case counter document incremented with $inc, so
+    concurrent writers never get the same number. A case whose strategies
+    predate the counter gets it seeded from its latest version first.
+
+    Raises:
+        PyMongoError: If the counter cannot be read or updated (there is no
+            safe fallback: guessing a version would race other writers)
+    """
+    counters = database.get_collection("counters")
+    counter_id = strategy_counter_id(case_id)
+    counter = counters.find_one_and_update(
+        {"_id": counter_id}, {"$inc": {"seq": 1}}, return_document=ReturnDocument.AFTER
+    )
+    if counter is None:
+        _flush_writes()
+        latest = database.get_collection("strategies").find_one(
+            {"case_id": case_id}, {"_id": 0, "version": 1}, sort=[("version", -1)]
+        )
+        try:
+            counters.insert_one({"_id": counter_id, "case_id": case_id,
+                                 "seq": latest["version"] if latest else 0})
+        except DuplicateKeyError:
+            pass  # Seeded concurrently by another writer
+        counter = counters.find_one_and_update(
+            {"_id": counter_id}, {"$inc": {"seq": 1}}, return_document=ReturnDocument.AFTER
+        )
+    return counter["seq"]
+
+
+def strategy_counter_id(case_id: str) -> str:
+    """_id of the case's strategy version counter in the counters collection."""
+    return f"strategy_version:{case_id}"
+
+
 def get_latest_strategy(case_id: str) -> Optional[Dict[str, Any]]:
-    """Get the latest strategy version for a case."""
+    """Get the latest strategy version for a case (one lookup on the (case_id, version) index)."""
+    _flush_writes()
     try:
         collection = database.get_collection("strategies")
-        strategies = list(collection.find({"case_id": case_id}).sort("version", -1).limit(1))
-        if strategies:
-            strategy = strategies[0]
-            if "_id" in strategy:
-                del strategy["_id"]
-            return strategy
-        return None
+        return collection.find_one({"case_id": case_id}, {"_id": 0}, sort=[("version", -1)])
     except Exception:
         return None
 
@@ -264,8 +412,11 @@ def get_latest_strategy(case_id: str) -> Optional[Dict[str, Any]]:
 # ============================================================================
 
 def write_conflict(case_id: str, agents_involved: List[str], issue: str,
-                   description: str) -> Dict[str, Any]:
-    """Write a conflict document."""
+                   description: str, durable: Optional[bool] = None) -> Dict[str, Any]:
+    """Write a conflict document.
+
+    Written synchronously if `durable` (default: config.DURABLE_ARTIFACT_WRITES).
+    """
     doc = {
         "conflict_id": _generate_id("conf"),
         "case_id": case_id,
@@ -275,6 +426,8 @@ def write_conflict(case_id: str, agents_involved: List[str], issue: str,
         "status": "unresolved",
         "created_at": _now_iso(),
     }
+    if _write_behind("conflicts", InsertOne(doc.copy()), _durable(durable)):
+        return doc
     try:
         collection = database.get_collection("conflicts")
         collection.insert_one(doc.copy())
@@ -285,6 +438,7 @@ def write_conflict(case_id: str, agents_involved: List[str], issue: str,
 
 def get_conflicts(case_id: str) -> List[Dict[str, Any]]:
     """Retrieve all conflicts for a case."""
+    _flush_writes()
     try:
         collection = database.get_collection("conflicts")
         conflicts = list(collection.find({"case_id": case_id}))
@@ -301,8 +455,302 @@ def resolve_conflict(conflict_id: str, resolution: str = None):
     update = {"status": "resolved", "resolved_at": _now_iso()}
     if resolution:
         update["resolution"] = resolution
+    if _write_behind("conflicts", UpdateOne({"conflict_id": conflict_id}, {"$set": update})):
+        return
     try:
         collection = database.get_collection("conflicts")
         collection.update_one({"conflict_id": conflict_id}, {"$set": update})
     except Exception as e:
         print(f"Warning: Could not update conflict: {e}")
+
+
+# ============================================================================
+# Case Briefs (Facts digest shared by a case's agents)
+# ============================================================================
+
+def save_case_brief(case_id: str, brief: str, facts_hash: str, max_tokens: int):
+    """Store the case's brief with the facts hash and token budget it was computed for."""
+    try:
+        collection = database.get_collection("cases")
+        collection.update_one(
+            {"case_id": case_id},
+            {"$set": {"case_brief": {
+                "text": brief,
+                "facts_hash": facts_hash,
+                "max_tokens": max_tokens,
+                "created_at": _now_iso()
+            }}}
+        )
+    except Exception as e:
+        print(f"Warning: Could not persist case brief: {e}")
+
+
+# ============================================================================
+# Run Checkpoints (Stage-level resume of interrupted analyses)
+# ============================================================================
+
+def save_checkpoint(case_id: str, stage: str, ref: Dict[str, Any]):
+    """Record a completed workflow stage on the case, with the ids of its persisted outputs."""
+    # The checkpoint must not reference outputs still queued for writing
+    _flush_writes()
+    now = _now_iso()
+    try:
+        collection = database.get_collection("cases")
+        collection.update_one(
+            {"case_id": case_id},
+            {"$set": {f"checkpoint.stages.{stage}": {**ref, "completed_at": now},
+                      "checkpoint.updated_at": now}}
+        )
+    except Exception as e:
+        print(f"Warning: Could not save checkpoint: {e}")
+
+
+def get_documents_by_id(collection_name: str, id_field: str, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch documents by their id field in one query. Returns id -> document."""
+    if not ids:
+        return {}
+    _flush_writes()
+    try:
+        collection = database.get_collection(collection_name)
+        docs = collection.find({id_field: {"$in": list(ids)}}, {"_id": 0})
+        return {doc[id_field]: doc for doc in docs}
+    except Exception as e:
+        print(f"Warning: Could not load {collection_name}: {e}")
+        return {}
+
+
+def discard_unreferenced_outputs(case_id: str, argument_ids: List[str],
+                                 counterargument_ids: List[str], conflict_ids: List[str]):
+    """Delete a case's arguments, counterarguments and conflicts not referenced by its checkpoint.
+
+    These are left over from stages that were interrupted before completing;
+    the stages re-run, so keeping them would duplicate their output.
+    """
+    _flush_writes()
+    for collection_name, id_field, keep in (
+        ("arguments", "argument_id", argument_ids),
+        ("counterarguments", "counterargument_id", counterargument_ids),
+        ("conflicts", "conflict_id", conflict_ids),
+    ):
+        try:
+            collection = database.get_collection(collection_name)
+            result = collection.delete_many({"case_id": case_id, id_field: {"$nin": list(keep)}})
+            if result.deleted_count:
+                print(f"Discarded {result.deleted_count} partial {collection_name} for case {case_id}")
+        except Exception as e:
+            print(f"Warning: Could not discard partial {collection_name}: {e}")
+
+
+# ============================================================================
+# Case Details (one aggregation per case read)
+# ============================================================================
+# A case with its related documents in a single round trip: the case is
+# matched by case_id and each related collection is joined with a $lookup
+# sub-pipeline, with projections (and _id) applied on the server.
+
+# A field path of a fields selector: dot-separated names, no operators ($...)
+# and no empty segments
+FIELD_PATH_PATTERN = re.compile(r"^[A-Za-z0-9_-]+(\.[A-Za-z0-9_-]+)*$")
+
+# Sections of a case's details besides "case": collection, sort, limit
+# (0: up to config.CASE_DETAIL_MAX_ITEMS)
+CASE_DETAIL_SECTIONS = {
+    "arguments": ("arguments", None, 0),
+    "counterarguments": ("counterarguments", None, 0),
+    "conflicts": ("conflicts", None, 0),
+    "strategy": ("strategies", {"version": -1}, 1),  # Latest version only
+    "agent_messages": ("agent_messages", {"created_at": 1}, 0),
+}
+
+
+def parse_case_fields(fields: Optional[str]) -> Optional[Dict[str, Optional[List[str]]]]:
+    """Parse a fields selector such as "case.title,strategy,arguments.content".
+
+    Returns:
+        Section -> field paths to include (None for whole documents), or None
+        for every section
+
+    Raises:
+        ValueError: On an unknown section, a malformed field path, or
+            overlapping paths (e.g. "case.checkpoint" and "case.checkpoint.stages")
+    """
+    if not fields:
+        return None
+    selected: Dict[str, Optional[List[str]]] = {}
+    for item in fields.split(","):
+        section, _, path = item.strip().partition(".")
+        if not section:
+            continue
+        if section != "case" and section not in CASE_DETAIL_SECTIONS:
+            raise ValueError(
+                f"Unknown field '{section}'; expected case, {', '.join(CASE_DETAIL_SECTIONS)}"
+            )
+        if not path:
+            selected[section] = None
+            continue
+        if not FIELD_PATH_PATTERN.match(path):
+            raise ValueError(f"Invalid field '{item.strip()}'")
+        if section not in selected:
+            selected[section] = [path]
+        elif selected[section] is not None:
+            for other in selected[section]:
+                if path == other or path.startswith(other + ".") or other.startswith(path + "."):
+                    raise ValueError(f"Field '{section}.{path}' overlaps '{section}.{other}'")
+            selected[section].append(path)
+    return selected
+
+
+def _projection(paths: Optional[List[str]]) -> Dict[str, int]:
+    """Projection without _id, including only `paths` if given."""
+    return {"_id": 0, **{path: 1 for path in paths or []}}
+
+
+def _all_sections() -> Dict[str, Optional[List[str]]]:
+    return {section: None for section in ("case", *CASE_DETAIL_SECTIONS)}
+
+
+def case_details_pipeline(case_id: str, selected: Optional[Dict[str, Optional[List[str]]]] = None) -> List[Dict[str, Any]]:
+    """Aggregation on the cases collection returning {"case": ..., <section>: [...]} for the selected sections."""
+    selected = _all_sections() if selected is None else selected
+    pipeline = [
+        {"$match": {"case_id": case_id}},
+        {"$limit": 1},
+        {"$project": _projection(selected["case"]) if "case" in selected else {"_id": 0, "case_id": 1}},
+        {"$replaceRoot": {"newRoot": {"case": "$$ROOT"}}},
+    ]
+    for section, (collection_name, sort, limit) in CASE_DETAIL_SECTIONS.items():
+        if section not in selected:
+            continue
+        lookup = [{"$match": {"case_id": case_id}}]
+        if sort:
+            lookup.append({"$sort": sort})
+        # One more than the cap, to tell a full section from a truncated one
+        lookup.append({"$limit": limit or config.CASE_DETAIL_MAX_ITEMS + 1})
+        lookup.append({"$project": _projection(selected[section])})
+        pipeline.append({"$lookup": {
+            "from": config.COLLECTIONS[collection_name],
+            "pipeline": lookup,
+            "as": section
+        }})
+    return pipeline
+
+
+def _case_details(doc: Dict[str, Any], selected: Optional[Dict[str, Optional[List[str]]]]) -> Dict[str, Any]:
+    """
+    Shape an aggregation result: the selected sections, with the latest
+    strategy or None. Sections cut off at config.CASE_DETAIL_MAX_ITEMS are
+    listed under "truncated".
+    """
+    selected = _all_sections() if selected is None else selected
+    details = {}
+    truncated = []
+    for section in ("case", *CASE_DETAIL_SECTIONS):
+        if section not in selected:
+            continue
+        if section == "strategy":
+            details[section] = doc[section][0] if doc[section] else None
+        elif section != "case" and len(doc[section]) > config.CASE_DETAIL_MAX_ITEMS:
+            details[section] = doc[section][:config.CASE_DETAIL_MAX_ITEMS]
+            truncated.append(section)
+        else:
+            details[section] = doc[section]
+    if truncated:
+        details["truncated"] = truncated
+    return details
+
+
+def get_case_details(case_id: str, selected: Optional[Dict[str, Optional[List[str]]]] = None) -> Optional[Dict[str, Any]]:
+    """A case with the selected sections (see parse_case_fields), or None if it does not exist."""
+    _flush_writes()
+    docs = list(database.get_cases_collection().aggregate(case_details_pipeline(case_id, selected)))
+    return _case_details(docs[0], selected) if docs else None
+
+
+# ============================================================================
+# Async Reads (Motor, for request handlers)
+# ============================================================================
+# Async counterparts of the readers above, for FastAPI handlers running on
+# the event loop. The sync versions remain for the analysis pipeline. Like
+# them, they first wait for queued trace writes (agent messages, usage, and
+# artifacts when DURABLE_ARTIFACT_WRITES is off), in a worker thread.
+
+# Collections holding a case's data (by case_id), removed with the case;
+# reasoning steps are removed through the case's agent runs
+CASE_DATA_COLLECTIONS = (
+    "cases", "arguments", "counterarguments", "conflicts", "strategies", "case_events",
+    "agent_runs", "agent_messages", "analysis_jobs"
+)
+
+
+async def _flush_writes_async():
+    """`_flush_writes` for the event loop: waits in a worker thread, and only if writes are queued."""
+    if get_trace_writer().pending:
+        await asyncio.to_thread(_flush_writes)
+
+
+async def _find_async(collection_name: str, query: Dict[str, Any], sort: Optional[List] = None,
+                      limit: int = 0) -> List[Dict[str, Any]]:
+    """Documents matching `query` (without _id); empty on errors, like the sync readers."""
+    await _flush_writes_async()
+    try:
+        cursor = database.get_async_collection(collection_name).find(query, {"_id": 0})
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+    except Exception:
+        return []
+
+
+async def get_case_async(case_id: str) -> Optional[Dict[str, Any]]:
+    """Retrieve a case document."""
+    await _flush_writes_async()
+    return await database.get_async_cases_collection().find_one({"case_id": case_id}, {"_id": 0})
+
+
+async def list_cases_async(limit: int = 20) -> List[Dict[str, Any]]:
+    """Most recently created cases."""
+    return await _find_async("cases", {}, sort=[("created_at", -1)], limit=limit)
+
+
+async def get_arguments_async(case_id: str) -> List[Dict[str, Any]]:
+    """Retrieve all arguments for a case."""
+    return await _find_async("arguments", {"case_id": case_id})
+
+
+async def get_latest_strategy_async(case_id: str) -> Optional[Dict[str, Any]]:
+    """Get the latest strategy version for a case."""
+    strategies = await _find_async("strategies", {"case_id": case_id}, sort=[("version", -1)], limit=1)
+    return strategies[0] if strategies else None
+
+
+async def get_conflicts_async(case_id: str) -> List[Dict[str, Any]]:
+    """Retrieve all conflicts for a case."""
+    return await _find_async("conflicts", {"case_id": case_id})
+
+
+async def get_case_details_async(case_id: str,
+                                 selected: Optional[Dict[str, Optional[List[str]]]] = None) -> Optional[Dict[str, Any]]:
+    """Async `get_case_details`: one aggregation round trip."""
+    await _flush_writes_async()
+    cursor = database.get_async_cases_collection().aggregate(case_details_pipeline(case_id, selected))
+    docs = await cursor.to_list(length=1)
+    return _case_details(docs[0], selected) if docs else None
+
+
+async def delete_case_data_async(case_id: str):
+    """
+    Delete a case and everything recorded for it: its outputs, strategy
+    version counter, events, analysis job, agent runs with their reasoning
+    steps, and agent messages.
+    """
+    # Queued writes for the case would otherwise land after the delete
+    await _flush_writes_async()
+    run_ids = await database.get_async_collection("agent_runs").distinct("run_id", {"case_id": case_id})
+    await asyncio.gather(
+        *(database.get_async_collection(name).delete_many({"case_id": case_id})
+          for name in CASE_DATA_COLLECTIONS),
+        database.get_async_collection("reasoning_steps").delete_many({"run_id": {"$in": run_ids}}),
+        database.get_async_collection("counters").delete_one({"_id": strategy_counter_id(case_id)})
+    )
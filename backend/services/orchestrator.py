@@ -2,25 +2,55 @@
 Orchestrator Service - Controls the multi-agent workflow.
 
 Manages the sequential and multi-round execution of agents:
+0. Case brief: a compact facts digest, computed once per case
 1. Harvey (Lead Strategist) develops initial strategy
 2. Louis (Precedent Expert) provides case law research
 3. Multi-round deliberation: Tanner attacks -> Harvey rebuts (configurable rounds)
 4. Conflict Detection identifies disagreements
 5. Jessica (Moderator) synthesizes final strategy
 
-Emits SSE events for real-time frontend updates.
+The workflow is expressed as a graph of stages (services/langgraph_wrapper.py
+AgentGraph), so stages that don't depend on each other run concurrently -
+Louis's research overlaps Harvey's initial strategy. Agents and the conflict
+detector are async and share one LLM connection pool, so their calls are
+awaited directly rather than dispatched to worker threads.
+
+Each completed stage is checkpointed on the case (ids of the arguments,
+counterarguments, conflicts or strategy it persisted). A run of a case with a
+checkpoint resumes: completed stages are restored from Mongo instead of being
+re-executed, so a failed Jessica call or a crashed worker only costs the
+stage that didn't finish.
+
+Emits SSE events for real-time frontend updates, including `agent_token`
+events carrying response deltas while an agent is still generating.
 """
 import asyncio
 import json
-from typing import AsyncGenerator, Dict, Any, Optional, List, TYPE_CHECKING
+from contextvars import ContextVar
+from typing import AsyncGenerator, Awaitable, Callable, Dict, Any, Optional, List, Tuple, TYPE_CHECKING
 from datetime import datetime
 
+from services.case_brief import CaseBriefer
+from services.langgraph_wrapper import AgentGraph
 from services.conflict_detector import ConflictDetector
-from services.mongo_utils import write_agent_message, get_arguments, get_counterarguments
+from services.convergence import ConvergenceDetector
+from services.progress_store import get_progress_store
+from services.mongo_utils import (
+    write_agent_message, get_arguments, get_counterarguments,
+    set_agent_run_phase, add_case_usage, save_checkpoint,
+    get_documents_by_id, discard_unreferenced_outputs, get_latest_strategy,
+    get_case_details, get_case_async, get_case_details_async, get_arguments_async,
+    get_conflicts_async, get_latest_strategy_async
+)
+from services import llm_client
 from models.schemas import Case
 import database
 import config
 
+# Whether the current run streams agent tokens; set per run in run_analysis,
+# inherited by the graph's node tasks
+_stream_tokens: ContextVar[bool] = ContextVar("stream_tokens", default=True)
+
 # Avoid circular imports by importing agents inside __init__
 if TYPE_CHECKING:
     from agents.harvey import HarveyAgent
@@ -53,9 +83,9 @@ class Orchestrator:
         self.tanner = TannerAgent()
         self.jessica = JessicaAgent()
         self.conflict_detector = ConflictDetector()
-
-        # Store for tracking case progress
-        self._case_progress: Dict[str, Dict] = {}
+        self.case_briefer = CaseBriefer()
+        self.convergence = ConvergenceDetector()
+        self.progress = get_progress_store()
 
     def create_case(self, title: str, facts: str, jurisdiction: str, stakes: str) -> Case:
         """Create a new case and save to MongoDB."""
@@ -70,256 +100,697 @@ class Orchestrator:
         cases_collection = database.get_cases_collection()
         cases_collection.insert_one(case.to_dict())
 
-        # Initialize progress tracking
-        self._case_progress[case.case_id] = {
-            "status": "created",
-            "agents_completed": [],
-            "current_agent": None,
-            "deliberation_round": 0,
-            "conflicts": [],
-            "strategy": None
-        }
+        self.progress.update(case.case_id, status="created")
 
         return case
 
-    async def run_analysis(self, case_id: str) -> AsyncGenerator[str, None]:
+    def create_cases(self, cases: List[Dict[str, str]], batch_id: Optional[str] = None) -> List[Case]:
+        """
+        Create many cases with one insert_many (used by batches).
+
+        Args:
+            cases: Dicts with title, facts, jurisdiction and stakes
+            batch_id: Batch the cases belong to, if any
+        """
+        created = [Case(**fields) for fields in cases]
+        if not created:
+            return []
+        database.get_cases_collection().insert_many([
+            {**case.to_dict(), "batch_id": batch_id} if batch_id else case.to_dict()
+            for case in created
+        ])
+        self.progress.create_many([case.case_id for case in created])
+        return created
+
+    async def run_analysis(self, case_id: str, stream_tokens: bool = True) -> AsyncGenerator[Dict[str, str], None]:
         """
         Run the full multi-agent analysis workflow with multi-round deliberation.
         Yields SSE events as agents complete their work.
+
+        The workflow runs as a graph (see `_build_graph`); its nodes emit
+        events into a queue that this generator drains, so events from
+        stages running in parallel are interleaved as they happen.
+
+        Args:
+            case_id: The case to analyze
+            stream_tokens: Stream agent responses as agent_token events.
+                Batch runs turn this off: agents then make plain
+                (non-streaming) LLM calls.
         """
         print(f"[Orchestrator] Starting analysis for case: {case_id}")
 
         # Get case from MongoDB
-        case_data = self._get_case(case_id)
+        case_data = await asyncio.to_thread(self._get_case, case_id)
         if not case_data:
             print(f"[Orchestrator] Case not found: {case_id}")
             yield self._format_sse_event("error", {"message": "Case not found"})
             return
 
         print(f"[Orchestrator] Case data loaded: {case_data.get('title', 'Unknown')}")
-        deliberation_history = {"rounds": []}
+
+        events: asyncio.Queue = asyncio.Queue()
+        restored = await asyncio.to_thread(self._restore_checkpoint, case_id, case_data)
+        if restored:
+            print(f"[Orchestrator] Resuming case {case_id} after stages: {', '.join(restored)}")
+            yield self._format_sse_event("analysis_resumed", {
+                "case_id": case_id,
+                "completed_stages": list(restored)
+            })
+        _stream_tokens.set(stream_tokens)
+        graph, deliberation_history = self._build_graph(case_id, case_data, events.put_nowait, restored)
+        await asyncio.to_thread(self._start_progress, case_id, restored)
+        graph_task = asyncio.create_task(graph.run(
+            restored=restored,
+            on_complete=lambda stage, result: asyncio.to_thread(self._complete_stage, case_id, stage, result)
+        ))
+        # Sentinel wakes the consumer once the graph finishes (or fails)
+        graph_task.add_done_callback(lambda _: events.put_nowait(None))
 
         try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+
+            results = graph_task.result()
+            conflicts = results["conflict_detection"]
+            jessica_result = results["final_synthesis"]
+
             # ================================================================
-            # Step 1: Harvey - Initial Strategy
+            # Final Event
             # ================================================================
-            print(f"[Orchestrator] Starting Harvey analysis...")
-            yield self._format_sse_event("agent_started", {
-                "agent": config.AGENT_NAMES["harvey"],
+            yield self._format_sse_event("strategy_ready", {
                 "case_id": case_id,
-                "phase": "initial_strategy"
+                "strategy": {
+                    "strategy_id": jessica_result["strategy_id"],
+                    "version": jessica_result["version"],
+                    "final_strategy": jessica_result["final_strategy"],
+                    "rationale": jessica_result["rationale"],
+                    "rejected_alternatives": jessica_result.get("rejected_alternatives", [])
+                },
+                "deliberation_rounds": len(deliberation_history["rounds"]),
+                "deliberation_stop_reason": deliberation_history.get("stop_reason")
             })
 
-            try:
-                harvey_result = await asyncio.to_thread(
-                    self.harvey.analyze, case_data
-                )
-                print(f"[Orchestrator] Harvey completed successfully")
-            except Exception as e:
-                print(f"[Orchestrator] Harvey ERROR: {e}")
-                raise
+            await asyncio.to_thread(
+                self.progress.update,
+                case_id,
+                status="completed",
+                current_agent=None,
+                phase=None,
+                deliberation_rounds=len(deliberation_history["rounds"]),
+                conflicts=len(conflicts),
+                strategy_id=jessica_result["strategy_id"]
+            )
 
-            yield self._format_sse_event("agent_completed", {
+        except Exception as e:
+            print(f"[Orchestrator] Analysis ERROR: {e}")
+            await asyncio.to_thread(self.progress.update, case_id, status="failed", current_agent=None, error=str(e))
+            yield self._format_sse_event("error", {
+                "case_id": case_id,
+                "message": str(e)
+            })
+        finally:
+            # Stop the graph if the run was cancelled: no further stages are
+            # scheduled and in-flight LLM requests are cancelled
+            if not graph_task.done():
+                graph_task.cancel()
+                await asyncio.gather(graph_task, return_exceptions=True)
+
+    def _build_graph(self, case_id: str, case_data: Dict[str, Any],
+                     emit: Callable[[Dict[str, str]], None],
+                     restored: Optional[Dict[str, Any]] = None) -> Tuple[AgentGraph, Dict[str, Any]]:
+        """
+        Express the workflow as a graph of stages.
+
+        Harvey's initial strategy and Louis's research both depend only on
+        the case brief, so they run concurrently (unless
+        config.RESEARCH_IN_PARALLEL is off, in which case Louis waits for and
+        references Harvey's strategy). Each deliberation round depends on the
+        latest strategy and on the research; conflict detection follows the
+        last round and Jessica follows conflict detection.
+
+        Args:
+            case_id: The case being analyzed
+            case_data: The case document
+            emit: Callback receiving formatted SSE events
+            restored: Results of stages completed by an earlier run
+
+        Returns:
+            (graph, deliberation history filled in as rounds complete)
+        """
+        rounds = config.DELIBERATION_ROUNDS
+        deliberation_history = self._restore_deliberation_history(restored or {}, rounds)
+        graph = AgentGraph("Orchestrator", case_id, metadata={"deliberation_rounds": rounds})
+
+        # ================================================================
+        # Case brief (compact facts digest shared by all agents)
+        # ================================================================
+        async def case_brief(results):
+            if not config.CASE_BRIEF_ENABLED:
+                return None
+            with llm_client.record_calls() as llm_calls:
+                case_data["brief"] = await self.case_briefer.get_brief(case_data)
+            add_case_usage(case_id, llm_client.summarize_calls(llm_calls),
+                           agent=self.case_briefer.name, phase="case_brief")
+            return case_data["brief"]
+
+        graph.add_node("case_brief", case_brief,
+                       trace_output=lambda brief: {"brief_chars": len(brief or "")})
+
+        # ================================================================
+        # Harvey - Initial Strategy
+        # ================================================================
+        async def initial_strategy(results):
+            harvey_result = await self._run_agent(
+                emit, config.AGENT_NAMES["harvey"], case_id, "initial_strategy",
+                lambda on_token: self.harvey.analyze(case_data, on_token=on_token)
+            )
+            emit(self._format_sse_event("agent_completed", {
                 "agent": config.AGENT_NAMES["harvey"],
                 "case_id": case_id,
                 "content": harvey_result["content"],
                 "type": "primary",
                 "run_id": harvey_result.get("run_id")
-            })
-
-            # ================================================================
-            # Step 2: Louis - Precedent Research
-            # ================================================================
-            yield self._format_sse_event("agent_started", {
-                "agent": config.AGENT_NAMES["louis"],
-                "case_id": case_id,
-                "phase": "precedent_research"
-            })
-
-            louis_result = await asyncio.to_thread(
-                self.louis.analyze, case_data,
-                {"harvey_strategy": harvey_result["content"]}
+            }))
+            return harvey_result
+
+        graph.add_node("initial_strategy", initial_strategy,
+                       depends_on=["case_brief"], trace_output=self._trace_summary)
+
+        # ================================================================
+        # Louis - Precedent Research
+        # ================================================================
+        async def precedent_research(results):
+            context = None
+            if "initial_strategy" in results and not config.RESEARCH_IN_PARALLEL:
+                context = {"harvey_strategy": results["initial_strategy"]["content"]}
+            louis_result = await self._run_agent(
+                emit, config.AGENT_NAMES["louis"], case_id, "precedent_research",
+                lambda on_token: self.louis.analyze(case_data, context, on_token=on_token)
             )
-
-            yield self._format_sse_event("agent_completed", {
+            emit(self._format_sse_event("agent_completed", {
                 "agent": config.AGENT_NAMES["louis"],
                 "case_id": case_id,
                 "content": louis_result["content"],
                 "type": "precedent",
                 "run_id": louis_result.get("run_id")
-            })
-
-            # ================================================================
-            # Step 3: Multi-Round Deliberation (Tanner <-> Harvey)
-            # ================================================================
-            rounds = config.DELIBERATION_ROUNDS
-            current_strategy = harvey_result
-
-            for round_num in range(1, rounds + 1):
-                yield self._format_sse_event("deliberation_round_started", {
-                    "case_id": case_id,
-                    "round": round_num,
-                    "total_rounds": rounds
-                })
-
-                # Tanner attacks
-                yield self._format_sse_event("agent_started", {
-                    "agent": config.AGENT_NAMES["tanner"],
-                    "case_id": case_id,
-                    "phase": f"attack_round_{round_num}"
-                })
-
-                tanner_result = await asyncio.to_thread(
-                    self.tanner.analyze, case_data,
-                    [current_strategy, louis_result]
-                )
-
-                print(f"[Orchestrator] Tanner completed round {round_num}, content length: {len(tanner_result.get('content', ''))}")
-                yield self._format_sse_event("agent_completed", {
-                    "agent": config.AGENT_NAMES["tanner"],
-                    "case_id": case_id,
-                    "content": tanner_result.get("content", ""),
-                    "attack_vectors": tanner_result.get("attack_vectors", []),
-                    "round": round_num,
-                    "run_id": tanner_result.get("run_id")
-                })
-
-                # Record deliberation round
-                round_data = {
-                    "round": round_num,
-                    "tanner": tanner_result["content"][:500],
-                    "tanner_vectors": tanner_result.get("attack_vectors", [])
-                }
-
-                # Harvey rebuts (if not last round, or if we want final rebuttal)
-                if round_num < rounds:
-                    yield self._format_sse_event("agent_started", {
-                        "agent": config.AGENT_NAMES["harvey"],
-                        "case_id": case_id,
-                        "phase": f"rebuttal_round_{round_num}"
-                    })
-
-                    # Harvey reconsiders with Tanner's counterarguments
-                    harvey_rebuttal = await asyncio.to_thread(
-                        self.harvey.analyze, case_data,
-                        {"counterarguments": [tanner_result]}
-                    )
-
-                    yield self._format_sse_event("agent_completed", {
-                        "agent": config.AGENT_NAMES["harvey"],
-                        "case_id": case_id,
-                        "content": harvey_rebuttal["content"],
-                        "type": "rebuttal",
-                        "round": round_num,
-                        "run_id": harvey_rebuttal.get("run_id")
-                    })
-
-                    current_strategy = harvey_rebuttal
-                    round_data["harvey"] = harvey_rebuttal["content"][:500]
-
-                deliberation_history["rounds"].append(round_data)
-
-                yield self._format_sse_event("deliberation_round_completed", {
-                    "case_id": case_id,
-                    "round": round_num,
-                    "total_rounds": rounds
-                })
-
-            # ================================================================
-            # Step 4: Conflict Detection
-            # ================================================================
-            print(f"[Orchestrator] Starting conflict detection...")
-            yield self._format_sse_event("detecting_conflicts", {
-                "case_id": case_id
-            })
-
-            try:
-                conflicts = await asyncio.to_thread(
-                    self.conflict_detector.detect_conflicts, case_id
+            }))
+            return louis_result
+
+        research_deps = ["case_brief"] if config.RESEARCH_IN_PARALLEL else ["initial_strategy"]
+        graph.add_node("precedent_research", precedent_research,
+                       depends_on=research_deps, trace_output=self._trace_summary)
+
+        # ================================================================
+        # Multi-Round Deliberation (Tanner <-> Harvey)
+        # ================================================================
+        # Rounds after the first are skipped once deliberation has converged,
+        # so config.DELIBERATION_ROUNDS is a ceiling.
+        def deliberating(results):
+            return "stop_reason" not in deliberation_history
+
+        strategy_node = last_node = "initial_strategy"
+        for round_num in range(1, rounds + 1):
+            graph.add_node(
+                f"attack_round_{round_num}",
+                self._attack_node(emit, case_id, case_data, round_num, rounds,
+                                  strategy_node, deliberation_history),
+                depends_on=[strategy_node, "precedent_research"],
+                when=deliberating if round_num > 1 else None,
+                trace_output=self._trace_summary
+            )
+            last_node = f"attack_round_{round_num}"
+
+            # Harvey rebuts between rounds (no rebuttal after the last attack)
+            if round_num < rounds:
+                graph.add_node(
+                    f"rebuttal_round_{round_num}",
+                    self._rebuttal_node(emit, case_id, case_data, round_num, rounds,
+                                        strategy_node, deliberation_history),
+                    depends_on=[last_node],
+                    when=deliberating,
+                    trace_output=self._trace_summary
                 )
-                print(f"[Orchestrator] Conflict detection completed, found {len(conflicts)} conflicts")
-            except Exception as e:
-                print(f"[Orchestrator] Conflict detection ERROR: {e}")
-                raise
-
-            yield self._format_sse_event("conflict_detected", {
+                strategy_node = last_node = f"rebuttal_round_{round_num}"
+
+        # ================================================================
+        # Conflict Detection
+        # ================================================================
+        incremental = config.CONFLICT_DETECTION_MODE == "incremental"
+        conflict_stages = self._add_conflict_stages(graph, emit, case_id, rounds) if incremental else []
+
+        async def conflict_detection(results):
+            if incremental:
+                # Already detected alongside deliberation; just collect them
+                conflicts = [conflict for stage in conflict_stages for conflict in results.get(stage, [])]
+            else:
+                print(f"[Orchestrator] Starting conflict detection...")
+                emit(self._format_sse_event("detecting_conflicts", {
+                    "case_id": case_id
+                }))
+                with llm_client.record_calls() as llm_calls:
+                    conflicts = await self.conflict_detector.detect_conflicts(case_id)
+                add_case_usage(case_id, llm_client.summarize_calls(llm_calls),
+                               agent=self.conflict_detector.name, phase="conflict_detection")
+            print(f"[Orchestrator] Conflict detection completed, found {len(conflicts)} conflicts")
+            emit(self._format_sse_event("conflict_detected", {
                 "case_id": case_id,
                 "conflicts": conflicts,
                 "count": len(conflicts)
-            })
+            }))
+            return conflicts
 
-            # ================================================================
-            # Step 5: Jessica - Final Synthesis
-            # ================================================================
-            print(f"[Orchestrator] Starting Jessica synthesis...")
-            yield self._format_sse_event("agent_started", {
-                "agent": config.AGENT_NAMES["jessica"],
-                "case_id": case_id,
-                "phase": "final_synthesis"
-            })
+        graph.add_node("conflict_detection", conflict_detection,
+                       depends_on=[last_node, "precedent_research"] + conflict_stages[-1:],
+                       trace_output=lambda conflicts: {"count": len(conflicts)})
 
+        # ================================================================
+        # Jessica - Final Synthesis
+        # ================================================================
+        async def final_synthesis(results):
             # Gather all arguments and counterarguments
-            all_arguments = get_arguments(case_id)
-            all_counterarguments = get_counterarguments(case_id)
+            all_arguments = await asyncio.to_thread(get_arguments, case_id)
+            all_counterarguments = await asyncio.to_thread(get_counterarguments, case_id)
 
-            try:
-                jessica_result = await asyncio.to_thread(
-                    self.jessica.analyze, case_data,
+            jessica_result = await self._run_agent(
+                emit, config.AGENT_NAMES["jessica"], case_id, "final_synthesis",
+                lambda on_token: self.jessica.analyze(
+                    case_data,
                     all_arguments,
                     all_counterarguments,
-                    conflicts,
-                    deliberation_history
+                    results["conflict_detection"],
+                    deliberation_history,
+                    on_token=on_token
                 )
-                print(f"[Orchestrator] Jessica completed successfully")
-            except Exception as e:
-                print(f"[Orchestrator] Jessica ERROR: {e}")
-                raise
-
+            )
             print(f"[Orchestrator] Jessica completed, final_strategy length: {len(jessica_result.get('final_strategy', ''))}")
-            print(f"[Orchestrator] Jessica result keys: {jessica_result.keys()}")
-            yield self._format_sse_event("agent_completed", {
+            emit(self._format_sse_event("agent_completed", {
                 "agent": config.AGENT_NAMES["jessica"],
                 "case_id": case_id,
                 "content": jessica_result.get("final_strategy", ""),
                 "rejected_alternatives": jessica_result.get("rejected_alternatives", []),
                 "run_id": jessica_result.get("run_id")
-            })
+            }))
+            return jessica_result
 
-            # ================================================================
-            # Final Event
-            # ================================================================
-            yield self._format_sse_event("strategy_ready", {
+        graph.add_node("final_synthesis", final_synthesis,
+                       depends_on=["conflict_detection"], trace_output=self._trace_summary)
+
+        return graph, deliberation_history
+
+    def _add_conflict_stages(self, graph: AgentGraph, emit: Callable[[Dict[str, str]], None],
+                             case_id: str, rounds: int) -> List[str]:
+        """
+        Add incremental conflict detection nodes to the graph.
+
+        conflicts_opening checks Harvey's strategy against Louis's research
+        while Tanner's first attack runs; conflicts_round_N checks round N's
+        attack and rebuttal while round N+1 runs. Each stage sends only its
+        new outputs in full, with a summary of the earlier ones and the
+        conflicts found so far. Stages run one after another so each sees
+        the previous stages' conflicts.
+
+        Returns:
+            The conflict stage names, in order
+        """
+        # (stage, outputs it analyzes, graph dependencies)
+        stages = [("conflicts_opening", ["initial_strategy", "precedent_research"],
+                   ["initial_strategy", "precedent_research"])]
+        for round_num in range(1, rounds + 1):
+            outputs = [f"attack_round_{round_num}"]
+            if round_num < rounds:
+                outputs.append(f"rebuttal_round_{round_num}")
+            stages.append((f"conflicts_round_{round_num}", outputs, list(outputs)))
+
+        names = [stage for stage, _, _ in stages]
+        for index, (stage, outputs, deps) in enumerate(stages):
+            graph.add_node(
+                stage,
+                self._conflict_stage(emit, case_id, stage, outputs, stages[:index]),
+                depends_on=deps + names[index - 1:index],
+                # Rounds skipped after deliberation converged have nothing to check
+                when=lambda results, first=outputs[0]: first in results,
+                trace_output=lambda conflicts: {"count": len(conflicts)}
+            )
+        return names
+
+    def _conflict_stage(self, emit: Callable[[Dict[str, str]], None], case_id: str, stage: str,
+                        outputs: List[str], earlier_stages: List[Tuple[str, List[str], List[str]]]):
+        """Graph node detecting the conflicts introduced by one stage's outputs."""
+        async def detect(results):
+            emit(self._format_sse_event("detecting_conflicts", {
                 "case_id": case_id,
-                "strategy": {
-                    "strategy_id": jessica_result["strategy_id"],
-                    "version": jessica_result["version"],
-                    "final_strategy": jessica_result["final_strategy"],
-                    "rationale": jessica_result["rationale"],
-                    "rejected_alternatives": jessica_result.get("rejected_alternatives", [])
-                },
-                "deliberation_rounds": len(deliberation_history["rounds"])
+                "stage": stage
+            }))
+            new_outputs = [results[name] for name in outputs if name in results]
+            analyzed = [results[name] for _, names, _ in earlier_stages for name in names if name in results]
+            known = [conflict for earlier, _, _ in earlier_stages for conflict in results.get(earlier, [])]
+            with llm_client.record_calls() as llm_calls:
+                conflicts = await self.conflict_detector.detect_new_conflicts(
+                    case_id, new_outputs, analyzed, known
+                )
+            add_case_usage(case_id, llm_client.summarize_calls(llm_calls),
+                           agent=self.conflict_detector.name, phase=stage)
+            print(f"[Orchestrator] {stage}: {len(conflicts)} new conflicts")
+            emit(self._format_sse_event("conflict_detected", {
+                "case_id": case_id,
+                "stage": stage,
+                "conflicts": known + conflicts,
+                "count": len(known) + len(conflicts)
+            }))
+            return conflicts
+
+        return detect
+
+    def _attack_node(self, emit: Callable[[Dict[str, str]], None], case_id: str, case_data: Dict[str, Any],
+                     round_num: int, rounds: int, strategy_node: str,
+                     deliberation_history: Dict[str, Any]):
+        """Graph node for Tanner's attack in a deliberation round."""
+        async def attack(results):
+            emit(self._format_sse_event("deliberation_round_started", {
+                "case_id": case_id,
+                "round": round_num,
+                "total_rounds": rounds
+            }))
+            current_strategy = results[strategy_node]
+            louis_result = results["precedent_research"]
+
+            tanner_result = await self._run_agent(
+                emit, config.AGENT_NAMES["tanner"], case_id, f"attack_round_{round_num}",
+                lambda on_token: self.tanner.analyze(
+                    case_data,
+                    [current_strategy, louis_result],
+                    on_token=on_token
+                )
+            )
+            print(f"[Orchestrator] Tanner completed round {round_num}, content length: {len(tanner_result.get('content', ''))}")
+            emit(self._format_sse_event("agent_completed", {
+                "agent": config.AGENT_NAMES["tanner"],
+                "case_id": case_id,
+                "content": tanner_result.get("content", ""),
+                "attack_vectors": tanner_result.get("attack_vectors", []),
+                "round": round_num,
+                "run_id": tanner_result.get("run_id")
+            }))
+
+            # Record deliberation round (Harvey's rebuttal is added by the next node)
+            deliberation_history["rounds"].append({
+                "round": round_num,
+                "tanner": tanner_result["content"][:500],
+                "tanner_vectors": tanner_result.get("attack_vectors", [])
             })
+            converged = self._attack_convergence(results, round_num, tanner_result)
+            if converged:
+                self._stop_deliberation(emit, case_id, deliberation_history, round_num, converged)
+            elif round_num == rounds:
+                deliberation_history["stop_reason"] = "max_rounds"
+            if converged or round_num == rounds:
+                emit(self._format_sse_event("deliberation_round_completed", {
+                    "case_id": case_id,
+                    "round": round_num,
+                    "total_rounds": rounds
+                }))
+            return tanner_result
+
+        return attack
+
+    def _rebuttal_node(self, emit: Callable[[Dict[str, str]], None], case_id: str, case_data: Dict[str, Any],
+                       round_num: int, rounds: int, strategy_node: str,
+                       deliberation_history: Dict[str, Any]):
+        """Graph node for Harvey's rebuttal to Tanner's attack in a deliberation round."""
+        async def rebuttal(results):
+            tanner_result = results[f"attack_round_{round_num}"]
+
+            # Harvey reconsiders with Tanner's counterarguments
+            harvey_rebuttal = await self._run_agent(
+                emit, config.AGENT_NAMES["harvey"], case_id, f"rebuttal_round_{round_num}",
+                lambda on_token: self.harvey.analyze(
+                    case_data,
+                    {"counterarguments": [tanner_result]},
+                    on_token=on_token
+                )
+            )
+            emit(self._format_sse_event("agent_completed", {
+                "agent": config.AGENT_NAMES["harvey"],
+                "case_id": case_id,
+                "content": harvey_rebuttal["content"],
+                "type": "rebuttal",
+                "round": round_num,
+                "run_id": harvey_rebuttal.get("run_id")
+            }))
+
+            deliberation_history["rounds"][-1]["harvey"] = harvey_rebuttal["content"][:500]
+            converged = self._rebuttal_convergence(results[strategy_node], harvey_rebuttal)
+            if converged:
+                self._stop_deliberation(emit, case_id, deliberation_history, round_num, converged)
+            emit(self._format_sse_event("deliberation_round_completed", {
+                "case_id": case_id,
+                "round": round_num,
+                "total_rounds": rounds
+            }))
+            return harvey_rebuttal
 
-            # Update progress
-            self._case_progress[case_id] = {
-                "status": "completed",
-                "agents_completed": [
-                    config.AGENT_NAMES["harvey"],
-                    config.AGENT_NAMES["louis"],
-                    config.AGENT_NAMES["tanner"],
-                    config.AGENT_NAMES["jessica"]
-                ],
-                "current_agent": None,
-                "deliberation_rounds": len(deliberation_history["rounds"]),
-                "conflicts": conflicts,
-                "strategy": jessica_result
-            }
+        return rebuttal
+
+    def _attack_convergence(self, results: Dict[str, Any], round_num: int,
+                            tanner_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Stop reason if this round's attack repeats the previous round's, else None."""
+        if not config.DELIBERATION_EARLY_EXIT or round_num < 2:
+            return None
+        previous = results.get(f"attack_round_{round_num - 1}")
+        return self.convergence.compare_attacks(previous, tanner_result) if previous else None
+
+    def _rebuttal_convergence(self, revised_strategy: Dict[str, Any],
+                              harvey_rebuttal: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Stop reason if Harvey's rebuttal barely changes the strategy it revises, else None."""
+        if not config.DELIBERATION_EARLY_EXIT:
+            return None
+        return self.convergence.compare_strategies(revised_strategy, harvey_rebuttal)
+
+    def _stop_deliberation(self, emit: Callable[[Dict[str, str]], None], case_id: str,
+                           deliberation_history: Dict[str, Any], round_num: int,
+                           converged: Dict[str, Any]):
+        """Record why deliberation stopped early and announce it."""
+        print(f"[Orchestrator] Deliberation converged after round {round_num}: "
+              f"{converged['reason']} ({converged['measure']} similarity {converged['similarity']})")
+        deliberation_history["stop_reason"] = converged["reason"]
+        deliberation_history["convergence"] = {"round": round_num, **converged}
+        emit(self._format_sse_event("deliberation_converged", {
+            "case_id": case_id,
+            "round": round_num,
+            "max_rounds": config.DELIBERATION_ROUNDS,
+            **converged
+        }))
+
+    async def _run_agent(
+        self,
+        emit: Callable[[Dict[str, str]], None],
+        agent_name: str,
+        case_id: str,
+        phase: str,
+        run: Callable[[Optional[Callable[[str], None]]], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Run an agent call, emitting agent_started and its streamed tokens as SSE events.
+
+        Args:
+            emit: Callback receiving formatted SSE events
+            agent_name: Agent display name for the events
+            case_id: The case being analyzed
+            phase: Workflow phase label
+            run: Callable taking an on_token callback (or None) and returning
+                the agent's analyze() coroutine
+
+        Returns:
+            The agent's result
+        """
+        print(f"[Orchestrator] Starting {agent_name} ({phase})...")
+        await asyncio.to_thread(self.progress.update, case_id, current_agent=agent_name, phase=phase)
+        emit(self._format_sse_event("agent_started", {
+            "agent": agent_name,
+            "case_id": case_id,
+            "phase": phase
+        }))
+
+        on_token = None
+        if config.LLM_STREAMING and _stream_tokens.get():
+            def on_token(delta: str):
+                emit(self._format_sse_event("agent_token", {
+                    "agent": agent_name,
+                    "case_id": case_id,
+                    "phase": phase,
+                    "delta": delta
+                }))
 
+        try:
+            result = await run(on_token)
         except Exception as e:
-            yield self._format_sse_event("error", {
-                "case_id": case_id,
-                "message": str(e)
-            })
+            print(f"[Orchestrator] {agent_name} ERROR ({phase}): {e}")
+            raise
+        self._record_phase(case_id, phase, result)
+        return result
+
+    @staticmethod
+    def _trace_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Identifiers of an agent result, for the graph trace (content is stored elsewhere)."""
+        keys = ("agent", "run_id", "argument_id", "counterargument_id", "strategy_id", "version")
+        return {key: result[key] for key in keys if key in result}
+
+    def _start_progress(self, case_id: str, restored: Dict[str, Any]):
+        """Mark the case's analysis as running, with the stages restored from its checkpoint."""
+        self.progress.update(case_id, status="running", error=None)
+        for stage, result in restored.items():
+            self.progress.complete_stage(case_id, stage, _agent_of(result))
+
+    def _complete_stage(self, case_id: str, stage: str, result: Any):
+        """Checkpoint a completed stage and record it in the case's progress."""
+        self._save_checkpoint(case_id, stage, result)
+        self.progress.complete_stage(case_id, stage, _agent_of(result))
+
+    def _save_checkpoint(self, case_id: str, stage: str, result: Any):
+        """Checkpoint a completed stage by the ids of the outputs it persisted."""
+        if not config.ANALYSIS_CHECKPOINTS or stage == "case_brief":
+            # The brief is stored on the case; recomputing it costs no LLM call
+            return
+        if isinstance(result, list):
+            # Conflict detection stages
+            ref = {"conflict_ids": [conflict["conflict_id"] for conflict in result]}
+        else:
+            ref = self._trace_summary(result)
+        save_checkpoint(case_id, stage, ref)
+
+    def _restore_checkpoint(self, case_id: str, case_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Rebuild the results of the case's checkpointed stages from Mongo.
+
+        Outputs of the case that no restored stage references were written by
+        stages that were interrupted; they are discarded since those stages
+        run again. A case without a checkpoint (a first run, or one that ran
+        before checkpoints existed) is left untouched.
+
+        Returns:
+            Dict mapping stage name to its restored result
+        """
+        if not config.ANALYSIS_CHECKPOINTS:
+            return {}
+        stages = (case_data.get("checkpoint") or {}).get("stages", {})
+        if not stages:
+            return {}
+        refs = list(stages.values())
+        arguments = get_documents_by_id(
+            "arguments", "argument_id", [ref["argument_id"] for ref in refs if "argument_id" in ref])
+        counterarguments = get_documents_by_id(
+            "counterarguments", "counterargument_id",
+            [ref["counterargument_id"] for ref in refs if "counterargument_id" in ref])
+        conflicts = get_documents_by_id(
+            "conflicts", "conflict_id", [cid for ref in refs for cid in ref.get("conflict_ids", [])])
+        strategies = get_documents_by_id(
+            "strategies", "strategy_id", [ref["strategy_id"] for ref in refs if "strategy_id" in ref])
+
+        restored = {}
+        for stage, ref in stages.items():
+            result = self._restore_stage(ref, arguments, counterarguments, conflicts, strategies)
+            if result is None:
+                print(f"[Orchestrator] Outputs of checkpointed stage {stage} are missing, it will re-run")
+                continue
+            restored[stage] = result
+
+        kept = [result for result in restored.values() if isinstance(result, dict)]
+        discard_unreferenced_outputs(
+            case_id,
+            [result["argument_id"] for result in kept if "argument_id" in result],
+            [result["counterargument_id"] for result in kept if "counterargument_id" in result],
+            [conflict["conflict_id"] for result in restored.values() if isinstance(result, list)
+             for conflict in result]
+        )
+        return restored
+
+    @staticmethod
+    def _restore_stage(ref: Dict[str, Any], arguments: Dict[str, Dict], counterarguments: Dict[str, Dict],
+                       conflicts: Dict[str, Dict], strategies: Dict[str, Dict]) -> Optional[Any]:
+        """A checkpointed stage's result, rebuilt from its persisted outputs (None if missing)."""
+        if "argument_id" in ref:
+            doc = arguments.get(ref["argument_id"])
+            if doc is None:
+                return None
+            return {
+                "agent": doc["agent"],
+                "argument_id": doc["argument_id"],
+                "type": doc["type"],
+                "content": doc["content"],
+                "run_id": ref.get("run_id")
+            }
+        if "counterargument_id" in ref:
+            doc = counterarguments.get(ref["counterargument_id"])
+            if doc is None:
+                return None
+            return {
+                "agent": doc["agent"],
+                "counterargument_id": doc["counterargument_id"],
+                "target_argument_id": doc.get("target_argument_id"),
+                "content": doc["content"],
+                "attack_vectors": doc.get("attack_vectors", []),
+                "run_id": ref.get("run_id")
+            }
+        if "strategy_id" in ref:
+            doc = strategies.get(ref["strategy_id"])
+            if doc is None:
+                return None
+            return {
+                "agent": doc["author"],
+                "strategy_id": doc["strategy_id"],
+                "version": doc["version"],
+                "final_strategy": doc["final_strategy"].get("content", ""),
+                "rationale": doc.get("rationale", {}),
+                "rejected_alternatives": doc.get("rejected_alternatives", []),
+                "run_id": ref.get("run_id")
+            }
+        if "conflict_ids" in ref:
+            if any(cid not in conflicts for cid in ref["conflict_ids"]):
+                return None
+            fields = ("conflict_id", "case_id", "agents_involved", "issue", "description", "status")
+            return [{field: conflicts[cid].get(field) for field in fields} for cid in ref["conflict_ids"]]
+        return None
+
+    def _restore_deliberation_history(self, restored: Dict[str, Any], rounds: int) -> Dict[str, Any]:
+        """Deliberation history of the rounds completed by an earlier run, including
+        whether they had already converged."""
+        history: Dict[str, Any] = {"rounds": []}
+        strategy = restored.get("initial_strategy")
+        for round_num in range(1, rounds + 1):
+            attack = restored.get(f"attack_round_{round_num}")
+            if attack is None:
+                break
+            round_data = {
+                "round": round_num,
+                "tanner": attack["content"][:500],
+                "tanner_vectors": attack.get("attack_vectors", [])
+            }
+            history["rounds"].append(round_data)
+            converged = self._attack_convergence(restored, round_num, attack)
+            if converged is None and round_num == rounds:
+                history["stop_reason"] = "max_rounds"
+            rebuttal = restored.get(f"rebuttal_round_{round_num}")
+            if converged is None and rebuttal is not None:
+                round_data["harvey"] = rebuttal["content"][:500]
+                if strategy is not None:
+                    converged = self._rebuttal_convergence(strategy, rebuttal)
+                strategy = rebuttal
+            if converged:
+                history["stop_reason"] = converged["reason"]
+                history["convergence"] = {"round": round_num, **converged}
+                break
+            if rebuttal is None:
+                break
+        return history
+
+    def _record_phase(self, case_id: str, phase: str, result: Dict[str, Any]):
+        """Tag the agent run with its workflow phase and add its LLM usage to the phase totals."""
+        if result.get("run_id"):
+            set_agent_run_phase(result["run_id"], phase)
+        add_case_usage(case_id, result.get("llm_usage"), phase=phase, include_total=False)
 
     def _get_case(self, case_id: str) -> Optional[Dict]:
         """Retrieve case from MongoDB."""
@@ -330,57 +801,16 @@ class Orchestrator:
                 del case["_id"]
         return case
 
-    def get_case_with_details(self, case_id: str) -> Optional[Dict]:
-        """Get full case with all arguments, counterarguments, conflicts, and strategy."""
-        case = self._get_case(case_id)
-        if not case:
-            return None
-
-        # Get arguments
-        arguments_collection = database.get_arguments_collection()
-        arguments = list(arguments_collection.find({"case_id": case_id}))
-        for arg in arguments:
-            if "_id" in arg:
-                del arg["_id"]
-
-        # Get counterarguments
-        counterarguments_collection = database.get_counterarguments_collection()
-        counterarguments = list(counterarguments_collection.find({"case_id": case_id}))
-        for counter in counterarguments:
-            if "_id" in counter:
-                del counter["_id"]
-
-        # Get conflicts
-        conflicts_collection = database.get_conflicts_collection()
-        conflicts = list(conflicts_collection.find({"case_id": case_id}))
-        for conflict in conflicts:
-            if "_id" in conflict:
-                del conflict["_id"]
+    def get_case_with_details(self, case_id: str, fields: Optional[Dict[str, Optional[List[str]]]] = None) -> Optional[Dict]:
+        """
+        Get full case with all arguments, counterarguments, conflicts, strategy and agent messages,
+        in one aggregation.
 
-        # Get strategy (latest version)
-        strategies_collection = database.get_strategies_collection()
-        strategies = list(strategies_collection.find({"case_id": case_id}).sort("version", -1).limit(1))
-        strategy = None
-        if strategies:
-            strategy = strategies[0]
-            if "_id" in strategy:
-                del strategy["_id"]
-
-        # Get agent messages for audit trail
-        messages_collection = database.get_agent_messages_collection()
-        messages = list(messages_collection.find({"case_id": case_id}).sort("created_at", 1))
-        for msg in messages:
-            if "_id" in msg:
-                del msg["_id"]
-
-        return {
-            "case": case,
-            "arguments": arguments,
-            "counterarguments": counterarguments,
-            "conflicts": conflicts,
-            "strategy": strategy,
-            "agent_messages": messages
-        }
+        Args:
+            case_id: The case to read
+            fields: Sections and fields to return (see mongo_utils.parse_case_fields); all if None
+        """
+        return get_case_details(case_id, fields)
 
     def get_arguments(self, case_id: str) -> list:
         """Get all arguments for a case."""
@@ -397,18 +827,41 @@ class Orchestrator:
 
     def get_strategy(self, case_id: str) -> Optional[Dict]:
         """Get the final strategy for a case."""
-        strategies_collection = database.get_strategies_collection()
-        strategies = list(strategies_collection.find({"case_id": case_id}).sort("version", -1).limit(1))
-        if strategies:
-            strategy = strategies[0]
-            if "_id" in strategy:
-                del strategy["_id"]
-            return strategy
-        return None
+        return get_latest_strategy(case_id)
+
+    # ========================================================================
+    # Async reads for request handlers (Motor; see database.py)
+    # ========================================================================
+
+    async def get_case_async(self, case_id: str) -> Optional[Dict]:
+        """Retrieve a case without blocking the event loop."""
+        return await get_case_async(case_id)
+
+    async def get_case_with_details_async(self, case_id: str,
+                                          fields: Optional[Dict[str, Optional[List[str]]]] = None) -> Optional[Dict]:
+        """Async `get_case_with_details`: one aggregation round trip."""
+        return await get_case_details_async(case_id, fields)
+
+    async def get_arguments_async(self, case_id: str) -> list:
+        """Get all arguments for a case."""
+        return await get_arguments_async(case_id)
+
+    async def get_conflicts_async(self, case_id: str) -> list:
+        """Get all conflicts for a case."""
+        return await get_conflicts_async(case_id)
+
+    async def get_strategy_async(self, case_id: str) -> Optional[Dict]:
+        """Get the final strategy for a case."""
+        return await get_latest_strategy_async(case_id)
+
+    def _format_sse_event(self, event_type: str, data: Dict[str, Any]) -> Dict[str, str]:
+        """Format data as an SSE event (sse_starlette event dict with JSON data)."""
+        return {"event": event_type, "data": json.dumps(data)}
+
 
-    def _format_sse_event(self, event_type: str, data: Dict[str, Any]) -> str:
-        """Format data as an SSE event string."""
-        return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+def _agent_of(result: Any) -> Optional[str]:
+    """Agent that produced a stage's result (None for non-agent stages)."""
+    return result.get("agent") if isinstance(result, dict) else None
 
 
 # Singleton orchestrator instance
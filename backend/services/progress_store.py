@@ -0,0 +1,228 @@
+"""
+Progress Store - Per-case analysis progress shared across processes.
+
+A small status document per case, updated at each transition of its
+analysis (created, queued, running, each completed stage, and the final
+completed / failed / cancelled) and served by the cheap progress endpoints,
+so clients can poll many cases without opening an SSE stream for each.
+
+Two implementations, selected by config.PROGRESS_STORE:
+
+- "mongo" (default): one document per case in the `case_progress`
+  collection, visible to every API replica and worker process.
+- "memory": a bounded LRU with a TTL in this process. Only suitable for a
+  single process that also runs the analyses (EMBEDDED_WORKERS).
+
+Progress documents look like:
+
+    {"case_id", "status", "current_agent", "phase", "stages_completed",
+     "agents_completed", "deliberation_rounds", "conflicts", "strategy_id",
+     "error", "updated_at"}
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+import time
+from pymongo.errors import BulkWriteError
+import config
+import database
+
+
+class ProgressStore:
+    """Interface of the progress stores."""
+
+    def update(self, case_id: str, **fields: Any):
+        """Set fields of the case's progress, creating it if needed."""
+        raise NotImplementedError
+
+    def create_many(self, case_ids: Iterable[str]):
+        """Record new cases as created (cases with progress already are left alone)."""
+        for case_id in case_ids:
+            if self.get(case_id) is None:
+                self.update(case_id, status="created")
+
+    def complete_stage(self, case_id: str, stage: str, agent: Optional[str] = None):
+        """Record a completed stage (and the agent that ran it)."""
+        raise NotImplementedError
+
+    def get(self, case_id: str) -> Optional[Dict[str, Any]]:
+        """The case's progress, or None if unknown."""
+        raise NotImplementedError
+
+    def get_many(self, case_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Progress of several cases, keyed by case_id (unknown cases are left out)."""
+        raise NotImplementedError
+
+    async def get_async(self, case_id: str) -> Optional[Dict[str, Any]]:
+        """`get` for request handlers, without blocking the event loop."""
+        return self.get(case_id)
+
+    async def get_many_async(self, case_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """`get_many` for request handlers, without blocking the event loop."""
+        return self.get_many(case_ids)
+
+    async def delete_async(self, case_id: str):
+        """`delete` for request handlers, without blocking the event loop."""
+        self.delete(case_id)
+
+    def delete(self, case_id: str):
+        """Drop the case's progress."""
+        raise NotImplementedError
+
+
+class MemoryProgressStore(ProgressStore):
+    """Per-process progress, bounded by an LRU and expired after a TTL."""
+
+    def __init__(self, max_cases: int = None, ttl_seconds: int = None):
+        self.max_cases = max_cases or config.PROGRESS_MEMORY_MAX_CASES
+        self.ttl_seconds = ttl_seconds or config.PROGRESS_TTL_SECONDS
+        # case_id -> (updated_at monotonic time, progress)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def update(self, case_id: str, **fields: Any):
+        progress = self._get(case_id) or _new_progress(case_id)
+        progress.update(fields, updated_at=datetime.utcnow().isoformat())
+        self._set(case_id, progress)
+
+    def complete_stage(self, case_id: str, stage: str, agent: Optional[str] = None):
+        progress = self._get(case_id) or _new_progress(case_id)
+        if stage not in progress["stages_completed"]:
+            progress["stages_completed"].append(stage)
+        if agent and agent not in progress["agents_completed"]:
+            progress["agents_completed"].append(agent)
+        progress["updated_at"] = datetime.utcnow().isoformat()
+        self._set(case_id, progress)
+
+    def get(self, case_id: str) -> Optional[Dict[str, Any]]:
+        progress = self._get(case_id)
+        return dict(progress) if progress else None
+
+    def get_many(self, case_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        for case_id in case_ids:
+            progress = self.get(case_id)
+            if progress:
+                found[case_id] = progress
+        return found
+
+    def delete(self, case_id: str):
+        self._entries.pop(case_id, None)
+
+    def _get(self, case_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(case_id)
+        if entry is None:
+            return None
+        updated_at, progress = entry
+        if time.monotonic() - updated_at > self.ttl_seconds:
+            del self._entries[case_id]
+            return None
+        return progress
+
+    def _set(self, case_id: str, progress: Dict[str, Any]):
+        self._entries[case_id] = (time.monotonic(), progress)
+        self._entries.move_to_end(case_id)
+        while len(self._entries) > self.max_cases:
+            self._entries.popitem(last=False)
+
+
+class MongoProgressStore(ProgressStore):
+    """Progress documents in the case_progress collection, shared by all processes."""
+
+    PROJECTION = {"_id": 0}
+
+    def update(self, case_id: str, **fields: Any):
+        self._upsert(case_id, {"$set": {**fields, "updated_at": datetime.utcnow()}})
+
+    def create_many(self, case_ids: Iterable[str]):
+        now = datetime.utcnow()
+        documents = [{**_new_progress(case_id), "updated_at": now} for case_id in case_ids]
+        if not documents:
+            return
+        try:
+            database.get_case_progress_collection().insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                print(f"Warning: Could not create case progress: {e}")
+        except Exception as e:
+            print(f"Warning: Could not create case progress: {e}")
+
+    def complete_stage(self, case_id: str, stage: str, agent: Optional[str] = None):
+        added = {"stages_completed": stage}
+        if agent:
+            added["agents_completed"] = agent
+        self._upsert(case_id, {"$addToSet": added, "$set": {"updated_at": datetime.utcnow()}})
+
+    def get(self, case_id: str) -> Optional[Dict[str, Any]]:
+        progress = database.get_case_progress_collection().find_one({"case_id": case_id}, self.PROJECTION)
+        return _serialize(progress) if progress else None
+
+    def get_many(self, case_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        docs = database.get_case_progress_collection().find(
+            {"case_id": {"$in": list(case_ids)}}, self.PROJECTION
+        )
+        return {doc["case_id"]: _serialize(doc) for doc in docs}
+
+    def delete(self, case_id: str):
+        database.get_case_progress_collection().delete_one({"case_id": case_id})
+
+    async def get_async(self, case_id: str) -> Optional[Dict[str, Any]]:
+        progress = await database.get_async_case_progress_collection().find_one(
+            {"case_id": case_id}, self.PROJECTION
+        )
+        return _serialize(progress) if progress else None
+
+    async def get_many_async(self, case_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        docs = await database.get_async_case_progress_collection().find(
+            {"case_id": {"$in": list(case_ids)}}, self.PROJECTION
+        ).to_list(length=None)
+        return {doc["case_id"]: _serialize(doc) for doc in docs}
+
+    async def delete_async(self, case_id: str):
+        await database.get_async_case_progress_collection().delete_one({"case_id": case_id})
+
+    def _upsert(self, case_id: str, update: Dict[str, Any]):
+        defaults = {
+            key: value for key, value in _new_progress(case_id).items()
+            if key != "case_id" and not any(key in fields for fields in update.values())
+        }
+        try:
+            database.get_case_progress_collection().update_one(
+                {"case_id": case_id},
+                {**update, "$setOnInsert": defaults},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Warning: Could not update case progress: {e}")
+
+
+def _new_progress(case_id: str) -> Dict[str, Any]:
+    return {
+        "case_id": case_id,
+        "status": "created",
+        "current_agent": None,
+        "phase": None,
+        "stages_completed": [],
+        "agents_completed": [],
+        "deliberation_rounds": 0,
+        "conflicts": 0,
+        "strategy_id": None,
+        "error": None
+    }
+
+
+def _serialize(progress: Dict[str, Any]) -> Dict[str, Any]:
+    if isinstance(progress.get("updated_at"), datetime):
+        progress["updated_at"] = progress["updated_at"].isoformat()
+    return progress
+
+
+# Singleton progress store instance
+_store: Optional[ProgressStore] = None
+
+
+def get_progress_store() -> ProgressStore:
+    """Get or create the progress store configured by config.PROGRESS_STORE."""
+    global _store
+    if _store is None:
+        _store = MemoryProgressStore() if config.PROGRESS_STORE == "memory" else MongoProgressStore()
+    return _store
@@ -0,0 +1,135 @@
+"""
+Process-wide rate limiter for Groq requests.
+
+Groq enforces both a requests-per-minute and a tokens-per-minute budget per
+model. Every LLM call in this process acquires from two token buckets (one
+per budget) before it is sent, so concurrent cases queue for capacity rather
+than failing with 429s. Waiters are served in FIFO order.
+
+A call's token cost is estimated up front as the prompt's token count plus
+the requested max_tokens, since the real usage is only known after the
+response.
+
+Queue depth and wait times are exposed through `stats()` for capacity planning.
+"""
+from typing import Any, Dict, Optional
+import asyncio
+import time
+import config
+from services import context_packer
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count for budgeting (see context_packer.count_tokens)."""
+    return context_packer.count_tokens(text) + 1
+
+
+def estimate_request_tokens(system_prompt: str, prompt: str, max_tokens: int) -> int:
+    """Estimated total token cost of a chat completion request."""
+    return estimate_tokens(system_prompt) + estimate_tokens(prompt) + max_tokens
+
+
+class TokenBucket:
+    """A bucket refilled continuously at `per_minute` units per minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.available = float(per_minute)
+        self.rate = per_minute / 60.0  # Units per second
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        self._refill()
+        # A single request larger than the whole budget waits for a full bucket
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.available -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limiter with a FIFO wait queue."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        # A budget of 0 disables that dimension
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._lock = asyncio.Lock()  # FIFO: waiters acquire in arrival order
+        self.queue_depth = 0
+        self.acquired = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.last_wait_seconds = 0.0
+
+    async def acquire(self, tokens: int) -> float:
+        """
+        Wait until one request and `tokens` tokens fit the budgets, then consume them.
+
+        Args:
+            tokens: Estimated token cost of the request
+
+        Returns:
+            float: Seconds spent waiting in the queue
+        """
+        start = time.monotonic()
+        self.queue_depth += 1
+        try:
+            async with self._lock:
+                while True:
+                    delay = max(
+                        self.requests.time_until(1) if self.requests else 0.0,
+                        self.tokens.time_until(tokens) if self.tokens else 0.0,
+                    )
+                    if delay <= 0:
+                        break
+                    await asyncio.sleep(delay)
+                if self.requests:
+                    self.requests.consume(1)
+                if self.tokens:
+                    self.tokens.consume(tokens)
+        finally:
+            self.queue_depth -= 1
+
+        waited = time.monotonic() - start
+        self.acquired += 1
+        self.total_wait_seconds += waited
+        self.last_wait_seconds = waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, wait times and remaining budgets."""
+        for bucket in (self.requests, self.tokens):
+            if bucket:
+                bucket._refill()
+        return {
+            "queue_depth": self.queue_depth,
+            "acquired": self.acquired,
+            "last_wait_seconds": round(self.last_wait_seconds, 3),
+            "avg_wait_seconds": round(self.total_wait_seconds / self.acquired, 3) if self.acquired else 0.0,
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+            "requests_available": int(self.requests.available) if self.requests else None,
+            "tokens_available": int(self.tokens.available) if self.tokens else None,
+        }
+
+
+# Process-wide limiter instance
+_limiter: Optional[RateLimiter] = None
+
+
+def get_limiter() -> RateLimiter:
+    """Get or create the process-wide rate limiter."""
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(config.GROQ_REQUESTS_PER_MINUTE, config.GROQ_TOKENS_PER_MINUTE)
+    return _limiter
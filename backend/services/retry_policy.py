@@ -0,0 +1,241 @@
+"""
+Shared retry policy and circuit breaker for LLM requests.
+
+All LLM calls go through a `RetryPolicy` (see services/llm_client.py), one
+per model so each model in the cascade has its own circuit breaker:
+
+- Retryable errors (429, 408/409, 5xx, connection errors and timeouts) are
+  retried with exponential backoff and full jitter, up to
+  config.LLM_RETRY_MAX_ATTEMPTS attempts in total.
+- A Retry-After header on the error response overrides the computed backoff.
+- Fatal errors (authentication, bad request, other 4xx) are raised at once.
+- A circuit breaker opens after config.LLM_BREAKER_FAILURE_THRESHOLD
+  consecutive provider failures (5xx, connection errors, timeouts) and fails
+  calls fast until config.LLM_BREAKER_RESET_SECONDS have passed; one trial
+  call then decides whether it closes again.
+
+Errors are classified by their `status_code` attribute (as on groq's
+APIStatusError) or by being a connection/timeout error, so non-Groq backends
+can participate by raising exceptions with the same shape.
+"""
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+import asyncio
+import random
+import time
+import groq
+import config
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is open and calls are failing fast."""
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether the error is transient and the request may be retried."""
+    if isinstance(error, (groq.APIConnectionError, asyncio.TimeoutError)):
+        return True
+    status = _status_code(error)
+    if status is None:
+        return False
+    return status in RETRYABLE_STATUS_CODES or status >= 500
+
+
+def is_provider_failure(error: Exception) -> bool:
+    """Whether the error indicates a degraded provider (counts toward the breaker)."""
+    if isinstance(error, (groq.APIConnectionError, asyncio.TimeoutError)):
+        return True
+    status = _status_code(error)
+    return status is not None and status >= 500
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) from the error response."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial call."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_count = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must fail fast."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                raise CircuitOpenError("LLM provider circuit breaker is open")
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                raise CircuitOpenError("LLM provider circuit breaker is half-open (trial in flight)")
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_cancelled(self):
+        """Release a half-open trial whose call was cancelled, without a verdict."""
+        self._trial_in_flight = False
+
+    def record_failure(self, provider_failure: bool):
+        """Record a failed call; only provider failures count toward opening."""
+        was_trial = self._trial_in_flight
+        self._trial_in_flight = False
+        if not provider_failure:
+            if was_trial:
+                # The trial got an answer from the provider, so it is reachable
+                self.state = self.CLOSED
+            return
+        self.consecutive_failures += 1
+        if was_trial or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened_count += 1
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_count": self.opened_count,
+        }
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, Retry-After support and a circuit breaker."""
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float,
+                 breaker: CircuitBreaker):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker
+        self.calls = 0
+        self.retries = 0
+        self.exhausted = 0
+        self.fatal = 0
+        self.rejected = 0
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """Delay before the next attempt (attempt is 0-based)."""
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def run(self, fn: Callable[[], Awaitable[T]], label: str = "LLM") -> T:
+        """
+        Call `fn` under the policy.
+
+        Args:
+            fn: Coroutine factory performing one attempt
+            label: Name used in log lines
+
+        Returns:
+            The result of the first successful attempt
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            Exception: The last error, if it was fatal or attempts ran out
+        """
+        self.calls += 1
+        for attempt in range(self.max_attempts):
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self.rejected += 1
+                raise
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                self.breaker.record_cancelled()
+                raise
+            except Exception as e:
+                self.breaker.record_failure(provider_failure=is_provider_failure(e))
+                if not is_retryable(e):
+                    self.fatal += 1
+                    raise
+                if attempt + 1 >= self.max_attempts:
+                    self.exhausted += 1
+                    raise
+                delay = self.backoff(attempt, e)
+                self.retries += 1
+                print(f"[{label}] Retryable error ({e}); retrying in {delay:.1f}s "
+                      f"(attempt {attempt + 2}/{self.max_attempts})")
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "exhausted": self.exhausted,
+            "fatal": self.fatal,
+            "rejected_by_breaker": self.rejected,
+            "breaker": self.breaker.stats(),
+        }
+
+
+# One policy (and circuit breaker) per model, so a saturated model fails
+# fast without blocking the fallback models in the cascade
+_policies: Dict[str, RetryPolicy] = {}
+
+
+def get_policy(model: str = None) -> RetryPolicy:
+    """Get or create the retry policy for a model (default: config.GROQ_MODEL)."""
+    model = model or config.GROQ_MODEL
+    if model not in _policies:
+        _policies[model] = RetryPolicy(
+            max_attempts=config.LLM_RETRY_MAX_ATTEMPTS,
+            base_delay=config.LLM_RETRY_BASE_DELAY,
+            max_delay=config.LLM_RETRY_MAX_DELAY,
+            breaker=CircuitBreaker(
+                failure_threshold=config.LLM_BREAKER_FAILURE_THRESHOLD,
+                reset_seconds=config.LLM_BREAKER_RESET_SECONDS,
+            ),
+        )
+    return _policies[model]
+
+
+def all_stats() -> Dict[str, Dict[str, Any]]:
+    """Retry and breaker metrics for every model used so far."""
+    return {model: policy.stats() for model, policy in _policies.items()}
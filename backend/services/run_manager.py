@@ -0,0 +1,512 @@
+"""
+Run Manager - Runs each case's analysis once and fans its events out to SSE clients.
+
+Opening `/api/cases/{case_id}/stream` used to start a new analysis on every
+connection, so a browser reconnect or a second tab re-ran the whole
+multi-agent pipeline. Now the run executes in a background task owned by the
+`RunManager`, and every event it produces is appended to the case's
+`CaseEventLog`:
+
+- Events get increasing sequence numbers, sent as the SSE `id`, so
+  `EventSource` reconnects with a `Last-Event-ID` header and the stream
+  resumes right after the last event the client saw.
+- The log is kept in memory for live tailing and written to the
+  `case_events` collection. A case whose log has been evicted from memory
+  (or that ran before a restart) is replayed from Mongo.
+- `agent_token` deltas are not persisted by default
+  (config.CASE_EVENTS_PERSIST_TOKENS); `agent_completed` carries the full
+  content, so a replay from Mongo loses nothing but the typing effect.
+- Loading, polling and persisting events, and enqueueing the case's job, run
+  in worker threads (asyncio.to_thread); only the run's task is created on
+  the event loop.
+
+With config.ANALYSIS_JOB_QUEUE (the default) runs are not started here
+directly: the case is enqueued (services/job_queue.py) and a worker, embedded
+in the API process or a separate `worker.py`, calls `run_case`. Subscribers
+tail the in-memory log while this process feeds it, and otherwise poll
+`case_events` for events written by another process.
+
+Without the queue, a run is started at most once per case in this process. If
+the persisted log ends without a terminal event (the process stopped mid-run),
+the next subscriber starts a new run that continues the same log.
+
+While a case's job waits in the queue, subscribers receive `analysis_queued`
+events with its position and estimated wait (services/admission.py). They
+carry no SSE id, so they don't affect Last-Event-ID replay.
+
+A run is cancelled explicitly (`cancel`, DELETE /api/cases/{id}/run) or once
+no SSE client of this process has watched it for
+config.ABANDONED_RUN_GRACE_SECONDS. Cancelling stops the graph, so no further
+stages are scheduled and in-flight LLM requests are cancelled; the case's
+unfinished agent_runs are marked cancelled and the log ends with an
+`analysis_cancelled` event. A run in another worker process is cancelled
+through its job, which the worker notices on its next heartbeat. The
+checkpoint is kept, so /resume continues after the last completed stage.
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncGenerator, Dict, List, Optional
+import asyncio
+import json
+from pymongo.errors import DuplicateKeyError
+import config
+import database
+from services.admission import get_controller
+from services.job_queue import get_queue
+from services.mongo_utils import cancel_agent_runs
+from services.progress_store import get_progress_store
+
+# Events after which a case's run is over
+TERMINAL_EVENTS = ("strategy_ready", "error", "analysis_cancelled")
+# Terminal events that a resumed run supersedes
+INTERRUPTED_EVENTS = ("error", "analysis_cancelled")
+# Attempts at persisting an event whose sequence number another process took
+APPEND_ATTEMPTS = 5
+
+
+class CaseEventLog:
+    """Append-only, sequence-numbered event log of one case's analysis run."""
+
+    def __init__(self, case_id: str, events: Optional[List[Dict[str, Any]]] = None):
+        self.case_id = case_id
+        self.events: List[Dict[str, Any]] = events or []
+        self.next_seq = self.events[-1]["seq"] + 1 if self.events else 1
+        self.done = bool(self.events) and self.events[-1]["event"] in TERMINAL_EVENTS
+        self.local = False  # True while a run in this process is feeding the log
+        self._changed = asyncio.Condition()
+        self._lock = asyncio.Lock()  # Serializes appends and refreshes
+
+    async def append(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Append an event and wake subscribers.
+
+        The event is persisted before subscribers see it. If another process
+        logged events this log has not picked up yet, they are added first
+        and the event is numbered after them.
+
+        Args:
+            event: SSE event dict with "event" and "data" (a JSON string)
+
+        Returns:
+            The logged entry, with its sequence number
+        """
+        async with self._lock:
+            entry = {"seq": self.next_seq, "event": event["event"], "data": event["data"]}
+            if _persisted(entry):
+                missed = await asyncio.to_thread(self._persist, entry)
+                self.events.extend(missed)
+            self.events.append(entry)
+            self.next_seq = entry["seq"] + 1
+        async with self._changed:
+            self._changed.notify_all()
+        return entry
+
+    async def close(self, done: bool = True):
+        """
+        Stop feeding the log from this process and wake subscribers.
+
+        Args:
+            done: Whether the run is over. A run stopped without a terminal
+                event (e.g. its worker lost the job's lease) is not done;
+                another worker may continue the log.
+        """
+        self.local = False
+        self.done = done
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def subscribe(self, after_seq: int = 0) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Yield logged events with a sequence number above `after_seq`, then
+        tail new events until the run is over.
+
+        Yields:
+            SSE event dicts with "id", "event" and "data"
+        """
+        index = 0
+        while True:
+            while index < len(self.events):
+                entry = self.events[index]
+                index += 1
+                if entry["event"] in INTERRUPTED_EVENTS and index < len(self.events):
+                    # Superseded: the run was resumed after this error
+                    continue
+                if entry["seq"] > after_seq:
+                    yield {"id": str(entry["seq"]), "event": entry["event"], "data": entry["data"]}
+            if self.done or (not self.local and not config.ANALYSIS_JOB_QUEUE):
+                # Over, or stopped with nothing left to continue it (a
+                # reconnect starts a new run)
+                return
+            async with self._changed:
+                if index == len(self.events) and not self.done:
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), timeout=config.CASE_EVENTS_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+            if not self.local:
+                # The run may be executing in another process
+                await self.refresh()
+
+    async def refresh(self):
+        """Pick up events that another process appended to case_events."""
+        async with self._lock:
+            events = await asyncio.to_thread(_load_events, self.case_id, self.next_seq - 1)
+            if not events:
+                return
+            self.events.extend(events)
+            self.next_seq = events[-1]["seq"] + 1
+            self.done = events[-1]["event"] in TERMINAL_EVENTS
+
+    def _persist(self, entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Write an event to the case_events collection under the next free
+        sequence number (the unique (case_id, seq) index rejects a taken one).
+
+        Returns:
+            Events other processes logged from the entry's original sequence
+            number on; the entry is renumbered after them
+        """
+        collection = database.get_case_events_collection()
+        missed: List[Dict[str, Any]] = []
+        for _ in range(APPEND_ATTEMPTS):
+            try:
+                collection.insert_one({"case_id": self.case_id, **entry, "created_at": datetime.utcnow()})
+                return missed
+            except DuplicateKeyError:
+                newer = _load_events(self.case_id, after_seq=entry["seq"] - 1)
+                missed.extend(newer)
+                entry["seq"] = newer[-1]["seq"] + 1 if newer else entry["seq"] + 1
+            except Exception as e:
+                print(f"Warning: Could not persist case event {entry['event']} (seq {entry['seq']}) "
+                      f"of case {self.case_id}, it is only in this process's log: {e}")
+                return missed
+        print(f"Warning: Could not persist case event {entry['event']} of case {self.case_id}: "
+              f"sequence numbers still taken after {APPEND_ATTEMPTS} attempts, it is only in this process's log")
+        return missed
+
+
+class RunManager:
+    """Starts each case's analysis once and serves its event log to subscribers."""
+
+    def __init__(self, max_cached_logs: int = None):
+        self.max_cached_logs = max_cached_logs or config.CASE_EVENT_LOG_MAX_CASES
+        self._logs: "OrderedDict[str, CaseEventLog]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._clients: Dict[str, Optional[str]] = {}  # case_id -> client of its running analysis
+        self._cancel_reasons: Dict[str, str] = {}  # case_id -> why its run is being cancelled
+        self._subscribers: Dict[str, int] = {}  # case_id -> SSE clients watching in this process
+        self._abandon_timers: Dict[str, asyncio.Task] = {}
+
+    async def get_log(self, case_id: str) -> CaseEventLog:
+        """The case's event log, from memory or loaded from Mongo."""
+        log = self._logs.get(case_id)
+        if log is None:
+            events = await asyncio.to_thread(_load_events, case_id)
+            # Another caller may have loaded it meanwhile
+            log = self._logs.get(case_id)
+            if log is None:
+                log = CaseEventLog(case_id, events)
+                self._logs[case_id] = log
+                self._evict()
+        self._logs.move_to_end(case_id)
+        return log
+
+    def is_running(self, case_id: str) -> bool:
+        task = self._tasks.get(case_id)
+        return task is not None and not task.done()
+
+    def running_count(self, client_id: Optional[str] = None) -> int:
+        """Number of analyses running in this process, optionally for one client."""
+        return sum(
+            1 for case_id in list(self._tasks)
+            if self.is_running(case_id) and (client_id is None or self._clients.get(case_id) == client_id)
+        )
+
+    async def ensure_started(self, case_id: str, client_id: Optional[str] = None) -> CaseEventLog:
+        """
+        Start the case's analysis unless it is running or has already finished.
+
+        With the job queue enabled, this enqueues the case (a no-op if it
+        already has a job) and a worker starts the run.
+
+        Args:
+            case_id: The case to analyze
+            client_id: Client the analysis is run for (see services/admission.py)
+
+        Returns:
+            The case's event log
+        """
+        log = await self.get_log(case_id)
+        if log.done or self.is_running(case_id):
+            return log
+        if config.ANALYSIS_JOB_QUEUE:
+            try:
+                await asyncio.to_thread(_enqueue, case_id, client_id)
+            except Exception as e:
+                print(f"Warning: Could not enqueue analysis job: {e}")
+            return log
+        self._start(case_id, log, client_id)
+        return log
+
+    async def resume(self, case_id: str, client_id: Optional[str] = None) -> CaseEventLog:
+        """
+        Run a case again after its run failed or was interrupted. The
+        orchestrator restores the stages completed before from the case's
+        checkpoint, so only the rest re-executes.
+
+        Returns:
+            The case's event log
+        """
+        log = await self.get_log(case_id)
+        if self.is_running(case_id):
+            return log
+        if config.ANALYSIS_JOB_QUEUE:
+            await asyncio.to_thread(_enqueue, case_id, client_id, True)
+            log.done = False
+            return log
+        self._start(case_id, log, client_id)
+        return log
+
+    async def cancel(self, case_id: str, reason: str = "cancelled") -> bool:
+        """
+        Cancel the case's analysis, wherever it runs.
+
+        Args:
+            case_id: The case whose analysis to cancel
+            reason: Why, recorded on the job and in the analysis_cancelled event
+
+        Returns:
+            False if the case had no queued or running analysis
+        """
+        job = None
+        if config.ANALYSIS_JOB_QUEUE:
+            try:
+                job = await asyncio.to_thread(get_queue().cancel, case_id, reason)
+            except Exception as e:
+                print(f"Warning: Could not cancel analysis job: {e}")
+        if self.interrupt(case_id, reason):
+            return True
+        if job is None:
+            return False
+        if job["status"] == "queued":
+            # Never started, so no run will log the cancellation
+            await asyncio.to_thread(get_progress_store().update, case_id, status="cancelled", error=reason)
+            log = await self.get_log(case_id)
+            await log.append(_cancelled_event(case_id, reason))
+            await log.close()
+        # A job running in another process is stopped by its worker
+        return True
+
+    def interrupt(self, case_id: str, reason: str) -> bool:
+        """
+        Cancel the case's run in this process, if any.
+
+        Returns:
+            Whether a run was cancelled
+        """
+        if not self.is_running(case_id):
+            return False
+        print(f"[RunManager] Cancelling analysis run for case {case_id}: {reason}")
+        self._cancel_reasons[case_id] = reason
+        self._tasks[case_id].cancel()
+        return True
+
+    async def run_case(self, case_id: str, stream_tokens: bool = True) -> str:
+        """
+        Run a case's analysis in this process and wait for it to finish.
+        Used by workers and batches; a run already in progress here is awaited instead.
+
+        Args:
+            case_id: The case to analyze
+            stream_tokens: Emit agent_token events (off for batch runs)
+
+        Returns:
+            The run's last event type ("strategy_ready" on success)
+        """
+        if not self.is_running(case_id):
+            log = await self.get_log(case_id)
+            await log.refresh()
+            if not self.is_running(case_id):
+                self._start(case_id, log, stream_tokens=stream_tokens)
+        return await self._tasks[case_id]
+
+    def _start(self, case_id: str, log: CaseEventLog, client_id: Optional[str] = None,
+               stream_tokens: bool = True):
+        print(f"[RunManager] Starting analysis run for case {case_id} at seq {log.next_seq}")
+        log.done = False
+        log.local = True
+        self._clients[case_id] = client_id
+        self._tasks[case_id] = asyncio.create_task(self._run(case_id, log, stream_tokens))
+
+    async def subscribe(self, case_id: str, last_event_id: Optional[str] = None) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Stream a case's events, starting its run if needed.
+
+        Args:
+            case_id: The case to stream
+            last_event_id: Value of the client's Last-Event-ID header, if any
+
+        Yields:
+            SSE event dicts with "id", "event" and "data"
+        """
+        log = await self.ensure_started(case_id)
+        self._watch(case_id)
+        try:
+            if config.ANALYSIS_JOB_QUEUE and not log.done:
+                async for event in self._queue_updates(case_id):
+                    yield event
+            async for event in log.subscribe(_parse_event_id(last_event_id)):
+                yield event
+        finally:
+            self._unwatch(case_id)
+
+    async def _queue_updates(self, case_id: str) -> AsyncGenerator[Dict[str, Any], None]:
+        """Report the case's queue position until a worker claims its job."""
+        while True:
+            try:
+                status = await asyncio.to_thread(get_controller().queue_status, case_id)
+            except Exception as e:
+                print(f"Warning: Could not read queue status: {e}")
+                return
+            if status is None:
+                return
+            yield {"event": "analysis_queued", "data": json.dumps(status)}
+            # Between updates, only check whether the job is still queued
+            waited = 0.0
+            while waited < config.ADMISSION_QUEUE_EVENT_SECONDS:
+                await asyncio.sleep(config.CASE_EVENTS_POLL_SECONDS)
+                waited += config.CASE_EVENTS_POLL_SECONDS
+                job = await asyncio.to_thread(get_queue().get_job, case_id)
+                if not job or job["status"] != "queued":
+                    return
+
+    def _watch(self, case_id: str):
+        self._subscribers[case_id] = self._subscribers.get(case_id, 0) + 1
+        timer = self._abandon_timers.pop(case_id, None)
+        if timer is not None:
+            timer.cancel()
+
+    def _unwatch(self, case_id: str):
+        """Count a disconnected subscriber; the last one starts the abandon grace period."""
+        remaining = self._subscribers.get(case_id, 1) - 1
+        if remaining > 0:
+            self._subscribers[case_id] = remaining
+            return
+        self._subscribers.pop(case_id, None)
+        # A log that is no longer in memory was evicted, so its run is over
+        log = self._logs.get(case_id)
+        if config.ABANDONED_RUN_GRACE_SECONDS > 0 and log is not None and not log.done:
+            self._abandon_timers[case_id] = asyncio.create_task(self._cancel_if_abandoned(case_id))
+
+    async def _cancel_if_abandoned(self, case_id: str):
+        """Cancel the case's run if no subscriber reconnects within the grace period."""
+        try:
+            await asyncio.sleep(config.ABANDONED_RUN_GRACE_SECONDS)
+        except asyncio.CancelledError:
+            return  # A subscriber reconnected
+        self._abandon_timers.pop(case_id, None)
+        if self._subscribers.get(case_id) or (await self.get_log(case_id)).done:
+            return
+        case = await asyncio.to_thread(
+            database.get_cases_collection().find_one, {"case_id": case_id}, {"_id": 0, "batch_id": 1}
+        )
+        if case is None or case.get("batch_id"):
+            # Deleted, or part of a batch (batches run without watchers)
+            return
+        await self.cancel(case_id, "client_disconnected")
+
+    def forget(self, case_id: str):
+        """Drop a case's in-memory log (e.g. when the case is deleted)."""
+        if not self.is_running(case_id):
+            self._logs.pop(case_id, None)
+
+    async def _run(self, case_id: str, log: CaseEventLog, stream_tokens: bool = True) -> str:
+        """Drive the orchestrator's analysis, appending its events to the log."""
+        from services.orchestrator import get_orchestrator
+
+        last_event = None
+        try:
+            async for event in get_orchestrator().run_analysis(case_id, stream_tokens=stream_tokens):
+                await log.append(event)
+                last_event = event["event"]
+        except asyncio.CancelledError:
+            reason = self._cancel_reasons.pop(case_id, None)
+            if reason is None:
+                # Not a cancellation of the analysis (shutdown, or the worker
+                # lost the job's lease): leave the log open for another run
+                raise
+            cancelled = await asyncio.to_thread(cancel_agent_runs, case_id)
+            print(f"[RunManager] Run for case {case_id} cancelled ({reason}), {cancelled} agent runs stopped")
+            await asyncio.to_thread(
+                get_progress_store().update, case_id, status="cancelled", current_agent=None, error=reason
+            )
+            await log.append(_cancelled_event(case_id, reason))
+            last_event = "analysis_cancelled"
+        except Exception as e:
+            print(f"[RunManager] Run for case {case_id} failed: {e}")
+            await log.append({"event": "error", "data": json.dumps({"case_id": case_id, "message": str(e)})})
+            last_event = "error"
+        finally:
+            self._tasks.pop(case_id, None)
+            self._clients.pop(case_id, None)
+            self._cancel_reasons.pop(case_id, None)
+            await log.close(done=last_event in TERMINAL_EVENTS)
+        return last_event
+
+    def _evict(self):
+        """Drop the oldest finished logs beyond the in-memory limit (Mongo keeps them)."""
+        for case_id in list(self._logs):
+            if len(self._logs) <= self.max_cached_logs:
+                break
+            if self._logs[case_id].done and not self.is_running(case_id):
+                del self._logs[case_id]
+
+
+def _enqueue(case_id: str, client_id: Optional[str], requeue: bool = False):
+    """Enqueue the case's analysis job and mark it queued (blocking; run off the event loop)."""
+    job = get_queue().enqueue(case_id, requeue=requeue, client_id=client_id)
+    if requeue:
+        get_progress_store().update(case_id, status="queued", error=None)
+    elif job["status"] == "queued":
+        get_progress_store().update(case_id, status="queued")
+
+
+def _persisted(entry: Dict[str, Any]) -> bool:
+    """Whether an event is written to case_events (token deltas are optional)."""
+    return entry["event"] != "agent_token" or config.CASE_EVENTS_PERSIST_TOKENS
+
+
+def _load_events(case_id: str, after_seq: int = 0) -> List[Dict[str, Any]]:
+    """Persisted events of a case with a sequence number above `after_seq`."""
+    try:
+        docs = database.get_case_events_collection().find(
+            {"case_id": case_id, "seq": {"$gt": after_seq}},
+            {"_id": 0, "seq": 1, "event": 1, "data": 1}
+        ).sort("seq", 1)
+        return list(docs)
+    except Exception as e:
+        print(f"Warning: Could not load case events: {e}")
+        return []
+
+
+def _cancelled_event(case_id: str, reason: str) -> Dict[str, Any]:
+    return {"event": "analysis_cancelled", "data": json.dumps({"case_id": case_id, "reason": reason})}
+
+
+def _parse_event_id(last_event_id: Optional[str]) -> int:
+    try:
+        return int(last_event_id) if last_event_id else 0
+    except ValueError:
+        return 0
+
+
+# Singleton run manager instance
+_run_manager: Optional[RunManager] = None
+
+
+def get_run_manager() -> RunManager:
+    """Get or create the run manager singleton."""
+    global _run_manager
+    if _run_manager is None:
+        _run_manager = RunManager()
+    return _run_manager
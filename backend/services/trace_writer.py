@@ -0,0 +1,206 @@
+"""
+Trace Writer - Write-behind buffer for agent trace documents.
+
+A single agent call used to make several synchronous Mongo round-trips on
+the analysis path before its SSE event could go out: the agent run insert,
+one insert per reasoning step, its agent message, the run's finish update
+and the case usage update. The trace writer takes these off the critical
+path: callers enqueue a pymongo write operation and move on, and a
+background thread writes the queue in bulk (one `bulk_write` per
+collection) every config.TRACE_BATCH_SIZE operations or
+config.TRACE_FLUSH_SECONDS, whichever comes first.
+
+- Order: operations on a collection are written in the order they were
+  enqueued, so a run's finish update always follows its insert. Bulk writes
+  are unordered, though: an operation that fails is logged and the rest of
+  the batch is still written.
+- Backpressure: the queue holds at most config.TRACE_QUEUE_MAX_OPS
+  operations. A writer that finds it full waits for room, so writes are
+  neither dropped nor sent to Mongo ahead of earlier queued operations.
+- Read-your-writes: `flush()` waits, at most
+  config.TRACE_FLUSH_TIMEOUT_SECONDS, until everything enqueued so far is
+  written. services/mongo_utils.py flushes before reading documents that may
+  still be queued and before checkpoints; the orchestrator makes those calls
+  in worker threads, off the event loop.
+- Shutdown: `close()` drains the queue, waiting at most
+  config.TRACE_DRAIN_TIMEOUT_SECONDS; later writes go straight to Mongo.
+
+Primary artifacts (arguments, counterarguments, conflicts, strategies) are
+written synchronously unless config.DURABLE_ARTIFACT_WRITES is disabled.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import queue
+import threading
+import time
+from pymongo.errors import BulkWriteError
+import config
+import database
+
+_STOP = object()  # Queue sentinel: drain and exit
+
+
+class TraceWriter:
+    """Background thread writing queued trace operations to Mongo in bulk."""
+
+    def __init__(self, enabled: bool = None, max_ops: int = None, batch_size: int = None,
+                 flush_seconds: float = None):
+        self.enabled = config.TRACE_WRITE_BEHIND if enabled is None else enabled
+        self.batch_size = batch_size or config.TRACE_BATCH_SIZE
+        self.flush_seconds = flush_seconds or config.TRACE_FLUSH_SECONDS
+        self.overflowed = 0  # Operations that found the queue full
+        # Items: (collection name, pymongo write operation), flush markers or _STOP
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_ops or config.TRACE_QUEUE_MAX_OPS)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, collection_name: str, operation: Any):
+        """
+        Queue a write (InsertOne, UpdateOne, ...) on a collection.
+
+        When the queue is full, waits until the writer thread makes room.
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((collection_name, operation))
+        except queue.Full:
+            self._overflow(collection_name, operation)
+
+    @property
+    def pending(self) -> bool:
+        """Whether operations enqueued so far may not be written yet."""
+        return self._thread is not None and self._queue.unfinished_tasks > 0
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until every operation enqueued so far is written.
+
+        Args:
+            timeout: Seconds to wait (default config.TRACE_FLUSH_TIMEOUT_SECONDS)
+
+        Returns:
+            False if the timeout expired first
+        """
+        if not self.pending:
+            return True
+        timeout = config.TRACE_FLUSH_TIMEOUT_SECONDS if timeout is None else timeout
+        written = threading.Event()
+        try:
+            self._queue.put(written, timeout=timeout)
+        except queue.Full:
+            return False
+        return written.wait(timeout)
+
+    def close(self, timeout: float = None):
+        """Drain the queue and stop the thread; later writes are not buffered."""
+        self.enabled = False
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        timeout = config.TRACE_DRAIN_TIMEOUT_SECONDS if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        else:
+            thread.join(max(deadline - time.monotonic(), 0))
+        if thread.is_alive():
+            print(f"Warning: Could not drain trace writes ({self._queue.qsize()} still queued)")
+
+    def _overflow(self, collection_name: str, operation: Any):
+        """Wait for room in the full queue, warning each config.TRACE_FLUSH_TIMEOUT_SECONDS."""
+        self.overflowed += 1
+        thread = self._thread
+        while True:
+            try:
+                self._queue.put((collection_name, operation), timeout=config.TRACE_FLUSH_TIMEOUT_SECONDS)
+                return
+            except queue.Full:
+                pass
+            if thread is None or not thread.is_alive():
+                # Closed meanwhile: the queue is no longer drained
+                _write([(collection_name, operation)])
+                return
+            print(f"Warning: Trace write queue is full ({self._queue.maxsize} operations), "
+                  f"still waiting ({self.overflowed} operations have waited so far)")
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """Collect operations into batches and write them until stopped."""
+        stopping = False
+        while not stopping:
+            batch, markers, taken = [], [], 0
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_seconds
+            while True:
+                taken += 1
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                # Write now if stopping, asked to flush, or the batch is full;
+                # drain whatever is already queued first when stopping
+                if stopping:
+                    try:
+                        item = self._queue.get_nowait()
+                        continue
+                    except queue.Empty:
+                        break
+                if markers or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+
+            _write(batch)
+            for _ in range(taken):
+                self._queue.task_done()
+            for marker in markers:
+                marker.set()
+
+
+def _write(batch: List[Tuple[str, Any]]):
+    """
+    Write a batch with one unordered bulk_write per collection.
+
+    Operations are still sent in queue order; a failed one is logged
+    without stopping the rest.
+    """
+    by_collection: Dict[str, List[Any]] = {}
+    for collection_name, operation in batch:
+        by_collection.setdefault(collection_name, []).append(operation)
+    for collection_name, operations in by_collection.items():
+        try:
+            database.get_collection(collection_name).bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                print(f"Warning: Could not write queued {collection_name} operation "
+                      f"{operations[error['index']]!r}: {error.get('errmsg')}")
+            for error in e.details.get("writeConcernErrors", []):
+                print(f"Warning: Queued {collection_name} writes did not satisfy the write concern: "
+                      f"{error.get('errmsg')}")
+        except Exception as e:
+            print(f"Warning: Could not write {len(operations)} queued {collection_name} operations: {e}")
+
+
+# Singleton trace writer instance
+_writer: Optional[TraceWriter] = None
+
+
+def get_trace_writer() -> TraceWriter:
+    """Get or create the trace writer singleton."""
+    global _writer
+    if _writer is None:
+        _writer = TraceWriter()
+    return _writer
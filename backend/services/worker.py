@@ -0,0 +1,137 @@
+"""
+Analysis Worker - Claims queued analysis jobs and runs their pipelines.
+
+A worker runs up to `concurrency` analyses at once. Each slot polls the job
+queue (services/job_queue.py), claims a job atomically, and runs the case
+through `RunManager.run_case`, so the run's events go to the case's event log
+and on to SSE clients. While a job runs, the worker heartbeats its lease; if
+the lease is lost (e.g. the worker stalled and another worker reclaimed the
+job) the local run is cancelled so the case is never analyzed twice at once.
+
+Workers run either embedded in the API process (config.EMBEDDED_WORKERS) or
+standalone with `python worker.py`, which lets analysis capacity scale
+independently of API replicas.
+"""
+from typing import List, Optional
+import asyncio
+import json
+import os
+import socket
+import uuid
+import config
+from services.admission import get_controller
+from services.job_queue import JobQueue, get_queue
+from services.progress_store import get_progress_store
+from services.run_manager import get_run_manager
+
+
+class AnalysisWorker:
+    """Pool of job-claiming slots that run case analyses."""
+
+    def __init__(self, concurrency: int = None, queue: Optional[JobQueue] = None,
+                 worker_id: Optional[str] = None):
+        self.concurrency = concurrency or config.WORKER_CONCURRENCY
+        self.queue = queue or get_queue()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stopping = asyncio.Event()
+        self._slots: List[asyncio.Task] = []
+
+    def start(self):
+        """Start the worker's slots as background tasks."""
+        print(f"[Worker {self.worker_id}] Starting with concurrency {self.concurrency}")
+        self._slots = [asyncio.create_task(self._slot(i)) for i in range(self.concurrency)]
+
+    async def run(self):
+        """Start the worker and run until stopped."""
+        self.start()
+        await asyncio.gather(*self._slots, return_exceptions=True)
+
+    async def stop(self, timeout: float = None):
+        """
+        Stop claiming jobs and wait for running analyses to finish.
+
+        Analyses still running after `timeout` seconds are cancelled; their
+        jobs are reclaimed by another worker once the lease expires.
+        """
+        self._stopping.set()
+        if not self._slots:
+            return
+        _, pending = await asyncio.wait(self._slots, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._slots, return_exceptions=True)
+        print(f"[Worker {self.worker_id}] Stopped")
+
+    async def _slot(self, index: int):
+        """Claim and run jobs one at a time until stopped, within the admission limits."""
+        while not self._stopping.is_set():
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                print(f"[Worker {self.worker_id}] Could not claim job: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=config.JOB_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(job)
+
+    def _claim(self) -> Optional[dict]:
+        return self.queue.claim(self.worker_id, get_controller().claim_filter())
+
+    async def _process(self, job: dict):
+        job_id, case_id = job["job_id"], job["case_id"]
+        if self.queue.is_exhausted(job):
+            print(f"[Worker {self.worker_id}] Job {job_id} for case {case_id} exceeded {self.queue.max_attempts} attempts")
+            await asyncio.to_thread(self.queue.fail, job_id, self.worker_id, "Too many attempts")
+            await asyncio.to_thread(get_progress_store().update, case_id, status="failed", error="Too many attempts")
+            log = await get_run_manager().get_log(case_id)
+            await log.append({
+                "event": "error",
+                "data": json.dumps({"case_id": case_id, "message": "Analysis failed after repeated attempts"})
+            })
+            return
+
+        print(f"[Worker {self.worker_id}] Running job {job_id} for case {case_id} (attempt {job['attempts']})")
+        run = asyncio.create_task(get_run_manager().run_case(case_id, job.get("stream_tokens", True)))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, case_id, run))
+        try:
+            last_event = await run
+        except asyncio.CancelledError:
+            if self._stopping.is_set() or not heartbeat.done():
+                raise
+            # Lease lost: another worker owns the job now
+            print(f"[Worker {self.worker_id}] Lost lease on job {job_id}, abandoned run")
+            return
+        finally:
+            heartbeat.cancel()
+
+        if last_event == "analysis_cancelled":
+            # The job is already marked cancelled
+            print(f"[Worker {self.worker_id}] Job {job_id} cancelled")
+            return
+        if last_event == "strategy_ready":
+            await asyncio.to_thread(self.queue.complete, job_id, self.worker_id)
+        else:
+            await asyncio.to_thread(self.queue.fail, job_id, self.worker_id, f"Run ended with {last_event}")
+        print(f"[Worker {self.worker_id}] Job {job_id} finished: {last_event}")
+
+    async def _heartbeat(self, job_id: str, case_id: str, run: asyncio.Task):
+        """Extend the job's lease while it runs; stop the run if the job was cancelled or the lease lost."""
+        while not run.done():
+            await asyncio.sleep(config.JOB_HEARTBEAT_SECONDS)
+            try:
+                held = await asyncio.to_thread(self.queue.heartbeat, job_id, self.worker_id)
+            except Exception as e:
+                # Transient Mongo error: keep running, the lease has slack
+                print(f"[Worker {self.worker_id}] Heartbeat failed for job {job_id}: {e}")
+                continue
+            if not held:
+                job = await asyncio.to_thread(self.queue.get_job, case_id)
+                if job and job["status"] == "cancelled":
+                    get_run_manager().interrupt(case_id, job.get("error") or "cancelled")
+                else:
+                    run.cancel()
+                return
@@ -0,0 +1,24 @@
+"""
+Shared fixtures for the backend tests.
+
+Tests run against an in-memory mongomock client (see requirements-dev.txt)
+in place of the MongoDB connection from config.MONGODB_URI.
+"""
+import os
+import sys
+
+import mongomock
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """A fresh in-memory database behind database.get_database()."""
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(database, "_client", client)
+    monkeypatch.setattr(database, "_db", None)
+    yield client[database.config.DATABASE_NAME]
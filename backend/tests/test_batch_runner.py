@@ -0,0 +1,40 @@
+"""Batches are created in bulk and their progress is read without writing."""
+import asyncio
+import json
+
+import config
+import database
+from models.schemas import CaseCreate
+from services.batch_runner import BatchRunner
+from services.job_queue import BATCH_PRIORITY
+
+
+def _cases(count):
+    return [CaseCreate(title=f"Case {i}", facts="Facts", jurisdiction="CA", stakes="High") for i in range(count)]
+
+
+def test_batch_cases_and_jobs_are_created(mongo, monkeypatch):
+    monkeypatch.setattr(config, "ANALYSIS_JOB_QUEUE", True)
+    batch = asyncio.run(BatchRunner().create_batch(_cases(3), client_id="alice"))
+
+    cases = list(database.get_cases_collection().find({"case_id": {"$in": batch["case_ids"]}}))
+    assert [case["title"] for case in cases] == ["Case 0", "Case 1", "Case 2"]
+    assert {case["batch_id"] for case in cases} == {batch["batch_id"]}
+    jobs = list(database.get_analysis_jobs_collection().find({"batch_id": batch["batch_id"]}))
+    assert sorted(job["case_id"] for job in jobs) == sorted(batch["case_ids"])
+    assert {(job["status"], job["priority"], job["client_id"]) for job in jobs} == {("queued", BATCH_PRIORITY, "alice")}
+    assert database.get_case_progress_collection().count_documents({"status": "created"}) == 3
+
+
+def test_progress_does_not_write(mongo, monkeypatch):
+    monkeypatch.setattr(config, "ANALYSIS_JOB_QUEUE", True)
+    runner = BatchRunner()
+    batch = asyncio.run(runner.create_batch(_cases(1)))
+    database.get_case_events_collection().insert_one({
+        "case_id": batch["case_ids"][0], "seq": 1, "event": "strategy_ready",
+        "data": json.dumps({"strategy": {}}), "created_at": batch["created_at"]
+    })
+    stored = database.get_batches_collection().find_one({"batch_id": batch["batch_id"]})
+
+    assert runner.progress(batch["batch_id"])["status"] == "completed"
+    assert database.get_batches_collection().find_one({"batch_id": batch["batch_id"]}) == stored
@@ -0,0 +1,41 @@
+"""Case detail field selectors are validated and list sections are capped."""
+import pytest
+
+import config
+from services.mongo_utils import _case_details, case_details_pipeline, parse_case_fields
+
+
+@pytest.mark.parametrize("fields", [
+    "case.$where", "arguments.$content", "case..title", "case.title.", "strategy.a b", "case.title,case.title.x"
+])
+def test_invalid_field_paths_are_rejected(fields):
+    with pytest.raises(ValueError):
+        parse_case_fields(fields)
+
+
+def test_field_paths_are_parsed():
+    assert parse_case_fields("case.title,case.status,strategy,arguments.content") == {
+        "case": ["title", "status"], "strategy": None, "arguments": ["content"]
+    }
+
+
+def test_sections_are_capped(monkeypatch):
+    monkeypatch.setattr(config, "CASE_DETAIL_MAX_ITEMS", 2)
+    pipeline = case_details_pipeline("case-1", parse_case_fields("arguments.argument_id,conflicts,strategy"))
+    limits = {
+        stage["$lookup"]["as"]: [step["$limit"] for step in stage["$lookup"]["pipeline"] if "$limit" in step]
+        for stage in pipeline if "$lookup" in stage
+    }
+    assert limits == {"arguments": [3], "conflicts": [3], "strategy": [1]}
+
+    doc = {
+        "case": {"case_id": "case-1"},
+        "arguments": [{"argument_id": f"arg-{i}"} for i in range(3)],
+        "conflicts": [{"conflict_id": "conflict-1"}],
+        "strategy": []
+    }
+    details = _case_details(doc, parse_case_fields("arguments,conflicts,strategy"))
+
+    assert [arg["argument_id"] for arg in details["arguments"]] == ["arg-0", "arg-1"]
+    assert len(details["conflicts"]) == 1
+    assert details["truncated"] == ["arguments"]
@@ -0,0 +1,31 @@
+"""Event logs fed by two processes number their events without collisions or losses."""
+import asyncio
+import json
+
+import database
+from services.run_manager import CaseEventLog
+
+
+def _event(name):
+    return {"event": name, "data": json.dumps({"case_id": "case-1"})}
+
+
+def test_stale_log_renumbers_after_other_process(mongo):
+    database.get_case_events_collection().create_index([("case_id", 1), ("seq", 1)], unique=True)
+
+    async def run():
+        ours, theirs = CaseEventLog("case-1"), CaseEventLog("case-1")
+        await theirs.append(_event("agent_started"))
+        await theirs.append(_event("agent_completed"))
+        entry = await ours.append(_event("analysis_cancelled"))
+        return ours, entry
+
+    ours, entry = asyncio.run(run())
+
+    assert entry["seq"] == 3
+    assert [e["seq"] for e in ours.events] == [1, 2, 3]
+    assert [e["event"] for e in ours.events] == ["agent_started", "agent_completed", "analysis_cancelled"]
+    stored = database.get_case_events_collection().find({"case_id": "case-1"}).sort("seq", 1)
+    assert [(e["seq"], e["event"]) for e in stored] == [
+        (1, "agent_started"), (2, "agent_completed"), (3, "analysis_cancelled")
+    ]
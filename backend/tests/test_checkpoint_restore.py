@@ -0,0 +1,32 @@
+"""Restoring a checkpoint discards outputs of interrupted stages, and only when there is a checkpoint."""
+import database
+from services.mongo_utils import save_checkpoint, write_argument
+from services.orchestrator import Orchestrator
+
+
+def _case(case_id):
+    return database.get_collection("cases").find_one({"case_id": case_id}, {"_id": 0})
+
+
+def _argument_ids(case_id):
+    return [doc["argument_id"] for doc in database.get_collection("arguments").find({"case_id": case_id})]
+
+
+def test_case_without_checkpoint_keeps_its_outputs(mongo):
+    database.get_collection("cases").insert_one({"case_id": "case-1", "title": "T"})
+    written = write_argument("case-1", "Harvey", "primary", "Strategy from before checkpoints")
+
+    assert Orchestrator()._restore_checkpoint("case-1", _case("case-1")) == {}
+    assert _argument_ids("case-1") == [written["argument_id"]]
+
+
+def test_outputs_of_interrupted_stages_are_discarded(mongo):
+    database.get_collection("cases").insert_one({"case_id": "case-1", "title": "T"})
+    kept = write_argument("case-1", "Harvey", "primary", "Checkpointed strategy")
+    write_argument("case-1", "Louis", "precedent", "Written before the run was interrupted")
+    save_checkpoint("case-1", "harvey_initial", {"agent": "Harvey", "argument_id": kept["argument_id"]})
+
+    restored = Orchestrator()._restore_checkpoint("case-1", _case("case-1"))
+
+    assert list(restored) == ["harvey_initial"]
+    assert _argument_ids("case-1") == [kept["argument_id"]]
@@ -0,0 +1,31 @@
+"""Detected conflicts are written through mongo_utils, so queued writes are visible to readers."""
+import asyncio
+
+import config
+import database
+from services import trace_writer
+from services.conflict_detector import ConflictDetector
+from services.mongo_utils import get_conflicts
+from services.trace_writer import TraceWriter
+
+
+def test_conflicts_are_written_behind_and_flushed_for_readers(mongo, monkeypatch):
+    monkeypatch.setattr(config, "DURABLE_ARTIFACT_WRITES", False)
+    writer = TraceWriter(enabled=True, flush_seconds=60)
+    monkeypatch.setattr(trace_writer, "_writer", writer)
+    detector = ConflictDetector()
+
+    async def analyze(text, instructions=None):
+        return [{"agents_involved": "Harvey", "issue": "Trial or settlement", "description": "They disagree"}]
+
+    monkeypatch.setattr(detector, "_analyze_conflicts", analyze)
+    output = {"agent": "Harvey", "type": "primary", "content": "Go to trial"}
+    saved = asyncio.run(detector.detect_new_conflicts("case-1", [output], [], []))
+
+    try:
+        assert [conflict["agents_involved"] for conflict in saved] == [["Harvey"]]
+        # Queued on the trace writer, not yet in Mongo
+        assert database.get_collection("conflicts").count_documents({}) == 0
+        assert [conflict["conflict_id"] for conflict in get_conflicts("case-1")] == [saved[0]["conflict_id"]]
+    finally:
+        writer.close()
@@ -0,0 +1,55 @@
+"""A stage whose LLM call fails is not checkpointed, and resuming re-runs it."""
+import asyncio
+import json
+
+import config
+import database
+from services import llm_client, trace_writer
+from services.mock_llm import MockLLMClient, MockLLMError
+from services.orchestrator import Orchestrator
+from services.trace_writer import TraceWriter
+
+
+def _run(orchestrator, case_id):
+    async def collect():
+        return [event async for event in orchestrator.run_analysis(case_id, stream_tokens=False)]
+    return asyncio.run(collect())
+
+
+def test_failed_synthesis_is_rerun_on_resume(mongo, monkeypatch):
+    monkeypatch.setattr(config, "LLM_BACKEND", "mock")
+    monkeypatch.setattr(config, "PROGRESS_STORE", "mongo")
+    client = MockLLMClient(mode="deterministic")
+    monkeypatch.setattr(llm_client, "_client", client)
+    monkeypatch.setattr(trace_writer, "_writer", TraceWriter(enabled=False))
+
+    create = client.chat.completions.create
+    failing = {"Jessica Pearson": True}
+
+    async def create_failing_synthesis(**kwargs):
+        system_prompt = kwargs["messages"][0]["content"]
+        if failing["Jessica Pearson"] and "Jessica Pearson" in system_prompt:
+            raise MockLLMError(400)
+        return await create(**kwargs)
+
+    monkeypatch.setattr(client.chat.completions, "create", create_failing_synthesis)
+    orchestrator = Orchestrator()
+    case = orchestrator.create_case("Mock v. Mock", "Breach of contract", "CA", "High")
+
+    events = _run(orchestrator, case.case_id)
+
+    assert events[-1]["event"] == "error"
+    assert database.get_collection("strategies").count_documents({"case_id": case.case_id}) == 0
+    stages = database.get_cases_collection().find_one({"case_id": case.case_id})["checkpoint"]["stages"]
+    assert "final_synthesis" not in stages
+
+    failing["Jessica Pearson"] = False
+    events = _run(orchestrator, case.case_id)
+
+    assert events[0]["event"] == "analysis_resumed"
+    assert "final_synthesis" not in json.loads(events[0]["data"])["completed_stages"]
+    assert events[-1]["event"] == "strategy_ready"
+    strategy = json.loads(events[-1]["data"])["strategy"]
+    assert strategy["final_strategy"]
+    strategies = list(database.get_collection("strategies").find({"case_id": case.case_id}))
+    assert [(s["version"], bool(s["final_strategy"]["content"])) for s in strategies] == [(1, True)]
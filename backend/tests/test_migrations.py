@@ -0,0 +1,55 @@
+"""Index migrations only record the schema version once every step succeeded."""
+import migrations
+
+
+def _index_names(db, collection):
+    return {index["name"] for index in db[collection].list_indexes()}
+
+
+def _record(db):
+    return db["migrations"].find_one({"_id": "indexes"})
+
+
+def test_migrate_records_version_and_skips_when_current(mongo):
+    steps = migrations.migrate()
+    assert not steps["rebuild"] and not steps["drop"]
+    assert _record(mongo)["version"] == migrations.SCHEMA_VERSION
+    assert "run_id_1_created_at_1" in _index_names(mongo, "reasoning_steps")
+    assert migrations.migrate() is None
+
+
+def test_unique_rebuild_with_duplicates_keeps_old_index_and_retries(mongo):
+    mongo["arguments"].create_index("argument_id")
+    mongo["arguments"].insert_many([{"argument_id": "arg_1"}, {"argument_id": "arg_1"}])
+
+    steps = migrations.migrate()
+    assert [index["name"] for index in steps["rebuild"]] == ["argument_id_1"]
+    assert "argument_id_1" in _index_names(mongo, "arguments")
+    assert _record(mongo) is None
+
+    # Fixed data: the next startup retries and completes the migration
+    mongo["arguments"].delete_one({"argument_id": "arg_1"})
+    migrations.migrate()
+    assert next(index for index in mongo["arguments"].list_indexes()
+                if index["name"] == "argument_id_1").get("unique")
+    assert _record(mongo)["version"] == migrations.SCHEMA_VERSION
+
+
+def test_superseded_index_kept_when_replacement_fails(mongo, monkeypatch):
+    mongo["reasoning_steps"].create_index("run_id")
+    create = migrations._create
+
+    def failing_create(db, index):
+        if index["name"] == "run_id_1_created_at_1":
+            raise RuntimeError("build failed")
+        create(db, index)
+
+    monkeypatch.setattr(migrations, "_create", failing_create)
+    migrations.migrate()
+    assert "run_id_1" in _index_names(mongo, "reasoning_steps")
+    assert _record(mongo) is None
+
+    monkeypatch.setattr(migrations, "_create", create)
+    migrations.migrate()
+    assert _index_names(mongo, "reasoning_steps") == {"_id_", "step_id_1", "run_id_1_created_at_1"}
+    assert _record(mongo) is not None
@@ -0,0 +1,53 @@
+"""Strategy versions are allocated atomically and stay unique per case."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import migrations
+from services import mongo_utils
+
+
+def test_concurrent_writers_get_distinct_versions(mongo):
+    migrations.migrate()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        docs = list(pool.map(
+            lambda _: mongo_utils.write_strategy_version("case-1", "Jessica", {}, durable=True), range(8)
+        ))
+    assert sorted(doc["version"] for doc in docs) == list(range(1, 9))
+    assert mongo_utils.get_latest_strategy("case-1")["version"] == 8
+
+
+def test_counter_is_seeded_from_existing_versions(mongo):
+    mongo["strategies"].insert_many([
+        {"strategy_id": "str_1", "case_id": "case-1", "version": 1},
+        {"strategy_id": "str_2", "case_id": "case-1", "version": 2},
+    ])
+    assert mongo_utils.write_strategy_version("case-1", "Jessica", {}, durable=True)["version"] == 3
+
+
+def test_migration_renumbers_duplicate_versions_before_unique_index(mongo):
+    mongo["strategies"].create_index("case_id")
+    mongo["strategies"].create_index([("case_id", 1), ("version", -1)])
+    mongo["strategies"].insert_many([
+        {"strategy_id": "str_1", "case_id": "case-1", "version": 1, "created_at": "2024-01-01T00:00:00Z"},
+        {"strategy_id": "str_2", "case_id": "case-1", "version": 1, "created_at": "2024-01-02T00:00:00Z"},
+        {"strategy_id": "str_3", "case_id": "case-1", "version": 2, "created_at": "2024-01-03T00:00:00Z"},
+    ])
+
+    migrations.migrate()
+
+    versions = {doc["strategy_id"]: doc["version"] for doc in mongo["strategies"].find()}
+    assert versions == {"str_1": 1, "str_2": 2, "str_3": 3}
+    indexes = {index["name"]: index for index in mongo["strategies"].list_indexes()}
+    assert indexes["case_id_1_version_-1"].get("unique")
+    assert "case_id_1" not in indexes
+    assert mongo_utils.write_strategy_version("case-1", "Jessica", {}, durable=True)["version"] == 4
+
+
+def test_failed_insert_is_raised(mongo):
+    migrations.migrate()
+    mongo["strategies"].insert_one({"strategy_id": "str_x", "case_id": "case-1", "version": 1})
+    mongo["counters"].insert_one({"_id": mongo_utils.strategy_counter_id("case-1"), "seq": 0})
+    with pytest.raises(DuplicateKeyError):
+        mongo_utils.write_strategy_version("case-1", "Jessica", {}, durable=True)
@@ -0,0 +1,67 @@
+"""The trace writer waits for room rather than reordering writes, bounds flushes and keeps writing past a failed operation."""
+import threading
+import time
+
+from pymongo import InsertOne
+
+import config
+import database
+from services import trace_writer
+from services.trace_writer import TraceWriter
+
+
+def _stalled_writer() -> TraceWriter:
+    """A writer with room for one operation whose thread never drains the queue."""
+    writer = TraceWriter(enabled=True, max_ops=1)
+    writer._thread = threading.Thread(target=time.sleep, args=(5,), daemon=True)
+    writer._thread.start()
+    return writer
+
+
+def test_full_queue_waits_for_room(mongo, monkeypatch):
+    monkeypatch.setattr(config, "TRACE_FLUSH_TIMEOUT_SECONDS", 0.05)
+    writer = _stalled_writer()
+    writer.enqueue("agent_messages", InsertOne({"message_id": "queued"}))
+
+    def drain():
+        time.sleep(0.2)
+        writer._queue.get()
+        writer._queue.task_done()
+
+    threading.Thread(target=drain).start()
+    started = time.monotonic()
+    writer.enqueue("agent_messages", InsertOne({"message_id": "overflow"}))
+
+    assert time.monotonic() - started >= 0.2
+    assert writer.overflowed == 1
+    # Queued behind the earlier operation, not written ahead of it
+    assert list(writer._queue.queue) == [("agent_messages", InsertOne({"message_id": "overflow"}))]
+    assert mongo[database.config.COLLECTIONS["agent_messages"]].count_documents({}) == 0
+
+
+def test_close_does_not_hang_on_a_full_queue(mongo):
+    writer = _stalled_writer()
+    writer.enqueue("agent_messages", InsertOne({"message_id": "queued"}))
+
+    started = time.monotonic()
+    writer.close(timeout=0.1)
+    assert time.monotonic() - started < 1
+
+
+def test_flush_times_out(mongo):
+    writer = _stalled_writer()
+    writer.enqueue("agent_messages", InsertOne({"message_id": "queued"}))
+
+    started = time.monotonic()
+    assert writer.flush(timeout=0.1) is False
+    assert time.monotonic() - started < 1
+
+
+def test_failed_operation_does_not_stop_the_batch(mongo):
+    trace_writer._write([
+        ("agent_messages", InsertOne({"_id": 1})),
+        ("agent_messages", InsertOne({"_id": 1})),
+        ("agent_messages", InsertOne({"_id": 2})),
+    ])
+
+    assert sorted(doc["_id"] for doc in mongo[database.config.COLLECTIONS["agent_messages"]].find()) == [1, 2]
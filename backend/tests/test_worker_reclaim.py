@@ -0,0 +1,55 @@
+"""A job whose worker died is reclaimed by another worker, within the admission limits."""
+from datetime import datetime, timedelta
+
+import config
+import database
+from services.job_queue import JobQueue
+from services.worker import AnalysisWorker
+
+
+def _kill(job):
+    """Simulate the job's worker dying: it stops heartbeating and the lease runs out."""
+    database.get_analysis_jobs_collection().update_one(
+        {"job_id": job["job_id"]},
+        {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+
+
+def test_dead_workers_job_is_reclaimed(mongo, monkeypatch):
+    monkeypatch.setattr(config, "ADMISSION_MAX_RUNNING_PER_CLIENT", 1)
+    queue = JobQueue(lease_seconds=60)
+    queue.enqueue("case-1", client_id="alice")
+    queue.enqueue("case-2", client_id="alice")
+
+    dead = AnalysisWorker(concurrency=1, queue=queue, worker_id="dead")
+    job = dead._claim()
+    assert job["case_id"] == "case-1"
+    _kill(job)
+
+    rescuer = AnalysisWorker(concurrency=1, queue=queue, worker_id="rescuer")
+    reclaimed = rescuer._claim()
+    assert reclaimed["job_id"] == job["job_id"]
+    assert reclaimed["worker_id"] == "rescuer"
+    assert reclaimed["attempts"] == 2
+
+    # alice is back at her running limit, so her queued job waits
+    assert rescuer._claim() is None
+
+
+def test_dead_workers_job_is_reclaimed_at_global_limit(mongo, monkeypatch):
+    monkeypatch.setattr(config, "ADMISSION_MAX_RUNNING", 2)
+    queue = JobQueue(lease_seconds=60)
+    queue.enqueue("case-1", client_id="alice")
+    queue.enqueue("case-2", client_id="bob")
+    queue.enqueue("case-3", client_id="carol")
+
+    job = AnalysisWorker(concurrency=1, queue=queue, worker_id="dead")._claim()
+    AnalysisWorker(concurrency=1, queue=queue, worker_id="busy")._claim()
+    _kill(job)
+    monkeypatch.setattr(config, "ADMISSION_MAX_RUNNING", 1)
+
+    # bob's live job holds the only slot, but the orphan is still recovered...
+    rescuer = AnalysisWorker(concurrency=1, queue=queue, worker_id="rescuer")
+    assert rescuer._claim()["job_id"] == job["job_id"]
+    # ...while carol's queued job waits for a slot
+    assert rescuer._claim() is None
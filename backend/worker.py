@@ -0,0 +1,58 @@
+"""
+Standalone analysis worker.
+
+Claims queued case analyses from the Mongo job queue and runs their
+multi-agent pipelines, independently of the API process:
+
+    python worker.py --concurrency 4
+
+Run as many worker processes as needed; each claims jobs atomically. Set
+EMBEDDED_WORKERS=0 on the API when analyses should only run here.
+"""
+import argparse
+import asyncio
+import signal
+
+import config
+import database
+from services import llm_client
+from services.trace_writer import get_trace_writer
+from services.worker import AnalysisWorker
+
+
+def _init_collections():
+    try:
+        database.init_collections()
+    except Exception as e:
+        print(f"Warning: Could not initialize database: {e}")
+
+
+async def main(concurrency: int):
+    # Index builds run in the background; the worker can claim jobs meanwhile
+    migration = asyncio.create_task(asyncio.to_thread(_init_collections))
+
+    worker = AnalysisWorker(concurrency=concurrency)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass  # Windows: fall back to KeyboardInterrupt
+
+    worker.start()
+    await stop.wait()
+    print("Shutting down worker, waiting for running analyses...")
+    await worker.stop(timeout=config.JOB_LEASE_SECONDS)
+    await asyncio.to_thread(get_trace_writer().close)
+    await migration
+    await llm_client.close_client()
+    database.close_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Legal Strategy Council analysis worker")
+    parser.add_argument("--concurrency", type=int, default=config.WORKER_CONCURRENCY,
+                        help="Number of analyses to run at once")
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency))
@@ -184,7 +184,18 @@ function App() {
         console.log('[SSE] Agent started:', data.agent, data.phase)
         setAgents(prev => ({
           ...prev,
-          [data.agent]: { ...prev[data.agent], status: 'thinking', phase: data.phase }
+          [data.agent]: { ...prev[data.agent], status: 'thinking', phase: data.phase, streamingContent: '' }
+        }))
+      })
+
+      eventSource.addEventListener('agent_token', (event) => {
+        const data = JSON.parse(event.data)
+        setAgents(prev => ({
+          ...prev,
+          [data.agent]: {
+            ...prev[data.agent],
+            streamingContent: (prev[data.agent]?.streamingContent || '') + data.delta
+          }
         }))
       })
 
@@ -14,6 +14,7 @@
  * - agentName: Name of the agent ('Harvey', 'Louis', 'Tanner', 'Jessica')
  * - status: Current status ('waiting' | 'thinking' | 'done')
  * - content: The agent's analysis output (string or object)
+ * - streamingContent: Partial output received via agent_token events while thinking
  * - role: Display name for the agent's role
  */
 import React, { useState } from 'react'
@@ -65,7 +66,7 @@ const AGENT_DESCRIPTIONS = {
   'Jessica': 'Managing Partner'
 }
 
-function AgentPanel({ agentName, status, content, role }) {
+function AgentPanel({ agentName, status, content, streamingContent, role }) {
   const [isExpanded, setIsExpanded] = useState(true)
   const colors = AGENT_COLORS[agentName] || AGENT_COLORS['Harvey']
   const description = AGENT_DESCRIPTIONS[agentName] || role
@@ -191,13 +192,19 @@ function AgentPanel({ agentName, status, content, role }) {
           </div>
         )}
 
-        {status === 'thinking' && (
+        {status === 'thinking' && !streamingContent && (
           <div className="flex items-center gap-2 py-8">
             <Loader2 className={cn('h-4 w-4 animate-spin', colors.text)} />
             <span className="text-sm text-muted-foreground">Analyzing case...</span>
           </div>
         )}
 
+        {status === 'thinking' && streamingContent && (
+          <div className="space-y-4 text-sm">
+            {formatContent(streamingContent)}
+          </div>
+        )}
+
         {status === 'done' && content && (
           <div className="space-y-4 text-sm">
             {formatContent(content)}
@@ -81,6 +81,7 @@ function DebateView({ agents, deliberationRound, totalRounds }) {
               agentName={agentName}
               status={agent.status}
               content={agent.content}
+              streamingContent={agent.streamingContent}
               role={agent.role}
             />
           )